@@ -5,6 +5,13 @@ from flask_cors import CORS
 from app.routes import initialize_routes
 from flask_jwt_extended import JWTManager
 from app.create_db import init_db
+from app.commands import init_commands
+from app.services.accesslog_buffer import init_accesslog_buffer
+from app.services.dedup_cache import init_dedup_cache
+from app.services.cache_service import init_cache
+from app.services.gate_registry import init_gate_registry
+from app.request_metrics import init_request_metrics
+from app.serializers import init_json_representation
 from dotenv import load_dotenv
 
 def create_app(config_name="development"):
@@ -21,7 +28,14 @@ def create_app(config_name="development"):
         raise ValueError(f"Unknown config name: {config_name}")
 
     init_db(app)
+    init_commands(app)
+    init_accesslog_buffer(app)
+    init_dedup_cache(app)
+    init_cache(app)
+    init_gate_registry(app)
+    init_request_metrics(app)
     api = Api(app)
+    init_json_representation(api)  # orjson（有裝的話）取代 Flask-RESTful 預設的 json.dumps
     CORS(app)
     jwt = JWTManager(app)
     initialize_routes(api)
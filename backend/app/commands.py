@@ -0,0 +1,42 @@
+import click
+from datetime import datetime
+from flask import Flask
+from flask.cli import with_appcontext
+from app.models import db
+from app.models.organization_closure_model import rebuild_organization_closure
+from app.services.attendance_service import backfill_attendance_service
+from app.services.organization_service import OrganizationService
+
+
+# flask --app main backfill-attendance --start 2025-04-01 --end 2025-04-30 [--partition-days 7]
+# 重算一段期間的出勤紀錄和月彙總，不受 HTTP timeout 限制
+@click.command("backfill-attendance")
+@click.option("--start", required=True, help="YYYY-MM-DD")
+@click.option("--end", required=True, help="YYYY-MM-DD")
+@click.option("--partition-days", type=int, default=None, help="一次掃幾天的 Access_Log（預設 ATTENDANCE_BACKFILL_PARTITION_DAYS）")
+@with_appcontext
+def backfill_attendance_command(start, end, partition_days):
+    start_date = datetime.strptime(start, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end, "%Y-%m-%d").date()
+    if end_date < start_date:
+        raise click.BadParameter("end must not be earlier than start.")
+
+    result, _ = backfill_attendance_service(start_date, end_date, partition_days)
+    print(f"🎉 {result['days']} 天，{result['logs']} 筆逼卡 → {result['total']} 筆出勤，"
+          f"{result['seconds']}s（{result['logs_per_second']} 筆/s）")
+
+
+# flask --app main rebuild-org-closure
+# 直接用 SQL 改了 Organization（seed、手動 INSERT/UPDATE parent）之後重建 closure table
+@click.command("rebuild-org-closure")
+@with_appcontext
+def rebuild_org_closure_command():
+    count = rebuild_organization_closure(db.session.connection())
+    db.session.commit()
+    OrganizationService.invalidate_cache()
+    print(f"✅ Organization_Closure 重建完成，{count} 筆")
+
+
+def init_commands(app: Flask):
+    app.cli.add_command(backfill_attendance_command)
+    app.cli.add_command(rebuild_org_closure_command)
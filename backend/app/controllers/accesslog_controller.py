@@ -1,9 +1,11 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response, stream_with_context
 from flask_restful import Resource
 from app.services.accesslog_service import AccessLogService
+from app.services.accesslog_buffer import get_accesslog_buffer
+from app.services.dedup_cache import get_dedup_cache
+from app.services.role_service import RoleService
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import base64
-import json
 
 #GET /api/v1/access-logs/employees/{employee_id}?date=<string>
 class GetEmployeeAccessLog(Resource):
@@ -15,8 +17,9 @@ class GetEmployeeAccessLog(Resource):
         if not date_param:
             return {"logs": "datetime are not provided"}, 404
         
-        is_admin = get_jwt_identity()["is_admin"]
-        is_manager = get_jwt_identity()['is_manager']
+        claims = RoleService.current_identity()
+        is_admin = claims["is_admin"]
+        is_manager = claims["is_manager"]
         if not is_admin and not is_manager:
             return {"logs": "You are not admin or manager"}, 401 #只有admin or manager可以看他人的資料
         
@@ -35,21 +38,23 @@ class CreatePersonalAccessLog(Resource):
         try:
             # 解碼 base64 資料
             pubsub_message = envelope["message"]
-            data = base64.b64decode(pubsub_message["data"]).decode("utf-8")
-            log_data = json.loads(data)
+            data = base64.b64decode(pubsub_message["data"])
 
-            # 抓出欄位
-            employee_id = log_data.get("employee_id")
-            access_time = log_data.get("access_time")
-            gate_id = log_data.get("gate_id")
+            # 抓出欄位（跟 pull worker 共用同一套解析）
+            row, error = AccessLogService.parse_pubsub_data(data, pubsub_message.get("messageId") or pubsub_message.get("message_id"))
+            if error:
+                return error
 
-            if not employee_id or not access_time or not gate_id:
-                return {"error": "Missing fields in pubsub data"}, 400
+            # 最近才寫過的訊息（Pub/Sub 重送）直接回 2xx 讓它 ack
+            dedup_cache = get_dedup_cache()
+            if dedup_cache.seen(row["dedup_key"]):
+                return {"message": "Duplicate access log ignored."}, 200
 
-            # 寫入資料庫或服務
-            _, status = AccessLogService.add_access_logs_by_id_time_gate(employee_id, access_time, gate_id)
-
-            return status
+            # 丟進 buffer 跟其他同時進來的逼卡一起批次寫入，commit 完才回應（Pub/Sub 收到 2xx 才 ack）
+            body, status = get_accesslog_buffer().submit(row["employee_id"], row["access_time"], row["gate_id"], row["dedup_key"])
+            if status < 300:
+                dedup_cache.add(row["dedup_key"])
+            return body, status
 
         except Exception as e:
             print(f"Pub/Sub error: {e}")
@@ -69,5 +74,47 @@ class GetPersonalAccessLog(Resource):
         logs, status = AccessLogService.get_employee_logs_by_employeeid_and_date(employee_id, date_param)
         return {"logs": logs}, status
 
+#GET /api/v1/pubsub/access-logs/stats
+class AccessLogIngestStats(Resource):
+    @jwt_required()
+    def get(self):
+        if not get_jwt_identity()["is_admin"]:
+            return {"error": "Admin only access"}, 403
+
+        return {**get_accesslog_buffer().stats(), "dedup_cache": get_dedup_cache().stats()}, 200
+
+
+#GET /api/v1/access-logs/export?start=YYYY-MM-DD&end=YYYY-MM-DD&format=ndjson|csv&organization_id=&gate_id=
+class ExportAccessLogs(Resource):
+    @jwt_required()
+    def get(self):
+        claims = RoleService.current_identity()
+        if not claims["is_admin"] and not claims["is_manager"]:
+            return {"error": "You are not admin or manager"}, 403
+
+        # type=int 遇到 gate_id=abc 會變成 None，等於沒篩選、整個匯出，所以自己轉
+        gate_id = request.args.get("gate_id")
+        if gate_id is not None:
+            try:
+                gate_id = int(gate_id)
+            except ValueError:
+                return {"error": "gate_id must be an integer."}, 400
 
+        fmt = request.args.get("format", "ndjson")
+        body, status = AccessLogService.export_access_logs(
+            request.args.get("start"),
+            request.args.get("end"),
+            fmt,
+            organization_id=request.args.get("organization_id"),
+            gate_id=gate_id
+        )
+        if status != 200:
+            return body, status
 
+        # 沒有 Content-Length，會用 chunked transfer encoding 邊查邊送
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=access-logs.{fmt}"}
+        )
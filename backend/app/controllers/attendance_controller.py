@@ -1,14 +1,38 @@
 # app/controllers/attendance_controller.py
 
+import hmac
 from flask_restful import Resource
-from flask import request
+from flask import request, current_app
 from datetime import datetime, timedelta
-from app.services.attendance_service import update_attendance_service
+from app.services.attendance_service import update_attendance_service, backfill_attendance_service
 from app.services.attendance_service import AttendanceService
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.attendance_summary_service import AttendanceSummaryService, parse_month, is_closed_month, month_version
+from app.services.role_service import RoleService
+from app.http_cache import conditional, long_lived, REVALIDATE
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 
+
+# 出勤的 GET 都是查某個月：帶 If-None-Match 而且那個月的資料版本沒變就回 304，不跑 build
+# 已經結算的月份另外讓瀏覽器存 ATTENDANCE_CLOSED_MONTH_MAX_AGE 秒；month 格式不對就照舊交給 service 回 400
+def conditional_month(month, build):
+    try:
+        month_start = parse_month(month)
+    except ValueError:
+        return build()
+    if is_closed_month(month_start):
+        cache_control = long_lived(current_app.config["ATTENDANCE_CLOSED_MONTH_MAX_AGE"])
+    else:
+        cache_control = REVALIDATE
+    return conditional(month_version(month_start), build, cache_control)
+
+# put /api/v1/attendance/update                              只更新今天（增量）
+# put /api/v1/attendance/update?start=YYYY-MM-DD&end=YYYY-MM-DD  重算這段期間（補漏跑的日子、晚到的逼卡）
+#   重算很重（整段期間所有人），要 admin JWT 或是 X-Scheduler-Token: <ATTENDANCE_SCHEDULER_TOKEN>
 class UpdateAttendance(Resource):
     def put(self):
+        if request.args.get("start") or request.args.get("end"):
+            return self._backfill()
+
         print("Updating attendance...")
         try:
             total, status = update_attendance_service()
@@ -17,13 +41,51 @@ class UpdateAttendance(Resource):
             import traceback
             traceback.print_exc()
             return {"error": "❌ Failed to update attendance", "details": str(e)}, 500
+
+    def _backfill(self):
+        denied = self._check_backfill_access()
+        if denied:
+            return denied
+
+        try:
+            start_date = datetime.strptime(request.args.get("start", ""), "%Y-%m-%d").date()
+            end_date = datetime.strptime(request.args.get("end", ""), "%Y-%m-%d").date()
+        except ValueError:
+            return {"error": "Invalid date format. Use YYYY-MM-DD."}, 400
+        if end_date < start_date:
+            return {"error": "end must not be earlier than start."}, 400
+        # 太長的區間 HTTP 會 timeout，請用 flask backfill-attendance
+        max_days = current_app.config["ATTENDANCE_BACKFILL_MAX_DAYS"]
+        if (end_date - start_date).days + 1 > max_days:
+            return {"error": f"At most {max_days} days per request. Use `flask backfill-attendance` for longer ranges."}, 400
+
+        print(f"Recomputing attendance {start_date} ~ {end_date}...")
+        try:
+            return backfill_attendance_service(start_date, end_date)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return {"error": "❌ Failed to recompute attendance", "details": str(e)}, 500
+
+    def _check_backfill_access(self):
+        # 服務是公開的，不擋的話誰都可以叫整個月重算把 DB 打爆
+        secret = current_app.config["ATTENDANCE_SCHEDULER_TOKEN"]
+        if secret and hmac.compare_digest(request.headers.get("X-Scheduler-Token", ""), secret):
+            return None
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return {"error": "Admin token or scheduler token required."}, 401
+        if not get_jwt_identity()["is_admin"]:
+            return {"error": "Admin only access"}, 403
+        return None
         
 #GET /api/v1/attendance/employees/{employee_id}?month=<string>
 class EmployeeAttendanceController(Resource):
     @jwt_required()
     def get(self, employee_id):
         # 驗證角色（這裡可以讓 Administrator、Employee 和 Manager 都可以訪問）
-        claims = get_jwt_identity()
+        claims = RoleService.current_identity()
         if not (claims["is_admin"] or claims["is_manager"] or claims["employee_id"] == employee_id):
             return {"error": "Unauthorized access."}, 403
         
@@ -34,18 +96,18 @@ class EmployeeAttendanceController(Resource):
 
         # 調用 Service 層來獲取出勤紀錄
         try:
-            return AttendanceService.get_attendance_by_employee(employee_id, month)
+            return conditional_month(month, lambda: AttendanceService.get_attendance_by_employee(employee_id, month))
         except Exception as e:
             return {"error": f"Failed to get attendance: {str(e)}"}, 500
         
         
 #新版本：改得跟上面那支的呼叫格式一樣！
-#GET /api/v1/attendance/organizations/{organization_id}?month=YYYY-MM
+#GET /api/v1/attendance/organizations/{organization_id}?month=YYYY-MM&include_descendants=true
 class OrganizationAttendanceController(Resource):
     @jwt_required()
     def get(self, organization_id):
         # 驗證角色
-        claims = get_jwt_identity()
+        claims = RoleService.current_identity()
         if not (claims["is_admin"] or claims["is_manager"]):
             return {"error": "Unauthorized access."}, 403  # 只有admin和manager有權限
         
@@ -55,10 +117,48 @@ class OrganizationAttendanceController(Resource):
 
         # 呼叫 service 層處理具體的邏輯，這裡不再使用 month 參數，直接查詢所有歷史出勤紀錄
         try:
-            # 解包 service 回傳的 list 和 status
-            attendance_list, status = AttendanceService.get_attendance_by_organization(organization_id, month)
+            # include_descendants=true 會把所有下層部門一起查，回傳依部門分組
+            include_descendants = request.args.get("include_descendants", "false").lower() in ("1", "true", "yes")
             # 最外層直接回傳 List
-            return attendance_list, status
+            return conditional_month(
+                month, lambda: AttendanceService.get_attendance_by_organization(organization_id, month, include_descendants)
+            )
+
+        except Exception as e:
+            return {"error": f"Failed to get attendance: {str(e)}"}, 500
+
+
+#GET /api/v1/attendance/summary/employees/{employee_id}?month=YYYY-MM
+class EmployeeAttendanceSummaryController(Resource):
+    @jwt_required()
+    def get(self, employee_id):
+        claims = RoleService.current_identity()
+        if not (claims["is_admin"] or claims["is_manager"] or claims["employee_id"] == employee_id):
+            return {"error": "Unauthorized access."}, 403
+
+        month = request.args.get('month')
+        if not month:
+            return {"error": "Missing month parameter."}, 400
+
+        try:
+            return conditional_month(month, lambda: AttendanceSummaryService.get_employee_summary(employee_id, month))
+        except Exception as e:
+            return {"error": f"Failed to get attendance summary: {str(e)}"}, 500
+
 
+#GET /api/v1/attendance/summary/organizations/{organization_id}?month=YYYY-MM
+class OrganizationAttendanceSummaryController(Resource):
+    @jwt_required()
+    def get(self, organization_id):
+        claims = RoleService.current_identity()
+        if not (claims["is_admin"] or claims["is_manager"]):
+            return {"error": "Unauthorized access."}, 403
+
+        month = request.args.get('month')
+        if not month:
+            return {"error": "Missing month parameter."}, 400
+
+        try:
+            return conditional_month(month, lambda: AttendanceSummaryService.get_organization_summary(organization_id, month))
         except Exception as e:
-            return {"error": f"Failed to get attendance: {str(e)}"}, 500
\ No newline at end of file
+            return {"error": f"Failed to get attendance summary: {str(e)}"}, 500
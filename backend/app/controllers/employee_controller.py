@@ -1,7 +1,9 @@
-from flask import request
+from flask import request, current_app, Response, stream_with_context
 from flask_restful import Resource
 from app.services.employee_service import EmployeeService
+from app.services.role_service import RoleService
 from datetime import datetime  # Import datetime for timestamps
+import json
 from app.models.employee_model import EmployeeModel  # Import EmployeeModel
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from dateutil.parser import isoparse  # pip install python-dateutil
@@ -11,7 +13,7 @@ class EmployeeResource(Resource):
 
     @jwt_required()
     def get(self, employee_id):
-        current_user = get_jwt_identity()
+        current_user = RoleService.current_identity()
         is_admin = current_user["is_admin"]
         is_manager = current_user["is_manager"]
 
@@ -28,7 +30,7 @@ class EmployeeResource(Resource):
 
         return employee_data, 200
 
-# get /api/v1/employees-list
+# get /api/v1/employees-list?limit=&cursor=&organization_id=&hire_status=&name_prefix=
 class EmployeeListResource(Resource):
     @jwt_required()
     def get(self):
@@ -37,8 +39,21 @@ class EmployeeListResource(Resource):
 
         if not (is_admin):
             return {'message': 'Access denied. Only admins can view this information.'}, 403
+
+        try:
+            limit = int(request.args.get('limit', current_app.config["EMPLOYEE_LIST_PAGE_SIZE"]))
+        except ValueError:
+            return {'message': 'limit must be an integer.'}, 400
+        if limit < 1 or limit > current_app.config["EMPLOYEE_LIST_MAX_PAGE_SIZE"]:
+            return {'message': f'limit must be between 1 and {current_app.config["EMPLOYEE_LIST_MAX_PAGE_SIZE"]}.'}, 400
         
-        data = EmployeeService.get_all_employees() # json
+        data = EmployeeService.get_all_employees(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            organization_id=request.args.get('organization_id'),
+            hire_status=request.args.get('hire_status'),
+            name_prefix=request.args.get('name_prefix')
+        ) # json
         
         if not data or not data.get("employee_list"):
             return {'message': 'No employees found'}, 404
@@ -72,6 +87,46 @@ class EmployeeAddingResource(Resource):
         except Exception as e:
             return {"message": f"Failed to add employee: {str(e)}"}, 500
 
+# post /api/v1/employees/import?stream=1
+# body 是 CSV（Content-Type: text/csv，第一行欄位名稱）或 JSON 陣列，欄位跟單筆新增一樣
+# 加 stream=1 會回 NDJSON，一行一個進度，最後一行是結果，檔案大的時候前端可以顯示進度
+class EmployeeImportResource(Resource):
+    @jwt_required()
+    def post(self):
+        current_user = get_jwt_identity()
+        is_admin = current_user["is_admin"]
+
+        if not is_admin:
+            return {'message': 'Access denied. Only admins can add employees.'}, 403
+
+        rows, error = EmployeeService.parse_import_body(request.get_data(), request.content_type)
+        if error:
+            return error
+        if not rows:
+            return {'message': 'No employees to import.'}, 400
+        max_rows = current_app.config["EMPLOYEE_IMPORT_MAX_ROWS"]
+        if len(rows) > max_rows:
+            return {'message': f'At most {max_rows} employees per import.'}, 400
+
+        events = EmployeeService.import_employees(rows, current_user["employee_id"])
+
+        if request.args.get("stream") in ("1", "true"):
+            def generate():
+                try:
+                    for event in events:
+                        yield json.dumps(event) + "\n"
+                except Exception as e:
+                    # header 已經送出去了，只能在最後一行告訴 client 失敗
+                    yield json.dumps({"type": "error", "message": f"Failed to import employees: {str(e)}"}) + "\n"
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+        try:
+            *_, result = events
+        except Exception as e:
+            return {"message": f"Failed to import employees: {str(e)}"}, 500
+        del result["type"]
+        return result, 201 if not result["errors"] else 200
+
 # put /api/v1/employees/{employee_id}
 class EmployeeEditingResource(Resource):
     @jwt_required()
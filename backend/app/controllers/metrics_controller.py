@@ -0,0 +1,52 @@
+import hmac
+from flask import Response, current_app, request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from app.models import db
+from app.db_pool import get_pool_stats
+from app.request_metrics import get_request_metrics
+from app.services.accesslog_buffer import get_accesslog_buffer
+
+
+# GET /api/v1/metrics/db-pool
+class DatabasePoolMetrics(Resource):
+    @jwt_required()
+    def get(self):
+        if not get_jwt_identity()["is_admin"]:
+            return {"error": "Admin only access"}, 403
+
+        return get_pool_stats(db.engine), 200
+
+
+# GET /api/v1/metrics（Prometheus text format）
+# Prometheus 不方便帶會過期的 JWT，有設 METRICS_SCRAPE_TOKEN 就要帶 Authorization: Bearer <token>
+# 沒設 token 就只有 admin JWT 看得到（服務是公開的，route、latency、連線池狀態不能誰都能看）
+class PrometheusMetrics(Resource):
+    def get(self):
+        token = current_app.config["METRICS_SCRAPE_TOKEN"]
+        if token:
+            # 固定時間比對，不會因為前幾個字元對了就比較慢回來而被一個字一個字猜出 token
+            # 轉成 bytes 再比，header 裡有非 ASCII 字元也只會回 401，不會丟 TypeError
+            if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()):
+                return {"error": "Invalid metrics token"}, 401
+        else:
+            try:
+                verify_jwt_in_request()
+            except Exception:
+                return {"error": "Missing or invalid token"}, 401
+            if not get_jwt_identity()["is_admin"]:
+                return {"error": "Admin only access"}, 403
+
+        lines = get_request_metrics().render()
+        lines.extend(_gauges("db_pool", get_pool_stats(db.engine)))
+        lines.extend(_gauges("accesslog_buffer", get_accesslog_buffer().stats()))
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+
+def _gauges(prefix, stats):
+    lines = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            lines.append(f"# TYPE {prefix}_{key} gauge")
+            lines.append(f"{prefix}_{key} {value}")
+    return lines
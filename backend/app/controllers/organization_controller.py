@@ -1,7 +1,9 @@
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.organization_service import OrganizationService
+from app.services.role_service import RoleService
 from flask import request
+from app.http_cache import conditional_response
 
 
 # GET /api/v1/organizations/list
@@ -13,21 +15,22 @@ class OrganizationList(Resource):
         if not claims["is_admin"]:
             return {"error": "Admin only access"}, 403
         
-        #是admin
-        return OrganizationService.get_organization_list()
+        #是admin，組織沒變動就回 304
+        organizations, etag = OrganizationService.get_cached_organization_list()
+        return conditional_response(organizations, etag)
     
 # GET /api/v1/organizations/<organization_id>
 class GetOrganization(Resource):
     @jwt_required()
     def get(self, organization_id):
-        claims = get_jwt_identity()
+        claims = RoleService.current_identity()
 
         #限定Administrator或Manager
         if not (claims["is_admin"] or claims["is_manager"]):
             return {"error": "Only Administrator or Manager can access this resource."}, 403
 
-
-        return OrganizationService.get_organization_by_id(organization_id)
+        (response, status), etag = OrganizationService.get_cached_organization(organization_id)
+        return conditional_response(response, etag, status)
 
 # GET /api/v1/organizations
 class GetOrganizationTree(Resource):
@@ -38,7 +41,8 @@ class GetOrganizationTree(Resource):
         if not claims["is_admin"]:
             return {"error": "Only Administrator can access this resource."}, 403
 
-        return OrganizationService.get_organization_tree()
+        tree, etag = OrganizationService.get_cached_organization_tree()
+        return conditional_response(tree, etag)
 
 # DELETE /api/v1/organizations/<organization_id>
 class DeleteOrganization(Resource):
@@ -0,0 +1,36 @@
+from flask import request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.role_service import RoleService
+from app.services.work_schedule_service import WorkScheduleService
+
+
+# GET /api/v1/work-schedules
+class WorkScheduleList(Resource):
+    @jwt_required()
+    def get(self):
+        claims = RoleService.current_identity()
+        if not (claims["is_admin"] or claims["is_manager"]):
+            return {"error": "Only Administrator or Manager can access this resource."}, 403
+
+        return WorkScheduleService.list_schedules()
+
+
+# PUT    /api/v1/work-schedules/<organization|employee>/<scope_id>  body: {"work_start": "08:30", "work_end": "17:30"}
+# DELETE /api/v1/work-schedules/<organization|employee>/<scope_id>
+class WorkScheduleResource(Resource):
+    @jwt_required()
+    def put(self, scope, scope_id):
+        claims = get_jwt_identity()
+        if not claims["is_admin"]:
+            return {"error": "Admin only access"}, 403
+
+        return WorkScheduleService.set_schedule(scope, scope_id, request.get_json() or {}, claims["employee_id"])
+
+    @jwt_required()
+    def delete(self, scope, scope_id):
+        claims = get_jwt_identity()
+        if not claims["is_admin"]:
+            return {"error": "Admin only access"}, 403
+
+        return WorkScheduleService.delete_schedule(scope, scope_id)
@@ -1,10 +1,126 @@
+import click
+from datetime import datetime
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
 from app.models import db
+from app.models.schema_version_model import SchemaVersionModel
+from app.models.organization_closure_model import rebuild_organization_closure
+from app.services.attendance_summary_service import AttendanceSummaryService
+
+# schema 有變動（新表、新 index、舊表加欄位）就把版本 +1
+# create_all 只會建新表，舊表要改的東西寫在 MIGRATIONS[版本] 裡，init-db 會照順序補跑
+SCHEMA_VERSION = 8
+
+# 從這個版本開始月彙總是完整的，比它舊的資料庫升級時要從 Attendance_Record 補算歷史月彙總
+MONTHLY_SUMMARY_BACKFILL_VERSION = 8
+
+
+def _add_access_log_dedup_key(conn):
+    if "dedup_key" not in {c["name"] for c in inspect(conn).get_columns("Access_Log")}:
+        conn.execute(text("ALTER TABLE Access_Log ADD COLUMN dedup_key VARCHAR(64) NULL"))
+
+
+def _add_attendance_punctuality_columns(conn):
+    existing = {c["name"] for c in inspect(conn).get_columns("Attendance_Record")}
+    for name, column_type in [
+        ("is_late", "BOOLEAN"),
+        ("late_minutes", "INTEGER"),
+        ("is_early_leave", "BOOLEAN"),
+        ("early_leave_minutes", "INTEGER"),
+    ]:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE Attendance_Record ADD COLUMN {name} {column_type} NULL"))
+
+
+def _add_attendance_incomplete_column(conn):
+    if "is_incomplete" not in {c["name"] for c in inspect(conn).get_columns("Attendance_Record")}:
+        conn.execute(text("ALTER TABLE Attendance_Record ADD COLUMN is_incomplete BOOLEAN NULL"))
+
+
+MIGRATIONS = {
+    4: _add_access_log_dedup_key,
+    5: rebuild_organization_closure,  # Organization_Closure 是 create_all 建的，這邊把現有的組織階層填進去
+    6: _add_attendance_punctuality_columns,  # 舊紀錄維持 NULL，讀的時候補算；要存起來就跑 flask backfill-attendance
+    7: _add_attendance_incomplete_column,  # 舊紀錄維持 NULL（當作完整），要重新判斷就跑 flask backfill-attendance
+}
+
 
 def init_db(app: Flask):
     db.init_app(app)
-    with app.app_context(): #進入這個app的context 系統才知道你是要創db在哪一個app
-        db.create_all()  #這邊會看你的model ORM寫得怎樣 如果之前gcp db已經有特定db table那如果有重新跑一次後端他不會覆蓋掉 只會創新的
-        print("✅ 資料表建立成功！")
-    return db
\ No newline at end of file
+    app.cli.add_command(init_db_command)
+
+    # 開機不再 create_all（Cloud Run 每次冷啟動都要跟 Cloud SQL 來回好幾趟），只讀一筆版本號確認
+    # 版本不對就直接開不起來：少了 migration 的欄位/表，之後每個逼卡、出勤 request 都會 500，不如讓部署失敗
+    # 部署時 .github/workflows/backend.yml 會先用 Cloud Run job 跑 init-db（那個 job 設 SCHEMA_CHECK_ON_STARTUP=false）
+    if app.config["SCHEMA_CHECK_ON_STARTUP"]:
+        with app.app_context():
+            if not check_schema_version():
+                raise RuntimeError(
+                    f"Database schema version {get_schema_version()} is older than {SCHEMA_VERSION}. "
+                    "Run `SCHEMA_CHECK_ON_STARTUP=false flask --app main init-db` first."
+                )
+    return db
+
+
+def get_schema_version():
+    try:
+        return db.session.query(SchemaVersionModel.version).filter_by(id=1).scalar()
+    except Exception:
+        db.session.rollback()
+        return None
+
+
+def check_schema_version():
+    current = get_schema_version()
+    if current is None or current < SCHEMA_VERSION:
+        print(f"⚠️ 資料庫 schema 版本 {current}，程式需要 {SCHEMA_VERSION}，請先跑 flask --app main init-db")
+        return False
+    return True
+
+
+def migrate_db():
+    is_new_db = not inspect(db.engine).has_table(SchemaVersionModel.__tablename__) \
+        and not inspect(db.engine).has_table("Employee")
+
+    db.create_all()  #這邊會看你的model ORM寫得怎樣 如果之前gcp db已經有特定db table那如果有重新跑一次後端他不會覆蓋掉 只會創新的
+
+    current = get_schema_version()
+    if is_new_db:
+        current = SCHEMA_VERSION  # 全新的資料庫 create_all 已經是最新的樣子，不用補跑
+    previous = current or 0
+    for version in range((current or 0) + 1, SCHEMA_VERSION + 1):
+        if version in MIGRATIONS:
+            with db.engine.begin() as conn:
+                MIGRATIONS[version](conn)
+            print(f"✅ migration {version} 完成")
+
+    # create_all 不會幫已經存在的表補 index，這邊自己補（要在 migration 補完欄位之後）
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    # closure 只有經過 ORM 的寫入才會維護，每次部署（init-db）都順便整張重算一次
+    with db.engine.begin() as conn:
+        rebuild_organization_closure(conn)
+
+    # 月彙總以前只有出勤更新碰到的人/月才有（其他月份的 /summary 都是 0），升級時從現有出勤紀錄補一次
+    if previous < MONTHLY_SUMMARY_BACKFILL_VERSION:
+        count = AttendanceSummaryService.refresh_all_monthly_summaries()
+        print(f"✅ 歷史月彙總補算完成，{count} 筆")
+
+    row = db.session.get(SchemaVersionModel, 1)
+    if row:
+        row.version = SCHEMA_VERSION
+        row.updated_at = datetime.now()
+    else:
+        db.session.add(SchemaVersionModel(id=1, version=SCHEMA_VERSION, updated_at=datetime.now()))
+    db.session.commit()
+    return SCHEMA_VERSION
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    version = migrate_db()
+    print(f"✅ 資料表建立成功！schema 版本 {version}")
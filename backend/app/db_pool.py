@@ -0,0 +1,59 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+# 跟一般 QueuePool 一樣，只是多記錄 checkout 次數、等連線的時間、overflow 用量，拿來調 pool 大小
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._peak_checked_out = 0
+        self._peak_overflow = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            self._peak_checked_out = max(self._peak_checked_out, self.checkedout())
+            self._peak_overflow = max(self._peak_overflow, self.overflow())
+        return conn
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "pool_size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "max_overflow": self._max_overflow,
+                "peak_checked_out": self._peak_checked_out,
+                "peak_overflow": max(self._peak_overflow, 0),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._wait_seconds / self._checkouts * 1000, 3) if self._checkouts else 0,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 3)
+            }
+
+
+def get_pool_stats(engine):
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    # 測試用的 sqlite 記憶體資料庫不是 QueuePool，只能給基本狀態
+    return {"pool_class": type(pool).__name__, "status": pool.status()}
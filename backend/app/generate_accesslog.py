@@ -247,7 +247,6 @@ import random
 import json
 import time
 from datetime import datetime, timedelta
-from google.cloud import pubsub_v1
 
 # ===== Basic Settings =====
 NUM_EMPLOYEES = 50
@@ -260,8 +259,22 @@ ABSENT_PROB = 0.01  # Base absent probability
 PROJECT_ID = "causal-port-454215-g1"
 TOPIC_ID = "in-out-system-pubsub"
 
-publisher = pubsub_v1.PublisherClient()
-topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
+# ===== Flow Model =====
+# Shared with backfill_accesslog.py, change them here and both generators follow
+CHECKIN_START, CHECKIN_END = "08:00", "08:30"  # regular check-in grid
+CHECKIN_PEAK = "08:25"
+CHECKIN_PEAK_JITTER = (-10, 10)  # minutes, drawn once per day
+CHECKIN_K1_RANGE = (0.15, 0.25)  # rise before the peak
+CHECKIN_K2_RANGE = (0.8, 1.0)  # fall after the peak
+LATE_END = "09:00"  # late arrivals spread evenly over CHECKIN_END..LATE_END
+CHECKIN_NOISE_MINUTES = 3
+CHECKOUT_START, CHECKOUT_END = "17:30", "19:00"
+CHECKOUT_PEAK = "17:40"
+CHECKOUT_PEAK_JITTER = (-12, 15)
+CHECKOUT_K_RANGE = (0.4, 0.6)
+OVERTIME_END = "21:00"  # overtime spread evenly over CHECKOUT_END..OVERTIME_END
+CHECKOUT_NOISE_MINUTES = 10
+FLOW_SCALE_RANGE = (250, 350)  # A, only scales the flow
 
 # ===== Distribution Functions =====
 def generate_minutes(start_time, end_time):
@@ -274,14 +287,14 @@ def generate_flow_distribution(times, flows, count):
 
 def gen_checkin_times(count, day_seed):
     random.seed(day_seed)
-    peak_offset = random.uniform(-10, 10)  # Restored to ±10 for more variability
-    start = datetime.strptime("08:00", "%H:%M")
-    end = datetime.strptime("08:30", "%H:%M")
-    peak = datetime.strptime("08:25", "%H:%M") + timedelta(minutes=peak_offset)
+    peak_offset = random.uniform(*CHECKIN_PEAK_JITTER)
+    start = datetime.strptime(CHECKIN_START, "%H:%M")
+    end = datetime.strptime(CHECKIN_END, "%H:%M")
+    peak = datetime.strptime(CHECKIN_PEAK, "%H:%M") + timedelta(minutes=peak_offset)
     
-    k1 = random.uniform(0.15, 0.25)
-    k2 = random.uniform(0.8, 1.0)
-    A = random.uniform(250, 350)
+    k1 = random.uniform(*CHECKIN_K1_RANGE)
+    k2 = random.uniform(*CHECKIN_K2_RANGE)
+    A = random.uniform(*FLOW_SCALE_RANGE)
     late_prob = random.uniform(BASE_LATE_PROB * 0.5, BASE_LATE_PROB * 1.5)
     
     times = generate_minutes(start, end)
@@ -292,25 +305,25 @@ def gen_checkin_times(count, day_seed):
     regular_times = generate_flow_distribution(times, flow, num_regular)
     
     num_late = count - num_regular
-    late_start = datetime.strptime("08:30", "%H:%M")
-    late_end = datetime.strptime("09:00", "%H:%M")
+    late_start = datetime.strptime(CHECKIN_END, "%H:%M")
+    late_end = datetime.strptime(LATE_END, "%H:%M")
     late_times = generate_minutes(late_start, late_end)
     late_flow = np.ones(len(late_times))
     late_times = generate_flow_distribution(late_times, late_flow, num_late)
     
     all_times = regular_times + late_times
-    all_times = [t + timedelta(minutes=random.uniform(-3, 3)) for t in all_times]
+    all_times = [t + timedelta(minutes=random.uniform(-CHECKIN_NOISE_MINUTES, CHECKIN_NOISE_MINUTES)) for t in all_times]
     return all_times, late_prob
 
 def gen_checkout_times(count, day_seed):
     random.seed(day_seed + 1)
-    peak_offset = random.uniform(-12, 15)
-    start = datetime.strptime("17:30", "%H:%M")
-    end = datetime.strptime("19:00", "%H:%M")
-    peak = datetime.strptime("17:40", "%H:%M") + timedelta(minutes=peak_offset)
+    peak_offset = random.uniform(*CHECKOUT_PEAK_JITTER)
+    start = datetime.strptime(CHECKOUT_START, "%H:%M")
+    end = datetime.strptime(CHECKOUT_END, "%H:%M")
+    peak = datetime.strptime(CHECKOUT_PEAK, "%H:%M") + timedelta(minutes=peak_offset)
     
-    k = random.uniform(0.4, 0.6)
-    A = random.uniform(250, 350)
+    k = random.uniform(*CHECKOUT_K_RANGE)
+    A = random.uniform(*FLOW_SCALE_RANGE)
     overtime_prob = random.uniform(BASE_OVERTIME_PROB * 0.5, BASE_OVERTIME_PROB * 1.5)
     
     times = generate_minutes(start, end)
@@ -321,14 +334,14 @@ def gen_checkout_times(count, day_seed):
     regular_times = generate_flow_distribution(times, flow, num_regular)
     
     num_overtime = count - num_regular
-    overtime_start = datetime.strptime("19:00", "%H:%M")
-    overtime_end = datetime.strptime("21:00", "%H:%M")
+    overtime_start = datetime.strptime(CHECKOUT_END, "%H:%M")
+    overtime_end = datetime.strptime(OVERTIME_END, "%H:%M")
     overtime_times = generate_minutes(overtime_start, overtime_end)
     overtime_flow = np.ones(len(overtime_times))
     overtime_times = generate_flow_distribution(overtime_times, overtime_flow, num_overtime)
     
     all_times = regular_times + overtime_times
-    all_times = [t + timedelta(minutes=random.uniform(-10, 10)) for t in all_times]
+    all_times = [t + timedelta(minutes=random.uniform(-CHECKOUT_NOISE_MINUTES, CHECKOUT_NOISE_MINUTES)) for t in all_times]
     return all_times, overtime_prob
 
 def get_workdays(start_date, end_date):
@@ -340,8 +353,35 @@ def get_workdays(start_date, end_date):
         current += timedelta(days=1)
     return days
 
+# ===== One Day of Swipes =====
+# Same model as the main program below; benchmarks/loadtest_ingest.py reuses it
+def generate_day_records(day, employee_ids=EMPLOYEE_IDS, gate_in_ids=GATE_IN_IDS, gate_out_ids=GATE_OUT_IDS):
+    random.seed(day.toordinal())
+    absent_prob = random.uniform(ABSENT_PROB * 0.2, ABSENT_PROB * 1.2)
+    present_employees = [emp_id for emp_id in employee_ids if random.random() > absent_prob]
+    num_present = len(present_employees)
+
+    checkin_times, late_prob = gen_checkin_times(num_present, day.toordinal())
+    checkout_times, overtime_prob = gen_checkout_times(num_present, day.toordinal())
+
+    records = []
+    for i, emp_id in enumerate(present_employees):
+        records.append({
+            "employee_id": emp_id,
+            "access_time": datetime.combine(day, checkin_times[i].time()).isoformat(),
+            "gate_id": random.choice(gate_in_ids),
+            "type": "check-in"
+        })
+        records.append({
+            "employee_id": emp_id,
+            "access_time": datetime.combine(day, checkout_times[i].time()).isoformat(),
+            "gate_id": random.choice(gate_out_ids),
+            "type": "check-out"
+        })
+    return records, {"present": num_present, "late_prob": late_prob, "overtime_prob": overtime_prob}
+
 # ===== Publish to Pub/Sub =====
-def publish_to_pubsub(data_dict):
+def publish_to_pubsub(publisher, topic_path, data_dict):
     try:
         json_str = json.dumps(data_dict)
         json_bytes = json_str.encode("utf-8")
@@ -352,50 +392,33 @@ def publish_to_pubsub(data_dict):
         print(f"❌ Failed to send: {data_dict['employee_id']} @ {data_dict['access_time']} | Error: {e}")
 
 # ===== Main Program =====
-start_date = datetime(2025, 4, 1)
-end_date = datetime(2025, 4, 14)
-workdays = get_workdays(start_date, end_date)
+def main():
+    from google.cloud import pubsub_v1
 
-print(f"📅 Processing dates: {workdays}")
-total_sent = 0
+    publisher = pubsub_v1.PublisherClient()
+    topic_path = publisher.topic_path(PROJECT_ID, TOPIC_ID)
 
-# Process each workday
-for day in workdays:
-    print(f"📆 Processing: {day}")
-    
-    random.seed(day.toordinal())
-    absent_prob = random.uniform(ABSENT_PROB * 0.2, ABSENT_PROB * 1.2)
-    present_employees = [emp_id for emp_id in EMPLOYEE_IDS if random.random() > absent_prob]
-    num_present = len(present_employees)
-    
-    checkin_times, late_prob = gen_checkin_times(num_present, day.toordinal())
-    checkout_times, overtime_prob = gen_checkout_times(num_present, day.toordinal())
-    
-    print(f"   - Employees present: {num_present}, Late prob: {late_prob:.3f}, Overtime prob: {overtime_prob:.3f}")
-    
-    for i, emp_id in enumerate(present_employees):  # Iterate over present_employees, not EMPLOYEE_IDS
-        checkin_dt = datetime.combine(day, checkin_times[i].time())
-        gate_in = random.choice(GATE_IN_IDS)
-        data_in = {
-            "employee_id": emp_id,
-            "access_time": checkin_dt.isoformat(),
-            "gate_id": gate_in,
-            "type": "check-in"  # Added type field
-        }
-        publish_to_pubsub(data_in)
-        time.sleep(0.003)
-        
-        checkout_dt = datetime.combine(day, checkout_times[i].time())
-        gate_out = random.choice(GATE_OUT_IDS)
-        data_out = {
-            "employee_id": emp_id,
-            "access_time": checkout_dt.isoformat(),
-            "gate_id": gate_out,
-            "type": "check-out"  # Added type field
-        }
-        publish_to_pubsub(data_out)
-        time.sleep(0.003)
-        
-        total_sent += 2
-
-print(f"🎉 Completed! Sent {total_sent} records to Pub/Sub.")
\ No newline at end of file
+    start_date = datetime(2025, 4, 1)
+    end_date = datetime(2025, 4, 14)
+    workdays = get_workdays(start_date, end_date)
+
+    print(f"📅 Processing dates: {workdays}")
+    total_sent = 0
+
+    # Process each workday
+    for day in workdays:
+        print(f"📆 Processing: {day}")
+
+        records, info = generate_day_records(day)
+        print(f"   - Employees present: {info['present']}, Late prob: {info['late_prob']:.3f}, Overtime prob: {info['overtime_prob']:.3f}")
+
+        for data in records:
+            publish_to_pubsub(publisher, topic_path, data)
+            time.sleep(0.003)
+            total_sent += 1
+
+    print(f"🎉 Completed! Sent {total_sent} records to Pub/Sub.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from flask import Response, request
+from werkzeug.http import quote_etag
+
+# private：有登入資訊，只能存在瀏覽器，不能給中間的 proxy / nginx 存
+# no-cache：可以存，但每次都要帶 If-None-Match 回來確認
+REVALIDATE = "private, no-cache"
+
+
+def long_lived(max_age):
+    # 不會再變的資料（已經結算的月份），max_age 秒內瀏覽器直接用，不用問
+    return f"private, max-age={max_age}"
+
+
+# ETag 用 weak（W/"..."）：是從資料版本算的，不保證 byte 一樣（例如換了 JSON encoder）
+# 前端帶 If-None-Match 而且版本沒變就直接回 304，build 不會被呼叫，重的查詢也不用跑
+# build 回傳 (body, status)，不是 200 的不帶 ETag（403/404 不該被快取）
+def conditional(etag, build, cache_control=REVALIDATE):
+    headers = {
+        "ETag": quote_etag(etag, weak=True),
+        "Cache-Control": cache_control
+    }
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+    body, status = build()
+    if status != 200:
+        return body, status
+    return body, status, headers
+
+
+# body 已經在手上（從快取拿的）的版本
+def conditional_response(body, etag, status=200, cache_control=REVALIDATE):
+    return conditional(etag, lambda: (body, status), cache_control)
@@ -2,10 +2,13 @@ from app.models import db
 
 class AccessLogModel(db.Model):
     __tablename__ = 'Access_Log'
+    __table_args__ = (
+        db.Index('ix_access_log_employee_time', 'employee_id', 'access_time'),  # 查某人某天的逼卡紀錄用
+        db.Index('uq_access_log_dedup_key', 'dedup_key', unique=True),  # Pub/Sub 重送同一則訊息只會留一筆
+    )
 
     log_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     employee_id = db.Column(db.String(50), db.ForeignKey('Employee.employee_id'), nullable=False)
     access_time = db.Column(db.DateTime, nullable=False)
     gate_id = db.Column(db.Integer, db.ForeignKey('Gate.gate_id'), nullable=False)
-
-  
\ No newline at end of file
+    dedup_key = db.Column(db.String(64), nullable=True)  # "msg:<Pub/Sub messageId>"，沒有 messageId 就用內容 hash；舊資料是 NULL
@@ -2,6 +2,9 @@ from app.models import db
 
 class AttendanceRecordModel(db.Model):
     __tablename__ = 'Attendance_Record'
+    __table_args__ = (
+        db.Index('uq_attendance_employee_date', 'employee_id', 'report_date', unique=True),  # 一人一天一筆，bulk upsert 靠它
+    )
 
     record_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     employee_id = db.Column(db.String(50), db.ForeignKey('Employee.employee_id'), nullable=False)
@@ -11,4 +14,11 @@ class AttendanceRecordModel(db.Model):
     check_in_gate = db.Column(db.Integer, db.ForeignKey('Gate.gate_id'), nullable=True)
     check_out_gate = db.Column(db.Integer, db.ForeignKey('Gate.gate_id'), nullable=True)
     total_stay_hours = db.Column(db.Numeric(5, 2), nullable=True)
-    updated_by = db.Column(db.String(50), db.ForeignKey('Employee.employee_id'), nullable=False)
\ No newline at end of file
+    # 遲到/早退在出勤更新時就依班表算好存起來，讀的時候不用再算；舊資料是 NULL，讀的時候才補算
+    is_late = db.Column(db.Boolean, nullable=True)
+    late_minutes = db.Column(db.Integer, nullable=True)
+    is_early_leave = db.Column(db.Boolean, nullable=True)
+    early_leave_minutes = db.Column(db.Integer, nullable=True)
+    # 有配不到的 in 或 out（還沒下班、忘了逼卡、in/out 隔太久），這天的時數只算配成對的那幾段
+    is_incomplete = db.Column(db.Boolean, nullable=True)
+    updated_by = db.Column(db.String(50), db.ForeignKey('Employee.employee_id'), nullable=False)
@@ -0,0 +1,37 @@
+from app.models import db
+
+# 每人每月的出勤彙總，出勤更新時順便維護，月報表直接讀這張不用掃每天的紀錄
+class AttendanceMonthlySummaryModel(db.Model):
+    __tablename__ = 'Attendance_Monthly_Summary'
+    __table_args__ = (
+        db.Index('uq_monthly_summary_employee_month', 'employee_id', 'month_start', unique=True),
+        db.Index('ix_monthly_summary_org_month', 'organization_id', 'month_start'),
+    )
+
+    summary_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    employee_id = db.Column(db.String(50), db.ForeignKey('Employee.employee_id'), nullable=False)
+    organization_id = db.Column(db.String(50), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)  # 該月 1 號
+    days_present = db.Column(db.Integer, nullable=False, default=0)
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    late_minutes = db.Column(db.Integer, nullable=False, default=0)
+    early_leave_count = db.Column(db.Integer, nullable=False, default=0)
+    early_leave_minutes = db.Column(db.Integer, nullable=False, default=0)
+    total_stay_hours = db.Column(db.Numeric(8, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+# 每個組織每月的出勤彙總（由上面那張 GROUP BY 出來）
+class OrganizationMonthlySummaryModel(db.Model):
+    __tablename__ = 'Organization_Monthly_Summary'
+
+    organization_id = db.Column(db.String(50), primary_key=True)
+    month_start = db.Column(db.Date, primary_key=True)
+    employee_count = db.Column(db.Integer, nullable=False, default=0)  # 這個月有出勤紀錄的人數
+    days_present = db.Column(db.Integer, nullable=False, default=0)
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    late_minutes = db.Column(db.Integer, nullable=False, default=0)
+    early_leave_count = db.Column(db.Integer, nullable=False, default=0)
+    early_leave_minutes = db.Column(db.Integer, nullable=False, default=0)
+    total_stay_hours = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
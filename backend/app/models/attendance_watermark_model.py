@@ -0,0 +1,9 @@
+from app.models import db
+
+# 每一天的出勤彙整處理到哪一筆 Access_Log（high-water mark），下次只處理 log_id 比它大的逼卡
+class AttendanceWatermarkModel(db.Model):
+    __tablename__ = 'Attendance_Watermark'
+
+    report_date = db.Column(db.Date, primary_key=True)
+    last_log_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,71 @@
+from sqlalchemy import and_, insert, select, update
+from sqlalchemy.dialects import mysql, sqlite
+from app.models import db
+
+CHUNK_SIZE = 500
+
+
+# 批次 upsert：MySQL 用 INSERT ... ON DUPLICATE KEY UPDATE，sqlite（測試）用 ON CONFLICT DO UPDATE
+# key_columns 必須對應到一個 unique index，rows 裡其他欄位都會被更新（每筆的欄位要一樣）
+# statement 只建一次、每段用 executemany 帶參數；不要 .values(chunk)，那樣每段都要重新 compile 一個超長的 SQL
+def bulk_upsert(model, rows, key_columns):
+    if not rows:
+        return 0
+
+    dialect = db.session.get_bind().dialect.name
+    update_columns = [c for c in rows[0].keys() if c not in key_columns]
+
+    if dialect == "mysql":
+        stmt = mysql.insert(model)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_columns})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+    else:
+        return _per_row_write(model, rows, key_columns, update_columns)
+
+    for i in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(stmt, rows[i:i + CHUNK_SIZE])
+
+    return len(rows)
+
+
+# 批次 insert，key_columns 撞到 unique index 的那幾筆直接跳過（其他錯誤例如 FK 一樣會丟出來）
+# MySQL 不用 INSERT IGNORE（prefix_with("IGNORE")），因為它會連 FK 錯誤一起吞掉；改用 ON DUPLICATE KEY UPDATE key = key
+# 跟 bulk_upsert 一樣 statement 只建一次，每段 executemany
+def bulk_insert_ignore_duplicates(model, rows, key_columns):
+    if not rows:
+        return 0
+
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "mysql":
+        stmt = mysql.insert(model)
+        stmt = stmt.on_duplicate_key_update({c: model.__table__.c[c] for c in key_columns})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).on_conflict_do_nothing(index_elements=key_columns)
+    else:
+        return _per_row_write(model, rows, key_columns, None)
+
+    for i in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(stmt, rows[i:i + CHUNK_SIZE])
+
+    return len(rows)
+
+
+# 其他 dialect（例如 postgresql）沒有共用的 upsert 語法，退回一筆一筆做：先查 key 在不在，不在就 insert
+# update_columns 是 None 代表重複的直接跳過（insert ignore），否則更新那些欄位（upsert）
+# 比批次慢很多，但結果一樣；同一個 transaction 內跑，錯誤照樣丟出來
+def _per_row_write(model, rows, key_columns, update_columns):
+    table = model.__table__
+    for row in rows:
+        match = and_(*[table.c[c] == row[c] for c in key_columns])
+        exists = db.session.execute(select(1).select_from(table).where(match).limit(1)).first()
+        if exists is None:
+            db.session.execute(insert(table).values(row))
+        elif update_columns:
+            db.session.execute(update(table).where(match).values({c: row[c] for c in update_columns}))
+    return len(rows)
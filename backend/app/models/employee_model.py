@@ -2,6 +2,13 @@ from app.models import db
 
 class EmployeeModel(db.Model):
     __tablename__ = 'Employee'
+    __table_args__ = (
+        # 員工清單的 keyset 分頁 + 篩選用
+        db.Index('ix_employee_org_id', 'organization_id', 'employee_id'),
+        db.Index('ix_employee_status_id', 'hire_status', 'employee_id'),
+        db.Index('ix_employee_first_name', 'first_name'),
+        db.Index('ix_employee_last_name', 'last_name'),
+    )
 
     employee_id = db.Column(db.String(50), primary_key=True)
     first_name = db.Column(db.String(50), nullable=False)
@@ -15,4 +22,4 @@ class EmployeeModel(db.Model):
     is_admin = db.Column(db.Boolean, nullable=False)
     updated_at = db.Column(db.DateTime, nullable=False)
     updated_by = db.Column(db.String(50), nullable=False)
-    hashed_password = db.Column(db.String(255), nullable=False)
\ No newline at end of file
+    hashed_password = db.Column(db.String(255), nullable=False)
@@ -0,0 +1,86 @@
+from sqlalchemy import and_, delete, event, func, insert, select
+from sqlalchemy.orm import Session, aliased
+from app.models import db
+from app.models.organization_model import OrganizationModel
+
+
+# Organization 階層的 closure table：每一對 (祖先, 子孫) 一筆，depth 0 是自己
+# 「X 底下有哪些部門」「Y 在不在 X 底下」「Y 在第幾層」都變成一次走 index 的查詢
+# 是從 parent_department_id 算出來的，不加 FK；Organization 有新增/刪除/改 parent 的 flush 之後整張重建
+# 不經過 ORM 的寫入（seed SQL、手動 INSERT）不會觸發重建，讀之前用 organization_closure_is_fresh 檢查
+# 過期的話讀的路徑改用 build_closure_rows 在記憶體算，重建只在 init-db / flask rebuild-org-closure 做
+class OrganizationClosureModel(db.Model):
+    __tablename__ = 'Organization_Closure'
+    __table_args__ = (
+        db.Index('ix_organization_closure_descendant', 'descendant_id', 'depth'),  # 查某部門的所有上層
+    )
+
+    ancestor_id = db.Column(db.String(50), primary_key=True)
+    descendant_id = db.Column(db.String(50), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+
+def build_closure_rows(parents):
+    # parents: {organization_id: parent_department_id}
+    # parent 不存在或自己指自己就當 root（跟 get_organization_tree 一樣），遇到環就停
+    rows = []
+    for organization_id in parents:
+        seen = {organization_id}
+        rows.append({"ancestor_id": organization_id, "descendant_id": organization_id, "depth": 0})
+        current, depth = parents[organization_id], 1
+        while current in parents and current not in seen:
+            rows.append({"ancestor_id": current, "descendant_id": organization_id, "depth": depth})
+            seen.add(current)
+            current, depth = parents[current], depth + 1
+    return rows
+
+
+def rebuild_organization_closure(conn):
+    # 組織只有幾十~幾百個，整張重算比逐筆維護簡單也不容易錯
+    parents = dict(conn.execute(select(OrganizationModel.organization_id, OrganizationModel.parent_department_id)).all())
+    rows = build_closure_rows(parents)
+    conn.execute(delete(OrganizationClosureModel))
+    if rows:
+        conn.execute(insert(OrganizationClosureModel), rows)
+    return len(rows)
+
+
+def organization_closure_is_fresh(conn):
+    # 一個 SELECT 幾個 COUNT 比對 closure 跟 Organization：
+    #   depth 0 剛好是每個組織自己一筆；depth 1 剛好是每個組織的 parent_department_id
+    # 更深的那幾層是 rebuild 從 parent 推出來的，這兩層對得上就當作整張是對的
+    closure, org, parent = OrganizationClosureModel, OrganizationModel, aliased(OrganizationModel)
+    counts = conn.execute(select(
+        select(func.count()).select_from(org).scalar_subquery(),
+        select(func.count()).select_from(closure).where(closure.depth == 0).scalar_subquery(),
+        select(func.count()).select_from(closure).join(org, and_(
+            org.organization_id == closure.descendant_id, closure.ancestor_id == closure.descendant_id
+        )).where(closure.depth == 0).scalar_subquery(),
+        select(func.count()).select_from(org).join(parent, parent.organization_id == org.parent_department_id).where(
+            org.parent_department_id != org.organization_id  # parent 不存在、指自己都當 root，跟 build_closure_rows 一樣
+        ).scalar_subquery(),
+        select(func.count()).select_from(closure).where(closure.depth == 1).scalar_subquery(),
+        select(func.count()).select_from(closure).join(org, and_(
+            org.organization_id == closure.descendant_id, org.parent_department_id == closure.ancestor_id
+        )).where(closure.depth == 1).scalar_subquery()
+    )).one()
+    organizations, selves, matched_selves, parented, edges, matched_edges = counts
+    return organizations == selves == matched_selves and parented == edges == matched_edges
+
+
+def _hierarchy_changed(session):
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, OrganizationModel):
+            return True
+    # 只改名字、換主管不用重建
+    for obj in session.dirty:
+        if isinstance(obj, OrganizationModel) and db.inspect(obj).attrs.parent_department_id.history.has_changes():
+            return True
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_organization_closure(session, flush_context):
+    if _hierarchy_changed(session):
+        # 跟這次的寫入同一個 transaction，commit 失敗會一起 rollback
+        rebuild_organization_closure(session.connection())
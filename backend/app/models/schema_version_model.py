@@ -0,0 +1,9 @@
+from app.models import db
+
+# 只有一筆：目前資料庫 schema 的版本，開機時讀這筆確認有沒有跑過 migration
+class SchemaVersionModel(db.Model):
+    __tablename__ = 'Schema_Version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,17 @@
+from app.models import db
+
+# 上下班時間：可以設在組織（下層部門沒設就沿用上層的）或個人（優先）上，都沒設就用 config 的預設
+# 下班時間比上班早就是跨午夜的夜班
+class WorkScheduleModel(db.Model):
+    __tablename__ = 'Work_Schedule'
+    __table_args__ = (
+        db.Index('uq_work_schedule_scope', 'scope', 'scope_id', unique=True),
+    )
+
+    schedule_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    scope = db.Column(db.String(20), nullable=False)  # "organization" / "employee"
+    scope_id = db.Column(db.String(50), nullable=False)  # organization_id 或 employee_id
+    work_start = db.Column(db.Time, nullable=False)
+    work_end = db.Column(db.Time, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    updated_by = db.Column(db.String(50), nullable=False)
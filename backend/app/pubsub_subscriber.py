@@ -0,0 +1,133 @@
+import os
+import signal
+import threading
+import time
+from app.models import db
+from app.services.accesslog_service import AccessLogService
+
+
+# 用 pull 的方式從 Pub/Sub 拿逼卡紀錄，不用靠 push 一則訊息打一次 HTTP
+# 一次 pull 最多 max_messages 則 → 一次 multi-row INSERT → commit 成功才 ack
+# 這批還沒寫完不會再 pull 下一批（flow control），記憶體裡最多就一批
+# client 只要有 pull / acknowledge / modify_ack_deadline（跟 google 的 SubscriberClient 一樣），測試可以塞假的 broker
+class AccessLogPullWorker:
+    def __init__(self, client, subscription_path, max_messages=500, idle_seconds=1.0, flush_fn=None, dedup_cache=None):
+        self.client = client
+        self.subscription_path = subscription_path
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self._flush_fn = flush_fn or AccessLogService.add_access_logs_bulk
+        self.dedup_cache = dedup_cache
+        self._stop = threading.Event()
+
+        self.stats = {"batches": 0, "acked": 0, "nacked": 0, "malformed": 0, "duplicates": 0}
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                handled = self.pull_once()
+            except Exception as e:
+                print("ERROR: pubsub pull failed:", e)
+                handled = 0
+            if not handled:
+                self._stop.wait(self.idle_seconds)
+
+    def pull_once(self):
+        response = self.client.pull(
+            request={"subscription": self.subscription_path, "max_messages": self.max_messages},
+            timeout=30
+        )
+        received = list(response.received_messages)
+        if received:
+            self.handle(received)
+        return len(received)
+
+    def handle(self, received):
+        rows, row_ack_ids, drop_ack_ids, duplicate_ack_ids = [], [], [], []
+        for item in received:
+            try:
+                row, error = AccessLogService.parse_pubsub_data(item.message.data, item.message.message_id)
+            except Exception as e:
+                row, error = None, ({"error": str(e)}, 400)
+            if error:
+                # 格式錯的訊息重送也不會好，記下來直接 ack 掉，不然會一直被重送
+                print(f"ERROR: malformed pubsub message {item.message.message_id}: {error[0]}")
+                drop_ack_ids.append(item.ack_id)
+                continue
+            if self.dedup_cache and self.dedup_cache.seen(row["dedup_key"]):
+                duplicate_ack_ids.append(item.ack_id)
+                continue
+            rows.append(row)
+            row_ack_ids.append(item.ack_id)
+
+        ack_ids, nack_ids = drop_ack_ids + duplicate_ack_ids, []
+        written = []
+        if rows:
+            body, status = self._flush_fn(rows)
+            if status < 300:
+                ack_ids.extend(row_ack_ids)
+                written = rows
+            else:
+                # 整批失敗就逐筆重寫，只 nack 寫不進去的那幾筆讓 Pub/Sub 重送
+                for row, ack_id in zip(rows, row_ack_ids):
+                    _, row_status = self._flush_fn([row])
+                    if row_status < 300:
+                        ack_ids.append(ack_id)
+                        written.append(row)
+                    else:
+                        nack_ids.append(ack_id)
+        if self.dedup_cache:
+            for row in written:
+                self.dedup_cache.add(row["dedup_key"])
+
+        if ack_ids:
+            self.client.acknowledge(request={"subscription": self.subscription_path, "ack_ids": ack_ids})
+        if nack_ids:
+            self.client.modify_ack_deadline(request={
+                "subscription": self.subscription_path,
+                "ack_ids": nack_ids,
+                "ack_deadline_seconds": 0
+            })
+
+        self.stats["batches"] += 1
+        self.stats["acked"] += len(ack_ids)
+        self.stats["nacked"] += len(nack_ids)
+        self.stats["malformed"] += len(drop_ack_ids)
+        self.stats["duplicates"] += len(duplicate_ack_ids)
+        db.session.remove()
+
+
+def main():
+    from app import create_app
+    from app.services.dedup_cache import get_dedup_cache
+
+    app = create_app(config_name=os.getenv("APP_CONFIG", "production"))
+    if not app.config["PUBSUB_PROJECT_ID"]:
+        raise RuntimeError("PUBSUB_PROJECT_ID is not set; refusing to start the pull worker.")
+
+    from google.cloud import pubsub_v1
+    client = pubsub_v1.SubscriberClient()
+    subscription_path = client.subscription_path(app.config["PUBSUB_PROJECT_ID"], app.config["PUBSUB_SUBSCRIPTION_ID"])
+
+    with app.app_context():
+        worker = AccessLogPullWorker(
+            client,
+            subscription_path,
+            max_messages=app.config["PUBSUB_PULL_MAX_MESSAGES"],
+            idle_seconds=app.config["PUBSUB_PULL_IDLE_SECONDS"],
+            dedup_cache=get_dedup_cache()
+        )
+        signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+        signal.signal(signal.SIGINT, lambda *_: worker.stop())
+
+        print(f"🚀 pull worker 開始：{subscription_path}")
+        started = time.monotonic()
+        worker.run()
+        print(f"🛑 pull worker 停止（{time.monotonic() - started:.0f}s）：{worker.stats}")
+
+
+if __name__ == "__main__":
+    main()
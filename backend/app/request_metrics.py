@@ -0,0 +1,143 @@
+import threading
+import time
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from app.models import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+# 每個 request 的 SQL 次數、SQL 時間、整個 handler 的時間，依 Flask-RESTful 的 Resource class 分開統計
+# 用 Prometheus text format 吐出來（GET /api/v1/metrics），不另外裝 prometheus_client
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}  # (resource, method, status) -> {"latency", "queries", "sql_seconds"}
+
+    def observe(self, resource, method, status, seconds, queries, sql_seconds):
+        key = (resource, method, status)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "latency": _Histogram(LATENCY_BUCKETS),
+                    "queries": _Histogram(QUERY_COUNT_BUCKETS),
+                    "sql_seconds": 0.0
+                }
+            series["latency"].observe(seconds)
+            series["queries"].observe(queries)
+            series["sql_seconds"] += sql_seconds
+
+    def render(self):
+        lines = []
+        with self._lock:
+            series = sorted(self._series.items())
+
+            lines.append("# HELP http_request_duration_seconds Handler time per request, by resource class.")
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for labels, s in series:
+                lines.extend(_render_histogram("http_request_duration_seconds", labels, s["latency"]))
+
+            lines.append("# HELP http_request_sql_queries SQL statements executed per request, by resource class.")
+            lines.append("# TYPE http_request_sql_queries histogram")
+            for labels, s in series:
+                lines.extend(_render_histogram("http_request_sql_queries", labels, s["queries"]))
+
+            lines.append("# HELP http_request_sql_seconds_total Time spent in SQL, by resource class.")
+            lines.append("# TYPE http_request_sql_seconds_total counter")
+            for labels, s in series:
+                lines.append(f"http_request_sql_seconds_total{{{_labels(labels)}}} {s['sql_seconds']:.6f}")
+        return lines
+
+
+def _labels(labels, **extra):
+    resource, method, status = labels
+    pairs = [("resource", resource), ("method", method), ("status", str(status))] + list(extra.items())
+    return ",".join(f'{k}="{v}"' for k, v in pairs)
+
+
+def _render_histogram(name, labels, histogram):
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f"{name}_bucket{{{_labels(labels, le=bound)}}} {count}")
+    lines.append(f"{name}_bucket{{{_labels(labels, le='+Inf')}}} {histogram.count}")
+    lines.append(f"{name}_sum{{{_labels(labels)}}} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{{{_labels(labels)}}} {histogram.count}")
+    return lines
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is not None and has_request_context() and "sql_queries" in g:
+        g.sql_queries += 1
+        g.sql_seconds += time.perf_counter() - started
+
+
+def _resource_name():
+    # Flask-RESTful 的 view function 上有 view_class，就是 initialize_routes 註冊的那個 Resource
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    view_class = getattr(view, "view_class", None)
+    if view_class is not None:
+        return view_class.__name__
+    return request.endpoint or "unmatched"
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_seconds = 0.0
+
+
+def _finish_request(response):
+    if "request_started" not in g:
+        return response
+
+    elapsed = time.perf_counter() - g.request_started
+    get_request_metrics().observe(_resource_name(), request.method, response.status_code, elapsed, g.sql_queries, g.sql_seconds)
+
+    # 瀏覽器 DevTools 的 Timing 分頁看得到
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={g.sql_seconds * 1000:.2f};desc="{g.sql_queries} queries", app;dur={elapsed * 1000:.2f}'
+    )
+    return response
+
+
+def init_request_metrics(app: Flask):
+    app.extensions["request_metrics"] = RequestMetrics()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return app.extensions["request_metrics"]
+
+
+def get_request_metrics():
+    return current_app.extensions["request_metrics"]
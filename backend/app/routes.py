@@ -1,9 +1,11 @@
 from flask_restful import Api
-from app.controllers.accesslog_controller import GetEmployeeAccessLog, GetPersonalAccessLog, CreatePersonalAccessLog
+from app.controllers.accesslog_controller import GetEmployeeAccessLog, GetPersonalAccessLog, CreatePersonalAccessLog, AccessLogIngestStats, ExportAccessLogs
 from app.controllers.auth_controller import Auth_Login
 from app.controllers.organization_controller import OrganizationList, GetOrganization, GetOrganizationTree, DeleteOrganization
-from app.controllers.employee_controller import EmployeeResource, ResetPasswordResource, EmployeeAddingResource, EmployeeEditingResource, EmployeeListResource
-from app.controllers.attendance_controller import UpdateAttendance, EmployeeAttendanceController, OrganizationAttendanceController
+from app.controllers.employee_controller import EmployeeResource, ResetPasswordResource, EmployeeAddingResource, EmployeeEditingResource, EmployeeListResource, EmployeeImportResource
+from app.controllers.attendance_controller import UpdateAttendance, EmployeeAttendanceController, OrganizationAttendanceController, EmployeeAttendanceSummaryController, OrganizationAttendanceSummaryController
+from app.controllers.metrics_controller import DatabasePoolMetrics, PrometheusMetrics
+from app.controllers.work_schedule_controller import WorkScheduleList, WorkScheduleResource
 
 BASE_ROUTE = "/api/v1"
 
@@ -17,14 +19,24 @@ def initialize_routes(api: Api):
     api.add_resource(DeleteOrganization, f"{BASE_ROUTE}/organizations/<string:organization_id>")
 
     api.add_resource(GetPersonalAccessLog, f"{BASE_ROUTE}/access-logs")  # 去抓自己的log資料
+    api.add_resource(ExportAccessLogs, f"{BASE_ROUTE}/access-logs/export")  # 匯出一段期間的逼卡紀錄（NDJSON/CSV 串流）
     api.add_resource(CreatePersonalAccessLog, f"{BASE_ROUTE}/pubsub/access-logs")  # 模擬逼卡的時候 先丟到pubsub topic 然後我們8080是sub才在這邊接收
+    api.add_resource(AccessLogIngestStats, f"{BASE_ROUTE}/pubsub/access-logs/stats")  # 批次寫入的 batch 大小、flush 延遲統計
 
     api.add_resource(EmployeeResource, f"{BASE_ROUTE}/employees/<string:employee_id>")  # 取得單一員工資訊
     api.add_resource(ResetPasswordResource, f"{BASE_ROUTE}/employees/reset-password")  # 重設密碼
     api.add_resource(EmployeeAddingResource, f"{BASE_ROUTE}/employees")  # 新增員工資訊
+    api.add_resource(EmployeeImportResource, f"{BASE_ROUTE}/employees/import")  # 批次匯入員工（CSV / JSON）
     api.add_resource(EmployeeEditingResource, f"{BASE_ROUTE}/employees/<string:employee_id>")  # 取得單一員工資訊
     api.add_resource(EmployeeListResource, f"{BASE_ROUTE}/employee-list") # 取得所有員工資訊
 
     api.add_resource(UpdateAttendance, f"{BASE_ROUTE}/attendance/update")  # 更新考勤紀錄
     api.add_resource(EmployeeAttendanceController, f"{BASE_ROUTE}/attendance/employees/<string:employee_id>")  # 取得當前登入員工的出勤紀錄
-    api.add_resource(OrganizationAttendanceController, f"{BASE_ROUTE}/attendance/organizations/<string:organization_id>")  # 取得組織出勤紀錄
\ No newline at end of file
+    api.add_resource(OrganizationAttendanceController, f"{BASE_ROUTE}/attendance/organizations/<string:organization_id>")  # 取得組織出勤紀錄
+    api.add_resource(EmployeeAttendanceSummaryController, f"{BASE_ROUTE}/attendance/summary/employees/<string:employee_id>")  # 員工月彙總（遲到、早退、總時數）
+    api.add_resource(OrganizationAttendanceSummaryController, f"{BASE_ROUTE}/attendance/summary/organizations/<string:organization_id>")  # 組織月彙總
+    api.add_resource(WorkScheduleList, f"{BASE_ROUTE}/work-schedules")  # 所有班表
+    api.add_resource(WorkScheduleResource, f"{BASE_ROUTE}/work-schedules/<string:scope>/<string:scope_id>")  # 設定/刪除組織或個人的上下班時間
+
+    api.add_resource(DatabasePoolMetrics, f"{BASE_ROUTE}/metrics/db-pool")  # 連線池 checkout、overflow、等待時間
+    api.add_resource(PrometheusMetrics, f"{BASE_ROUTE}/metrics")  # 每個 Resource 的 latency、SQL 次數/時間（Prometheus 格式）
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import datetime
+from flask import Flask, current_app
+from app.services.accesslog_service import AccessLogService
+
+# 一筆等待寫入的逼卡紀錄，送出的 request thread 會卡在 done 上直到這筆真的 commit
+class _PendingLog:
+    __slots__ = ("row", "done", "result")
+
+    def __init__(self, row):
+        self.row = row
+        self.done = threading.Event()
+        self.result = None
+
+
+# 把同一個時間窗內的 Pub/Sub push 合併成一次 multi-row INSERT
+# 沒有 leader 的時候進來的 request 當 leader 替大家寫入；只有自己一筆就馬上寫，有別人在排隊才等湊批次
+# 每個 request 都要等自己那筆 commit 完才回應，Pub/Sub 收到 2xx 才算 ack
+# 要有多個 thread 同時在 submit 才湊得成批（gunicorn --threads），sync worker 一次一個 request 就是一筆一筆寫
+class AccessLogBuffer:
+    def __init__(self, max_batch_size=100, max_wait_ms=20, ack_timeout=10, max_leader_rounds=4, flush_fn=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.ack_timeout = ack_timeout
+        self.max_leader_rounds = max_leader_rounds
+        self._flush_fn = flush_fn or AccessLogService.add_access_logs_bulk
+        self._lock = threading.Lock()
+        self._batch_ready = threading.Condition(self._lock)  # leader 等湊滿一批
+        self._progress = threading.Condition(self._lock)  # 其他人等自己那筆寫完，或是 leader 交棒
+        self._pending = []
+        self._leader_active = False
+
+        # 統計數字（batch 大小、flush 延遲）
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._failed_batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._last_batch = 0
+        self._flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+
+    def submit(self, employee_id, access_time, gate_id, dedup_key=None):
+        try:
+            if isinstance(access_time, str):
+                access_time = datetime.fromisoformat(access_time)
+        except ValueError:
+            return {"error": "Invalid date format."}, 400
+
+        entry = _PendingLog({
+            "employee_id": employee_id,
+            "access_time": access_time,
+            "gate_id": gate_id,
+            "dedup_key": dedup_key
+        })
+        deadline = time.monotonic() + self.ack_timeout
+
+        with self._lock:
+            self._pending.append(entry)
+            if len(self._pending) >= self.max_batch_size:
+                self._batch_ready.notify()
+
+        while True:
+            with self._lock:
+                while not entry.done.is_set() and self._leader_active:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return {"error": "Timed out waiting for access log to be written."}, 503
+                    self._progress.wait(remaining)
+                if entry.done.is_set():
+                    return entry.result
+                # 沒有 leader 而且自己那筆還沒寫：自己當 leader
+                self._leader_active = True
+            self._lead()
+
+    def _lead(self):
+        # 最多寫 max_leader_rounds 批就交棒給還在等的人，一個 push request 不會一直替別人寫到超過 ack deadline
+        try:
+            for _ in range(self.max_leader_rounds):
+                with self._lock:
+                    if not self._pending:
+                        break
+                    if len(self._pending) > 1:
+                        deadline = time.monotonic() + self.max_wait
+                        while len(self._pending) < self.max_batch_size:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                break
+                            self._batch_ready.wait(remaining)
+                    batch = self._pending[:self.max_batch_size]
+                    del self._pending[:self.max_batch_size]
+
+                self._flush(batch)
+        finally:
+            with self._lock:
+                self._leader_active = False
+                self._progress.notify_all()
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        results = None
+        try:
+            results = self._write(batch)
+        except Exception as e:
+            print("ERROR: access log batch flush failed:", e)
+        finally:
+            if results is None:
+                results = [({"error": "Failed to write access log."}, 500)] * len(batch)
+            with self._lock:
+                for entry, result in zip(batch, results):
+                    entry.result = result
+                    entry.done.set()
+                self._progress.notify_all()
+            self._record(len(batch), time.perf_counter() - started, all(status < 300 for _, status in results))
+
+    def _write(self, batch):
+        body, status = self._flush_fn([entry.row for entry in batch])
+        if status < 300:
+            return [({"message": "Access log added successfully."}, 201)] * len(batch)
+
+        # 整批失敗（例如某筆 gate_id 不存在撞到 FK），改成逐筆寫入，只讓有問題的那幾筆回 error 給 Pub/Sub 重送
+        if len(batch) == 1:
+            return [(body, status)]
+        return [self._flush_fn([entry.row]) for entry in batch]
+
+    def _record(self, size, seconds, ok):
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += size
+            self._last_batch = size
+            self._max_batch = max(self._max_batch, size)
+            self._flush_seconds += seconds
+            self._max_flush_seconds = max(self._max_flush_seconds, seconds)
+            if not ok:
+                self._failed_batches += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches_flushed": self._batches,
+                "failed_batches": self._failed_batches,
+                "rows_flushed": self._rows,
+                "last_batch_size": self._last_batch,
+                "max_batch_size": self._max_batch,
+                "avg_batch_size": round(self._rows / self._batches, 2) if self._batches else 0,
+                "avg_flush_ms": round(self._flush_seconds / self._batches * 1000, 3) if self._batches else 0,
+                "max_flush_ms": round(self._max_flush_seconds * 1000, 3),
+                "pending": len(self._pending)
+            }
+
+
+def init_accesslog_buffer(app: Flask):
+    app.extensions["accesslog_buffer"] = AccessLogBuffer(
+        max_batch_size=app.config["ACCESSLOG_BATCH_SIZE"],
+        max_wait_ms=app.config["ACCESSLOG_BATCH_WAIT_MS"],
+        ack_timeout=app.config["ACCESSLOG_ACK_TIMEOUT"],
+        max_leader_rounds=app.config["ACCESSLOG_LEADER_MAX_ROUNDS"]
+    )
+    return app.extensions["accesslog_buffer"]
+
+
+def get_accesslog_buffer():
+    return current_app.extensions["accesslog_buffer"]
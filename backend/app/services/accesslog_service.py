@@ -1,42 +1,83 @@
 from app.models import db
 from app.models.accesslog_model import AccessLogModel
-from app.models.gate_model import GateModel
-from sqlalchemy import func
-from datetime import datetime
+from app.models.employee_model import EmployeeModel
+from app.models.bulk import bulk_insert_ignore_duplicates
+from app.services.gate_registry import get_gate_registry
+from app.serializers import access_log_entry, access_log_export, dumps
+from datetime import datetime, timedelta
+import csv
+import hashlib
+import io
+import json
 import traceback
 
+EXPORT_COLUMNS = ["log_id", "employee_id", "access_time", "gate_id", "gate_name", "direction", "gate_type"]
+EXPORT_CHUNK_SIZE = 1000
+
 class AccessLogService:
+    @staticmethod
+    def parse_pubsub_data(data, message_id=None):
+        # Pub/Sub 訊息 data（JSON bytes）轉成一筆 Access_Log row，push endpoint 和 pull worker 共用
+        # 回傳 (row, None) 或 (None, (error body, 400))；JSON 壞掉會直接丟 exception
+        # row["dedup_key"] 用 messageId，重送的訊息 messageId 一樣，寫入時會被 unique index 擋掉
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        log_data = json.loads(data)
+
+        employee_id = log_data.get("employee_id")
+        access_time = log_data.get("access_time")
+        gate_id = log_data.get("gate_id")
+
+        if not employee_id or not access_time or not gate_id:
+            return None, ({"error": "Missing fields in pubsub data"}, 400)
+
+        try:
+            access_time = datetime.fromisoformat(access_time)
+        except (TypeError, ValueError):
+            return None, ({"error": "Invalid date format."}, 400)
+
+        return {
+            "employee_id": employee_id,
+            "access_time": access_time,
+            "gate_id": gate_id,
+            "dedup_key": AccessLogService.dedup_key(message_id, employee_id, access_time, gate_id)
+        }, None
+
+    @staticmethod
+    def dedup_key(message_id, employee_id, access_time, gate_id):
+        if message_id:
+            return f"msg:{message_id}"
+        content = f"{employee_id}|{access_time.isoformat()}|{gate_id}"
+        return "sha1:" + hashlib.sha1(content.encode("utf-8")).hexdigest()
+
     @staticmethod
     def get_employee_logs_by_employeeid_and_date(employee_id, date_str):
         try:
             # Parse the date string
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
+            day_start = datetime.strptime(date_str, "%Y-%m-%d")
+            day_end = day_start + timedelta(days=1)
 
-            # Query the database
+            # Query the database（gate 資訊從 gate registry 補，不用 JOIN Gate）
             results = db.session.query(
                 AccessLogModel.log_id,
                 AccessLogModel.employee_id,
                 AccessLogModel.access_time,
-                AccessLogModel.gate_id,
-                GateModel.gate_name,
-                GateModel.direction,
-                GateModel.gate_type
-            ).join(GateModel, AccessLogModel.gate_id == GateModel.gate_id
+                AccessLogModel.gate_id
             ).filter(
                 AccessLogModel.employee_id == employee_id,
-                func.date(AccessLogModel.access_time) == date_obj
-            ).all()
+                # 用 [day, day+1) 的範圍比較，不要包 DATE()，才吃得到 (employee_id, access_time) index
+                AccessLogModel.access_time >= day_start,
+                AccessLogModel.access_time < day_end
+            ).order_by(AccessLogModel.access_time).all()
 
             # Process the results
+            gates = get_gate_registry()
             logs = []
             for row in results:
-                logs.append({
-                    "log_id": row.log_id,
-                    "access_time": row.access_time.isoformat(),
-                    "direction": row.direction,
-                    "gate_name": row.gate_name,
-                    "gate_type": row.gate_type
-                })
+                gate = gates.get(row.gate_id)
+                if not gate:
+                    continue  # 跟原本 INNER JOIN 一樣，不認識的 gate 不回傳
+                logs.append(access_log_entry(row, gate))
 
             return logs, 200
 
@@ -72,3 +113,73 @@ class AccessLogService:
             db.session.rollback()
             print("ERROR:", traceback.format_exc())
             return {"error": "An unexpected error occurred.", "details": str(e)}, 500
+
+    @staticmethod
+    def add_access_logs_bulk(rows):
+        # rows: [{"employee_id", "access_time", "gate_id", "dedup_key"}, ...]，一次 multi-row INSERT + 一次 commit
+        # dedup_key 已經寫過的（Pub/Sub 重送）直接跳過，不算錯誤
+        try:
+            rows = [{**row, "dedup_key": row.get("dedup_key")} for row in rows]
+            bulk_insert_ignore_duplicates(AccessLogModel, rows, ["dedup_key"])
+            db.session.commit()
+
+            return {"message": "Access logs added successfully.", "count": len(rows)}, 201
+
+        except Exception as e:
+            db.session.rollback()
+            print("ERROR:", traceback.format_exc())
+            return {"error": "An unexpected error occurred.", "details": str(e)}, 500
+
+    @staticmethod
+    def export_access_logs(start_str, end_str, fmt="ndjson", organization_id=None, gate_id=None):
+        # 回傳 (generator, 200)，generator 一段一段吐出 NDJSON / CSV 文字
+        # 用 server-side cursor 一次拿 EXPORT_CHUNK_SIZE 筆，不會把整個區間的資料放進 list，記憶體不會跟著區間變大
+        try:
+            start_dt = datetime.strptime(start_str, "%Y-%m-%d")
+            end_dt = datetime.strptime(end_str, "%Y-%m-%d") + timedelta(days=1)  # end 那天也包含
+        except (TypeError, ValueError):
+            return {"error": "Invalid date format. Use YYYY-MM-DD."}, 400
+        if end_dt <= start_dt:
+            return {"error": "end must not be earlier than start."}, 400
+        if fmt not in ("ndjson", "csv"):
+            return {"error": "format must be ndjson or csv."}, 400
+
+        query = db.session.query(
+            AccessLogModel.log_id,
+            AccessLogModel.employee_id,
+            AccessLogModel.access_time,
+            AccessLogModel.gate_id
+        ).filter(
+            AccessLogModel.access_time >= start_dt,
+            AccessLogModel.access_time < end_dt
+        )
+        if organization_id:
+            query = query.join(EmployeeModel, AccessLogModel.employee_id == EmployeeModel.employee_id) \
+                .filter(EmployeeModel.organization_id == organization_id)
+        if gate_id:
+            query = query.filter(AccessLogModel.gate_id == gate_id)
+        query = query.order_by(AccessLogModel.access_time, AccessLogModel.log_id)
+
+        gates = get_gate_registry()
+
+        def generate():
+            result = db.session.execute(query.statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            if fmt == "csv":
+                yield ",".join(EXPORT_COLUMNS) + "\n"
+            for rows in result.partitions():
+                yield AccessLogService._format_export_chunk(rows, fmt, gates)
+
+        return generate(), 200
+
+    @staticmethod
+    def _format_export_chunk(rows, fmt, gates):
+        unknown = {"gate_name": None, "direction": None, "gate_type": None}
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            for row in rows:
+                gate = gates.get(row.gate_id) or unknown
+                writer.writerow([row.log_id, row.employee_id, row.access_time.isoformat(), row.gate_id, gate["gate_name"], gate["direction"], gate["gate_type"]])
+            return buffer.getvalue()
+
+        return "".join(dumps(access_log_export(row, gates.get(row.gate_id) or unknown)) + "\n" for row in rows)
@@ -1,13 +1,22 @@
-from flask import request
+from flask import request, current_app
 from datetime import datetime, timedelta
+import time
+from itertools import groupby
 from app.models import db
-from app.models.gate_model import GateModel
 from app.models.attendance_model import AttendanceRecordModel
 from app.models.accesslog_model import AccessLogModel
-from sqlalchemy import func
+from app.models.attendance_watermark_model import AttendanceWatermarkModel
+from app.models.bulk import bulk_upsert
+from app.serializers import ATTENDANCE_ROW_COLUMNS, attendance_records
+from app.services.gate_registry import get_gate_registry
+from app.services.shift_pairing import ShiftRules
+from app.services.work_schedule_service import WorkScheduleService
+from app.services.attendance_summary_service import AttendanceSummaryService, month_start_of, next_month_start
+from app.services.organization_service import OrganizationService
 from app.models.employee_model import EmployeeModel
 from app.models.organization_model import OrganizationModel
-from sqlalchemy.orm import aliased
+
+BACKFILL_FETCH_SIZE = 5000
 
 def update_attendance_service():
     
@@ -16,119 +25,160 @@ def update_attendance_service():
     start_dt = datetime.combine(target_date, datetime.min.time())  
     end_dt = datetime.combine(target_date + timedelta(days=1), datetime.min.time())  
 
-    # JOIN Access_Log 和 Gate，並依 gate direction 分出 in/out
-    in_subquery = (
-    db.session.query(
-        AccessLogModel.employee_id,
-        AccessLogModel.access_time,
-        AccessLogModel.gate_id,
-        GateModel.direction,
-        func.row_number().over(
-            partition_by=AccessLogModel.employee_id,
-            order_by=AccessLogModel.access_time.asc()
-        ).label("rn")
-    )
-    .join(GateModel, AccessLogModel.gate_id == GateModel.gate_id)
-    .filter(
-            AccessLogModel.access_time >= start_dt,
-            AccessLogModel.access_time < end_dt,
-            GateModel.direction == 'in'
-        )
-    ).subquery()
+    # 上次處理到哪一筆 log，只有今天有新逼卡的人需要重算（沒有新逼卡就什麼都不用做）
+    # 註：如果有 transaction 拿到較小的 log_id 卻比較晚 commit，那筆會被跳過，要靠整天重算補回來
+    watermark = db.session.get(AttendanceWatermarkModel, target_date)
+    last_log_id = watermark.last_log_id if watermark else 0
 
-    # 只取 rn = 1 的那一筆
-    in_logs = (
-        db.session.query(
-            in_subquery.c.employee_id,
-            in_subquery.c.access_time.label("check_in_time"),
-            in_subquery.c.gate_id.label("check_in_gate")
-        )
-        .filter(in_subquery.c.rn == 1)
-        .all()
-    )
-
-    #最晚的 out
-    # Subquery with row_number for OUT
-    out_subquery = (
+    # 只查 Access_Log，gate direction 從 gate registry 拿來分 in/out
+    new_logs = (
         db.session.query(
+            AccessLogModel.log_id,
             AccessLogModel.employee_id,
             AccessLogModel.access_time,
-            AccessLogModel.gate_id,
-            GateModel.direction,
-            func.row_number().over(
-                partition_by=AccessLogModel.employee_id,
-                order_by=AccessLogModel.access_time.desc()
-            ).label("rn")
+            AccessLogModel.gate_id
         )
-        .join(GateModel, AccessLogModel.gate_id == GateModel.gate_id)
         .filter(
+            AccessLogModel.log_id > last_log_id,
             AccessLogModel.access_time >= start_dt,
-            AccessLogModel.access_time < end_dt,
-            GateModel.direction == 'out'
-            )
-        ).subquery()
-
-    # 只取 rn = 1 的那一筆
-    out_logs = (
-        db.session.query(
-            out_subquery.c.employee_id,
-            out_subquery.c.access_time.label("check_out_time"),
-            out_subquery.c.gate_id.label("check_out_gate")
+            AccessLogModel.access_time < end_dt
         )
-        .filter(out_subquery.c.rn == 1)
+        .order_by(AccessLogModel.log_id)
         .all()
     )
 
-    # 轉成 dict for merge
-    in_dict = {row.employee_id: row for row in in_logs}
-    out_dict = {row.employee_id: row for row in out_logs}
-
-    # Step 4: 合併兩邊結果並更新 Attendance_Record
-    all_employees = set(in_dict.keys()) | set(out_dict.keys())
-    for employee_id in all_employees:
-        check_in_time = in_dict.get(employee_id).check_in_time if employee_id in in_dict else None
-        check_in_gate = in_dict.get(employee_id).check_in_gate if employee_id in in_dict else None
-
-        check_out_time = out_dict.get(employee_id).check_out_time if employee_id in out_dict else None
-        check_out_gate = out_dict.get(employee_id).check_out_gate if employee_id in out_dict else None
-
-        if not check_in_time or not check_out_time:
-            # 忽略不完整記錄
-            continue
-
-        stay_hours = round((check_out_time - check_in_time).total_seconds() / 3600, 2)
-
-        # 查是否已存在該日記錄
-        record = AttendanceRecordModel.query.filter_by(
-            employee_id=employee_id,
-            report_date=target_date
-        ).first()
-
-        if record:
-            # 更新
-            record.check_in_time = check_in_time
-            record.check_out_time = check_out_time
-            record.check_in_gate = check_in_gate
-            record.check_out_gate = check_out_gate
-            record.total_stay_hours = stay_hours
-            record.updated_by = 'system'
-        else:
-            # 新增
-            new_record = AttendanceRecordModel(
-                employee_id=employee_id,
-                report_date=target_date,
-                check_in_time=check_in_time,
-                check_out_time=check_out_time,
-                check_in_gate=check_in_gate,
-                check_out_gate=check_out_gate,
-                total_stay_hours=stay_hours,
-                updated_by='system'
-            )
-            db.session.add(new_record)
+    if not new_logs:
+        return {"message": f"✅ Attendance updated for {target_date}", "total": 0, "new_logs": 0}, 200
+
+    # 有新逼卡的人，從 Access_Log 重新配對昨天、今天的班（昨晚的夜班可能今天早上才下班）
+    # 只重算這些人，不跟舊紀錄合併：配對要看前後的逼卡，只拿新的那幾筆配不出來
+    employee_ids = sorted({log.employee_id for log in new_logs})
+    rows, _, _ = _paired_attendance_rows(target_date - timedelta(days=1), target_date, employee_ids)
+
+    bulk_upsert(AttendanceRecordModel, rows, ["employee_id", "report_date"])
+    # 順便更新這些人這個月的月彙總
+    AttendanceSummaryService.refresh_monthly_summaries({(row["employee_id"], month_start_of(row["report_date"])) for row in rows})
+    bulk_upsert(AttendanceWatermarkModel, [{
+        "report_date": target_date,
+        "last_log_id": new_logs[-1].log_id,
+        "updated_at": datetime.now()
+    }], ["report_date"])
 
     db.session.commit()
 
-    return {"message": f"✅ Attendance updated for {target_date}", "total": len(all_employees)}, 200
+    return {"message": f"✅ Attendance updated for {target_date}", "total": len(rows), "new_logs": len(new_logs)}, 200
+
+def backfill_attendance_service(start_date, end_date, partition_days=None):
+    # 重算 start_date ~ end_date（含）每一天的出勤：不看 watermark，也不跟舊紀錄合併，直接用 Access_Log 的結果蓋掉
+    # 漏跑的日子、過了午夜才進來的逼卡都靠這個補
+    # 區間切成 partition_days 天一段：每段 server-side cursor 依 (員工, 時間) 掃一次 Access_Log，配對完 bulk upsert + commit
+    # 月彙總最後一次重算（每段都算的話同一個月會被重算好幾次）；回傳處理筆數和每秒幾筆
+    partition_days = partition_days or current_app.config["ATTENDANCE_BACKFILL_PARTITION_DAYS"]
+    started = time.perf_counter()
+    total_logs, total_records = 0, 0
+    employee_months = set()
+
+    day = start_date
+    while day <= end_date:
+        partition_end = min(day + timedelta(days=partition_days - 1), end_date)
+        records, logs, last_log_ids = _paired_attendance_rows(day, partition_end)
+
+        bulk_upsert(AttendanceRecordModel, records, ["employee_id", "report_date"])
+        employee_months.update((r["employee_id"], month_start_of(r["report_date"])) for r in records)
+        # 每天看過的最大 log_id 寫回 watermark，之後的增量更新不用再掃一次
+        now = datetime.now()
+        bulk_upsert(AttendanceWatermarkModel, [
+            {"report_date": report_date, "last_log_id": last_log_id, "updated_at": now}
+            for report_date, last_log_id in sorted(last_log_ids.items())
+            if day <= report_date <= partition_end
+        ], ["report_date"])
+        db.session.commit()
+
+        total_logs += logs
+        total_records += len(records)
+        print(f"✅ attendance backfill {day} ~ {partition_end}：{len(records)} 筆出勤")
+        day = partition_end + timedelta(days=1)
+
+    AttendanceSummaryService.refresh_monthly_summaries(employee_months)
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "message": f"✅ Attendance recomputed for {start_date} ~ {end_date}",
+        "days": (end_date - start_date).days + 1,
+        "logs": total_logs,
+        "total": total_records,
+        "seconds": round(elapsed, 3),
+        "logs_per_second": round(total_logs / elapsed, 1) if elapsed else None
+    }, 200
+
+
+def _paired_attendance_rows(first_day, last_day, employee_ids=None):
+    # first_day ~ last_day 每個人每天的出勤（依 ShiftRules 配對、歸到班的那一天）
+    # 前後多掃 max_shift 小時，跨區間邊界的夜班才配得到；依 (員工, 時間) 排序串流，每個人只走一次
+    # 遲到/早退在這裡依班表算好一起存，讀的時候不用再算
+    # 回傳 (出勤 rows, 掃過幾筆逼卡, {逼卡日期: 最大 log_id})
+    rules = ShiftRules.from_config(current_app.config)
+    gates = get_gate_registry()
+    start_dt = datetime.combine(first_day, datetime.min.time()) - rules.max_shift
+    end_dt = datetime.combine(last_day + timedelta(days=1), datetime.min.time()) + rules.max_shift
+
+    query = db.session.query(
+        AccessLogModel.log_id,
+        AccessLogModel.employee_id,
+        AccessLogModel.access_time,
+        AccessLogModel.gate_id
+    ).filter(
+        AccessLogModel.access_time >= start_dt,
+        AccessLogModel.access_time < end_dt
+    )
+    if employee_ids is not None:
+        query = query.filter(AccessLogModel.employee_id.in_(employee_ids))
+    query = query.order_by(AccessLogModel.employee_id, AccessLogModel.access_time, AccessLogModel.log_id)
+
+    rows = []
+    scanned = 0
+    last_log_ids = {}
+    result = db.session.execute(query.statement.execution_options(yield_per=BACKFILL_FETCH_SIZE))
+    for employee_id, logs in groupby(result, key=lambda log: log.employee_id):
+        swipes = []
+        for log in logs:
+            scanned += 1
+            log_day = log.access_time.date()
+            if log.log_id > last_log_ids.get(log_day, 0):
+                last_log_ids[log_day] = log.log_id
+            direction = gates.direction(log.gate_id)
+            if direction in ('in', 'out'):
+                swipes.append((log.access_time, direction, log.gate_id))
+
+        for report_date, day in rules.daily_attendance(swipes).items():
+            if first_day <= report_date <= last_day:
+                rows.append({
+                    "employee_id": employee_id,
+                    "report_date": report_date,
+                    **day,
+                    "updated_by": 'system'
+                })
+
+    # 這批人的組織一次查出來，班表是編譯好的查表，整批算完不用再打 DB
+    schedules = WorkScheduleService.get_lookup()
+    organization_by_employee = _organization_by_employee({row["employee_id"] for row in rows})
+    for row in rows:
+        row["is_late"], row["late_minutes"], row["is_early_leave"], row["early_leave_minutes"] = schedules.evaluate(
+            row["employee_id"], organization_by_employee.get(row["employee_id"]),
+            row["report_date"], row["check_in_time"], row["check_out_time"]
+        )
+    return rows, scanned, last_log_ids
+
+
+def _organization_by_employee(employee_ids):
+    if not employee_ids:
+        return {}
+    return dict(
+        db.session.query(EmployeeModel.employee_id, EmployeeModel.organization_id)
+        .filter(EmployeeModel.employee_id.in_(list(employee_ids)))
+        .all()
+    )
 
 #取得當前登入員工的出勤紀錄
 #修改：gate改成gate_name
@@ -138,7 +188,7 @@ class AttendanceService:
         # 解析月份，確保格式為 YYYY-MM
         try:
             start_date = datetime.strptime(month, "%Y-%m")
-            end_date = datetime(start_date.year, start_date.month + 1, 1)
+            end_date = next_month_start(start_date)
         except ValueError:
             return {"error": "Invalid month format, use YYYY-MM"}, 400
 
@@ -150,19 +200,9 @@ class AttendanceService:
         # 查詢員工所屬組織
         organization = OrganizationModel.query.filter_by(organization_id=employee.organization_id).first()
 
-        # 🆕 aliased join GateModel for in/out
-        in_gate = aliased(GateModel)
-        out_gate = aliased(GateModel)
-
-        # 查詢員工在該月的出勤紀錄
-        attendance_records = (
-            db.session.query(
-                AttendanceRecordModel,
-                in_gate.gate_name.label("in_gate_name"),   # 🆕
-                out_gate.gate_name.label("out_gate_name")  # 🆕
-            )
-            .outerjoin(in_gate, AttendanceRecordModel.check_in_gate == in_gate.gate_id)   # 🆕
-            .outerjoin(out_gate, AttendanceRecordModel.check_out_gate == out_gate.gate_id) # 🆕
+        # 查詢員工在該月的出勤紀錄（gate name 從 gate registry 補，不用 JOIN Gate 兩次）
+        rows = (
+            db.session.query(*ATTENDANCE_ROW_COLUMNS)
             .filter(
                 AttendanceRecordModel.employee_id == employee_id,
                 AttendanceRecordModel.report_date >= start_date,
@@ -172,37 +212,8 @@ class AttendanceService:
         )
 
         # 整理出勤紀錄
-        records = []
-        for record, in_gate_name, out_gate_name in attendance_records:  # ✨ 解包
-            late_arrival_status = "On time"
-            late_arrival_minutes = 0
-            early_departure_status = "On time"
-            early_departure_minutes = 0
-
-            work_start_time = record.check_in_time.replace(hour=8, minute=30, second=0, microsecond=0) if record.check_in_time else None
-            work_end_time = record.check_out_time.replace(hour=17, minute=30, second=0, microsecond=0) if record.check_out_time else None
-
-            if record.check_in_time and work_start_time and record.check_in_time > work_start_time:
-                late_arrival_status = "Late"
-                late_arrival_minutes = int((record.check_in_time - work_start_time).total_seconds() / 60)
-
-            if record.check_out_time and work_end_time and record.check_out_time < work_end_time:
-                early_departure_status = "Early"
-                early_departure_minutes = int((work_end_time - record.check_out_time).total_seconds() / 60)
-
-            records.append({
-                "record_id": record.record_id,
-                "report_date": record.report_date.strftime("%Y-%m-%d"),
-                "check_in_time": record.check_in_time.strftime("%H:%M") if record.check_in_time else None,
-                "check_out_time": record.check_out_time.strftime("%H:%M") if record.check_out_time else None,
-                "check_in_gate": in_gate_name,   # ✨ 改用 gate name
-                "check_out_gate": out_gate_name, # ✨ 改用 gate name
-                "total_stay_hours": float(record.total_stay_hours or 0),
-                "late_arrival_status": late_arrival_status,
-                "late_arrival_minutes": late_arrival_minutes,
-                "early_departure_status": early_departure_status,
-                "early_departure_minutes": early_departure_minutes
-            })
+        gates = get_gate_registry()
+        records = attendance_records(rows, gates, WorkScheduleService.get_lookup, employee.organization_id)
 
         response = {
             "employee_id": employee.employee_id,
@@ -218,74 +229,90 @@ class AttendanceService:
     #新版本：改成回傳month的出席紀錄
     #修改：gate改成gate_name
     @staticmethod
-    def get_attendance_by_organization(organization_id, month):
+    def get_attendance_by_organization(organization_id, month, include_descendants=False):
         try:
             start_date = datetime.strptime(month, "%Y-%m")
-            end_date = datetime(start_date.year, start_date.month + 1, 1)
+            end_date = next_month_start(start_date)
         except ValueError:
             return {"error": "Invalid month format, use YYYY-MM"}, 400
 
+        if include_descendants:
+            return AttendanceService._get_attendance_by_subtree(organization_id, start_date, end_date)
+
         employees = EmployeeModel.query.filter_by(organization_id=organization_id).all()
         if not employees:
             return [], 200
 
-        in_gate = aliased(GateModel)
-        out_gate = aliased(GateModel)
+        records_by_employee = AttendanceService._records_by_employee([organization_id], start_date, end_date)
+        return AttendanceService._employee_attendance_list(employees, records_by_employee), 200
 
-        organization_records = []
+    @staticmethod
+    def _get_attendance_by_subtree(organization_id, start_date, end_date):
+        # 整棵子樹（自己 + 所有下層部門）一次查完：部門從 Organization_Closure 查（OrganizationService.get_subtree），再 1 次撈員工、1 次撈出勤，跟部門數量無關
+        departments = OrganizationService.get_subtree(organization_id)
+        if not departments:
+            return {"error": "Organization not found."}, 404
+        organization_ids = [dept["organization_id"] for dept in departments]
+
+        employees = (
+            EmployeeModel.query
+            .filter(EmployeeModel.organization_id.in_(organization_ids))
+            .order_by(EmployeeModel.organization_id, EmployeeModel.employee_id)
+            .all()
+        )
+        records_by_employee = AttendanceService._records_by_employee(organization_ids, start_date, end_date)
 
+        employees_by_department = {}
         for employee in employees:
-            attendance_records = (
-                db.session.query(
-                    AttendanceRecordModel,
-                    in_gate.gate_name.label("in_gate_name"),
-                    out_gate.gate_name.label("out_gate_name")
-                )
-                .outerjoin(in_gate, AttendanceRecordModel.check_in_gate == in_gate.gate_id)
-                .outerjoin(out_gate, AttendanceRecordModel.check_out_gate == out_gate.gate_id)
-                .filter(
-                    AttendanceRecordModel.employee_id == employee.employee_id,
-                    AttendanceRecordModel.report_date >= start_date,
-                    AttendanceRecordModel.report_date < end_date
-                )
-                .order_by(AttendanceRecordModel.report_date.desc())
-                .all()
+            employees_by_department.setdefault(employee.organization_id, []).append(employee)
+
+        return {
+            "organization_id": organization_id,
+            "departments": [
+                {
+                    "organization_id": dept["organization_id"],
+                    "organization_name": dept["organization_name"],
+                    "parent_organization_id": dept["parent_department_id"],
+                    "depth": dept["depth"],
+                    "employees": AttendanceService._employee_attendance_list(
+                        employees_by_department.get(dept["organization_id"], []),
+                        records_by_employee
+                    )
+                }
+                for dept in departments
+            ]
+        }, 200
+
+    @staticmethod
+    def _records_by_employee(organization_ids, start_date, end_date):
+        # 一次撈出這些組織這個月的出勤紀錄，不要一個員工查一次（N+1），在記憶體裡依員工分組
+        rows = (
+            db.session.query(*ATTENDANCE_ROW_COLUMNS)
+            .join(EmployeeModel, AttendanceRecordModel.employee_id == EmployeeModel.employee_id)
+            .filter(
+                EmployeeModel.organization_id.in_(organization_ids),
+                AttendanceRecordModel.report_date >= start_date,
+                AttendanceRecordModel.report_date < end_date
             )
+            .order_by(AttendanceRecordModel.employee_id, AttendanceRecordModel.report_date.desc())
+            .all()
+        )
 
-            records = []
-            for record, in_gate_name, out_gate_name in attendance_records:
-                late_arrival_status = "On time"
-                late_arrival_minutes = 0
-                early_departure_status = "On time"
-                early_departure_minutes = 0
-
-                if record.check_in_time:
-                    work_start = record.check_in_time.replace(hour=8, minute=30, second=0, microsecond=0)
-                    if record.check_in_time > work_start:
-                        delta = record.check_in_time - work_start
-                        late_arrival_status = "Late"
-                        late_arrival_minutes = int(delta.total_seconds() / 60)
-
-                if record.check_out_time:
-                    work_end = record.check_out_time.replace(hour=17, minute=30, second=0, microsecond=0)
-                    if record.check_out_time < work_end:
-                        delta = work_end - record.check_out_time
-                        early_departure_status = "Early"
-                        early_departure_minutes = int(delta.total_seconds() / 60)
-
-                records.append({
-                    "record_id": record.record_id,
-                    "report_date": record.report_date.strftime("%Y-%m-%d"),
-                    "check_in_time": record.check_in_time.strftime("%H:%M") if record.check_in_time else None,
-                    "check_out_time": record.check_out_time.strftime("%H:%M") if record.check_out_time else None,
-                    "check_in_gate": in_gate_name,   # ✨ 改
-                    "check_out_gate": out_gate_name, # ✨ 改
-                    "total_stay_hours": float(record.total_stay_hours or 0),
-                    "late_arrival_status": late_arrival_status,
-                    "late_arrival_minutes": late_arrival_minutes,
-                    "early_departure_status": early_departure_status,
-                    "early_departure_minutes": early_departure_minutes
-                })
+        records_by_employee = {}
+        for row in rows:
+            records_by_employee.setdefault(row.employee_id, []).append(row)
+        return records_by_employee
+
+    @staticmethod
+    def _employee_attendance_list(employees, records_by_employee):
+        gates = get_gate_registry()
+
+        organization_records = []
+
+        for employee in employees:
+            records = attendance_records(
+                records_by_employee.get(employee.employee_id, []), gates, WorkScheduleService.get_lookup, employee.organization_id
+            )
 
             organization_records.append({
                 "employee_id": employee.employee_id,
@@ -294,4 +321,4 @@ class AttendanceService:
                 "records": records
             })
 
-        return organization_records, 200
+        return organization_records
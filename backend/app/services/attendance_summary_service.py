@@ -0,0 +1,245 @@
+from datetime import datetime, date, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from app.models import db
+from app.models.attendance_model import AttendanceRecordModel
+from app.models.attendance_summary_model import AttendanceMonthlySummaryModel, OrganizationMonthlySummaryModel
+from app.models.attendance_watermark_model import AttendanceWatermarkModel
+from app.models.employee_model import EmployeeModel
+from app.models.work_schedule_model import WorkScheduleModel
+from app.models.bulk import bulk_upsert
+from app.services.cache_service import make_etag
+from app.services.organization_service import OrganizationService
+from app.services.punctuality import record_punctuality
+from app.services.work_schedule_service import WorkScheduleService
+
+SUMMARY_FIELDS = [
+    "days_present", "late_count", "late_minutes",
+    "early_leave_count", "early_leave_minutes", "total_stay_hours"
+]
+
+
+def month_start_of(day):
+    return date(day.year, day.month, 1)
+
+
+def next_month_start(month_start):
+    if month_start.month == 12:
+        return date(month_start.year + 1, 1, 1)
+    return date(month_start.year, month_start.month + 1, 1)
+
+
+def parse_month(month):
+    # "YYYY-MM" -> 該月 1 號，格式不對丟 ValueError
+    return datetime.strptime(month, "%Y-%m").date()
+
+
+def is_closed_month(month_start, today=None):
+    # 月底過了 ATTENDANCE_MONTH_CLOSE_DAYS 天才算結算：每天的出勤更新會重配昨天的班，晚到的逼卡也要時間補進來
+    today = today or date.today()
+    return next_month_start(month_start) + timedelta(days=current_app.config["ATTENDANCE_MONTH_CLOSE_DAYS"]) <= today
+
+
+def month_version(month_start):
+    # 某個月出勤資料的版本（拿來當 ETag），一個 SELECT 幾個 COUNT/MAX，不用把紀錄撈出來：
+    #   Attendance_Watermark：那個月哪幾天被更新/重算過
+    #   Attendance_Monthly_Summary：出勤更新會順便重配昨天，跨月的那天只會動到上個月的月彙總
+    #   Employee：回應裡有員工姓名、所屬組織
+    #   Work_Schedule、班別設定：遲到欄位是 NULL 的舊紀錄讀的時候拿班表現算
+    #   組織樹的 ETag（內容算的，有快取）：include_descendants 的回應有部門名稱、上下層
+    month_end = next_month_start(month_start)
+    in_month = (AttendanceWatermarkModel.report_date >= month_start, AttendanceWatermarkModel.report_date < month_end)
+    summary_month = AttendanceMonthlySummaryModel.month_start == month_start
+    row = db.session.execute(select(
+        select(func.count()).select_from(AttendanceWatermarkModel).where(*in_month).scalar_subquery(),
+        select(func.max(AttendanceWatermarkModel.updated_at)).where(*in_month).scalar_subquery(),
+        select(func.count()).select_from(AttendanceMonthlySummaryModel).where(summary_month).scalar_subquery(),
+        select(func.max(AttendanceMonthlySummaryModel.updated_at)).where(summary_month).scalar_subquery(),
+        select(func.count()).select_from(EmployeeModel).scalar_subquery(),
+        select(func.max(EmployeeModel.updated_at)).scalar_subquery(),
+        select(func.count()).select_from(WorkScheduleModel).scalar_subquery(),
+        select(func.max(WorkScheduleModel.updated_at)).scalar_subquery()
+    )).one()
+    config = current_app.config
+    _, organization_etag = OrganizationService.get_cached_organization_tree()
+    return make_etag([
+        month_start.isoformat(),
+        *(str(value) for value in row),
+        config["ATTENDANCE_SHIFT_WINDOWS"],
+        config["ATTENDANCE_DEFAULT_WORK_START"],
+        config["ATTENDANCE_DEFAULT_WORK_END"],
+        organization_etag
+    ])
+
+
+class AttendanceSummaryService:
+    @staticmethod
+    def refresh_monthly_summaries(employee_months):
+        # employee_months: {(employee_id, month_start), ...}，只重算有被動到的人/月
+        # 不會 commit，跟出勤更新放在同一個 transaction
+        if not employee_months:
+            return 0
+
+        employee_ids = sorted({employee_id for employee_id, _ in employee_months})
+        months = sorted({month_start for _, month_start in employee_months})
+
+        # 一次撈出這些人在這幾個月的每日紀錄
+        records = AttendanceRecordModel.query.filter(
+            AttendanceRecordModel.employee_id.in_(employee_ids),
+            AttendanceRecordModel.report_date >= months[0],
+            AttendanceRecordModel.report_date < next_month_start(months[-1])
+        ).all()
+
+        org_by_employee = dict(
+            db.session.query(EmployeeModel.employee_id, EmployeeModel.organization_id)
+            .filter(EmployeeModel.employee_id.in_(employee_ids))
+            .all()
+        )
+
+        now = datetime.now()
+        summaries = {
+            key: {
+                "employee_id": key[0],
+                "organization_id": org_by_employee.get(key[0], ""),
+                "month_start": key[1],
+                "days_present": 0,
+                "late_count": 0,
+                "late_minutes": 0,
+                "early_leave_count": 0,
+                "early_leave_minutes": 0,
+                "total_stay_hours": 0.0,
+                "updated_at": now
+            }
+            for key in employee_months
+        }
+
+        # 遲到/早退用出勤更新時存好的欄位，舊資料才依班表現算
+        for record in records:
+            summary = summaries.get((record.employee_id, month_start_of(record.report_date)))
+            if summary is None or not record.check_in_time:
+                continue
+
+            is_late, late_minutes, is_early, early_minutes = record_punctuality(record, WorkScheduleService.get_lookup, org_by_employee.get(record.employee_id))
+            summary["days_present"] += 1
+            summary["late_count"] += int(is_late)
+            summary["late_minutes"] += late_minutes
+            summary["early_leave_count"] += int(is_early)
+            summary["early_leave_minutes"] += early_minutes
+            summary["total_stay_hours"] += float(record.total_stay_hours or 0)
+
+        rows = list(summaries.values())
+        for row in rows:
+            row["total_stay_hours"] = round(row["total_stay_hours"], 2)
+
+        # 員工換過部門：舊的彙總掛在舊組織，upsert 會改成現在的組織，舊組織那個月也要跟著重算（不然還算著這個人）
+        previous = db.session.query(
+            AttendanceMonthlySummaryModel.employee_id,
+            AttendanceMonthlySummaryModel.month_start,
+            AttendanceMonthlySummaryModel.organization_id
+        ).filter(
+            AttendanceMonthlySummaryModel.employee_id.in_(employee_ids),
+            AttendanceMonthlySummaryModel.month_start.in_(months)
+        ).all()
+
+        bulk_upsert(AttendanceMonthlySummaryModel, rows, ["employee_id", "month_start"])
+
+        # 受影響的組織/月份從員工彙總 GROUP BY 重算
+        org_months = {(row["organization_id"], row["month_start"]) for row in rows}
+        for employee_id, month_start, organization_id in previous:
+            summary = summaries.get((employee_id, month_start))
+            if summary is not None and summary["organization_id"] != organization_id:
+                org_months.add((organization_id, month_start))
+        org_ids = sorted({organization_id for organization_id, _ in org_months})
+        aggregated = (
+            db.session.query(
+                AttendanceMonthlySummaryModel.organization_id,
+                AttendanceMonthlySummaryModel.month_start,
+                func.count(AttendanceMonthlySummaryModel.employee_id).label("employee_count"),
+                *[func.sum(getattr(AttendanceMonthlySummaryModel, field)).label(field) for field in SUMMARY_FIELDS]
+            )
+            .filter(
+                AttendanceMonthlySummaryModel.organization_id.in_(org_ids),
+                AttendanceMonthlySummaryModel.month_start.in_(months),
+                AttendanceMonthlySummaryModel.days_present > 0
+            )
+            .group_by(AttendanceMonthlySummaryModel.organization_id, AttendanceMonthlySummaryModel.month_start)
+            .all()
+        )
+        aggregated = {(row.organization_id, row.month_start): row for row in aggregated}
+
+        org_rows = []
+        for organization_id, month_start in org_months:
+            row = aggregated.get((organization_id, month_start))
+            org_rows.append({
+                "organization_id": organization_id,
+                "month_start": month_start,
+                "employee_count": row.employee_count if row else 0,
+                **{field: (getattr(row, field) or 0) if row else 0 for field in SUMMARY_FIELDS},
+                "updated_at": now
+            })
+        bulk_upsert(OrganizationMonthlySummaryModel, org_rows, ["organization_id", "month_start"])
+
+        return len(rows)
+
+    @staticmethod
+    def refresh_all_monthly_summaries(batch_size=200):
+        # 從現有的 Attendance_Record 把每個人、每個月的彙總整個重算一次（不重配逼卡，比 backfill-attendance 輕）
+        # 月彙總以前只有出勤更新碰到的人/月才會寫，init-db 升到 v8 時跑一次把歷史資料補齊；每批 commit 一次
+        spans = db.session.query(
+            AttendanceRecordModel.employee_id,
+            func.min(AttendanceRecordModel.report_date),
+            func.max(AttendanceRecordModel.report_date)
+        ).group_by(AttendanceRecordModel.employee_id).order_by(AttendanceRecordModel.employee_id).all()
+
+        total = 0
+        for i in range(0, len(spans), batch_size):
+            employee_months = set()
+            for employee_id, first_day, last_day in spans[i:i + batch_size]:
+                month_start = month_start_of(first_day)
+                while month_start <= last_day:
+                    employee_months.add((employee_id, month_start))
+                    month_start = next_month_start(month_start)
+            total += AttendanceSummaryService.refresh_monthly_summaries(employee_months)
+            db.session.commit()
+        return total
+
+    @staticmethod
+    def get_employee_summary(employee_id, month):
+        try:
+            month_start = parse_month(month)
+        except ValueError:
+            return {"error": "Invalid month format, use YYYY-MM"}, 400
+
+        summary = AttendanceMonthlySummaryModel.query.filter_by(employee_id=employee_id, month_start=month_start).first()
+        return {
+            "employee_id": employee_id,
+            "organization_id": summary.organization_id if summary else None,
+            "month": month,
+            **AttendanceSummaryService._summary_fields(summary)
+        }, 200
+
+    @staticmethod
+    def get_organization_summary(organization_id, month):
+        try:
+            month_start = parse_month(month)
+        except ValueError:
+            return {"error": "Invalid month format, use YYYY-MM"}, 400
+
+        summary = db.session.get(OrganizationMonthlySummaryModel, (organization_id, month_start))
+        return {
+            "organization_id": organization_id,
+            "month": month,
+            "employee_count": summary.employee_count if summary else 0,
+            **AttendanceSummaryService._summary_fields(summary)
+        }, 200
+
+    @staticmethod
+    def _summary_fields(summary):
+        return {
+            "days_present": summary.days_present if summary else 0,
+            "late_count": summary.late_count if summary else 0,
+            "late_minutes": summary.late_minutes if summary else 0,
+            "early_leave_count": summary.early_leave_count if summary else 0,
+            "early_leave_minutes": summary.early_leave_minutes if summary else 0,
+            "total_stay_hours": float(summary.total_stay_hours) if summary else 0.0
+        }
@@ -1,6 +1,7 @@
 from app.models import db
 from app.models.employee_model import EmployeeModel
 from app.models.organization_model import  OrganizationModel
+from app.services.role_service import RoleService
 from flask_jwt_extended import create_access_token
 from datetime import timedelta
 
@@ -22,7 +23,7 @@ class AuthService:
             return {"error": "org can't be found in db."}, 401
         
         organization_name = org.organization_name 
-        is_manager_or_not = org.manager_id == employee_id #bool 看他所在的部門表 上面寫的主管是不是他本人
+        is_manager_or_not = RoleService.is_manager(employee_id) #bool 是不是任何一個部門的主管，跟之後每個 request 查權限用的是同一張表
 
         #建立有包含個人基本資訊的 JWT 
         user_identity = {
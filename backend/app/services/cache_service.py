@@ -0,0 +1,80 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import Flask, current_app
+
+
+# 行程內快取：每個 key 有自己的版本號，資料有寫入時 bump 版本，舊的快取就不會再被拿來用
+# 多個 Cloud Run instance 之間不會互相通知，所以另外加 TTL 當保險，最多舊 ttl 秒
+# 像「每個組織一筆」這種 key 是跟著 request 長的，所以最多留 max_entries 筆（LRU），寫入時順便清掉過期/舊版本的
+class VersionedCache:
+    def __init__(self, ttl_seconds=60, max_entries=1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = OrderedDict()  # key -> (version_key, version, expires_at, value, etag)，最近用過的在後面
+
+    def version(self, key):
+        with self._lock:
+            return self._versions.get(key, 0)
+
+    def bump(self, key):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def get_or_build(self, key, builder, version_key=None, cacheable=None):
+        # version_key：好幾個 key 共用一個版本號，例如每個組織各自快取，但 bump 組織樹就全部失效
+        # cacheable(value) 回傳 False 的不存（例如 404），每次都重建
+        version_key = version_key or key
+        now = time.monotonic()
+        with self._lock:
+            version = self._versions.get(version_key, 0)
+            entry = self._entries.get(key)
+            if entry and entry[1] == version and entry[2] > now:
+                self._entries.move_to_end(key)
+                return entry[3], entry[4]
+
+        # 在鎖外面建，建的過程中如果有人 bump，存進去的版本就是舊的，下次自然會重建
+        value = builder()
+        etag = make_etag(value)
+        if cacheable is not None and not cacheable(value):
+            return value, etag
+        with self._lock:
+            self._entries[key] = (version_key, version, now + self.ttl_seconds, value, etag)
+            self._entries.move_to_end(key)
+            self._evict(now)
+        return value, etag
+
+    def _evict(self, now):
+        # 呼叫前要拿著鎖；max_entries 不大，整個掃一遍
+        for key, (version_key, version, expires_at, _, _) in list(self._entries.items()):
+            if expires_at <= now or version != self._versions.get(version_key, 0):
+                del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "max_entries": self.max_entries}
+
+
+# 用內容算 ETag，不同 instance 算出來的一樣，前端換台機器也能拿到 304
+def make_etag(value):
+    body = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.md5(body).hexdigest()
+
+
+def init_cache(app: Flask):
+    app.extensions["versioned_cache"] = VersionedCache(
+        ttl_seconds=app.config["CACHE_TTL_SECONDS"],
+        max_entries=app.config["CACHE_MAX_ENTRIES"]
+    )
+    return app.extensions["versioned_cache"]
+
+
+def get_cache():
+    return current_app.extensions["versioned_cache"]
@@ -0,0 +1,46 @@
+import threading
+from collections import OrderedDict
+from flask import Flask, current_app
+
+
+# 最近寫進去的 dedup_key（LRU，最多 maxsize 筆）
+# Pub/Sub 重送的訊息大多幾秒內就會再來一次，這邊先擋掉就不用再進 buffer / 打 DB
+# 只是快速路徑，沒擋到的（重開機、別台 instance 寫的）還有 Access_Log 的 unique index 擋
+class RecentKeyCache:
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+        self._hits = 0
+
+    def seen(self, key):
+        if key is None:
+            return False
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self._hits += 1
+                return True
+            return False
+
+    def add(self, key):
+        if key is None:
+            return
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._keys), "maxsize": self.maxsize, "hits": self._hits}
+
+
+def init_dedup_cache(app: Flask):
+    app.extensions["accesslog_dedup_cache"] = RecentKeyCache(maxsize=app.config["ACCESSLOG_DEDUP_CACHE_SIZE"])
+    return app.extensions["accesslog_dedup_cache"]
+
+
+def get_dedup_cache():
+    return current_app.extensions["accesslog_dedup_cache"]
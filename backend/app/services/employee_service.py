@@ -1,7 +1,16 @@
 from app.models.employee_model import EmployeeModel
 from app.models.organization_model import OrganizationModel
+from app.services.organization_service import OrganizationService
 from app.models import db  # Import the db object
+from app.models.bulk import CHUNK_SIZE
+from sqlalchemy import insert, or_
 from datetime import datetime  # Import datetime for timestamps
+from dateutil.parser import isoparse
+import csv
+import io
+import json
+
+IMPORT_REQUIRED_FIELDS = ["employee_id", "first_name", "last_name", "email", "phone_number", "job_title", "organization_id", "hire_date"]
 
 class EmployeeService:
     
@@ -41,19 +50,43 @@ class EmployeeService:
             return None
         
     @staticmethod
-    def get_all_employees():
+    def get_all_employees(limit=100, cursor=None, organization_id=None, hire_status=None, name_prefix=None):
+        # keyset 分頁：照 employee_id 排序，cursor 是上一頁最後一個 employee_id
+        # 只撈清單需要的欄位，不要把 hashed_password 那些整筆 hydrate 回來
         try:
-            employees = EmployeeModel.query.all()
+            query = db.session.query(
+                EmployeeModel.employee_id,
+                EmployeeModel.first_name,
+                EmployeeModel.last_name
+            )
+
+            if organization_id:
+                query = query.filter(EmployeeModel.organization_id == organization_id)
+            if hire_status:
+                query = query.filter(EmployeeModel.hire_status == hire_status)
+            if name_prefix:
+                query = query.filter(or_(
+                    EmployeeModel.first_name.startswith(name_prefix, autoescape=True),
+                    EmployeeModel.last_name.startswith(name_prefix, autoescape=True)
+                ))
+            if cursor:
+                query = query.filter(EmployeeModel.employee_id > cursor)
+
+            # 多拿一筆來判斷還有沒有下一頁
+            rows = query.order_by(EmployeeModel.employee_id).limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
 
             return { 
                 'employee_list': [
                     {
-                        'employee_id': emp.employee_id,
-                        'employee_first_name': emp.first_name,
-                        'employee_last_name': emp.last_name,
+                        'employee_id': row.employee_id,
+                        'employee_first_name': row.first_name,
+                        'employee_last_name': row.last_name,
                     }
-                    for emp in employees
-                ]
+                    for row in rows
+                ],
+                'next_cursor': rows[-1].employee_id if has_more else None
             }
         except Exception as e:
             # Log the error (assuming you have a logging system)
@@ -99,6 +132,7 @@ class EmployeeService:
         try:
             db.session.add(employee)
             db.session.commit()
+            OrganizationService.invalidate_cache()
         except Exception as e:
             db.session.rollback()
             print(f"Database error while adding employee {employee.employee_id}: {str(e)}")
@@ -122,6 +156,7 @@ class EmployeeService:
             employee.updated_by = updated_by
 
             db.session.commit()
+            OrganizationService.invalidate_cache()
             return True
         except Exception as e:
             db.session.rollback()
@@ -141,4 +176,112 @@ class EmployeeService:
             raise PermissionError("Original password is incorrect.")
 
         employee.hashed_password = new_hashed_password
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+
+    @staticmethod
+    def parse_import_body(raw, content_type):
+        # 回傳 (rows, None) 或 (None, (error, status))；CSV 第一行是欄位名稱，JSON 是物件陣列
+        if "csv" in (content_type or ""):
+            try:
+                text = raw.decode("utf-8-sig")
+            except UnicodeDecodeError:
+                return None, ({"message": "CSV must be UTF-8 encoded."}, 400)
+            return list(csv.DictReader(io.StringIO(text))), None
+
+        try:
+            rows = json.loads(raw or b"null")
+        except ValueError:
+            return None, ({"message": "Invalid JSON body."}, 400)
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            return None, ({"message": "Body must be a JSON array of employee objects or a CSV file."}, 400)
+        return rows, None
+
+    @staticmethod
+    def _parse_import_row(data, created_by, now):
+        # 回傳 (insert 用的 dict, None) 或 (None, 錯誤訊息)
+        missing = [f for f in IMPORT_REQUIRED_FIELDS if data.get(f) in (None, "")]
+        if missing:
+            return None, f"Missing {', '.join(missing)}"
+
+        try:
+            hire_date = isoparse(str(data["hire_date"]))
+        except ValueError:
+            return None, "Invalid hire_date format. Use ISO8601 date string."
+
+        is_admin = data.get("is_admin", False)
+        if isinstance(is_admin, str):
+            is_admin = is_admin.strip().lower() in ("1", "true", "yes", "y")  # CSV 進來都是字串
+
+        return {
+            "employee_id": str(data["employee_id"]).strip(),
+            "first_name": data["first_name"],
+            "last_name": data["last_name"],
+            "email": data["email"],
+            "phone_number": str(data["phone_number"]),
+            "is_admin": bool(is_admin),
+            "job_title": data["job_title"],
+            "organization_id": str(data["organization_id"]).strip(),
+            "hire_date": hire_date,
+            "hire_status": data.get("hire_status") or "active",
+            "updated_at": now,
+            "updated_by": created_by,
+            "hashed_password": data.get("hashed_password") or "default_hashed_password"
+        }, None
+
+    @staticmethod
+    def import_employees(rows, created_by):
+        # 一次匯入很多員工，generator 一路吐出進度，最後一個是結果：
+        #   {"type": "progress", "stage": "validated" / "inserted", "processed": n, "total": n}
+        #   {"type": "result", "total": n, "inserted": n, "errors": [{"row": 1, "employee_id": ..., "message": ...}]}
+        # row 從 1 開始算（CSV 不含標題列）。組織、重複員工各一次 IN 查詢，合格的分批 insert，最後一起 commit
+        # 有錯的那幾筆不寫，其他照寫；DB 寫入失敗就整批 rollback
+        now = datetime.utcnow()
+        total = len(rows)
+        errors = []
+        parsed = []
+        seen = set()
+
+        for row_number, data in enumerate(rows, start=1):
+            employee, error = EmployeeService._parse_import_row(data, created_by, now)
+            if error is None and employee["employee_id"] in seen:
+                error = "Duplicate employee_id in this file"
+            if error:
+                errors.append({"row": row_number, "employee_id": data.get("employee_id"), "message": error})
+                continue
+            seen.add(employee["employee_id"])
+            parsed.append((row_number, employee))
+
+        # 筆數上限由 controller 控（EMPLOYEE_IMPORT_MAX_ROWS），IN 清單不會大到超過 DB 限制
+        existing_employees, existing_organizations = set(), set()
+        if parsed:
+            existing_employees = {r for (r,) in db.session.query(EmployeeModel.employee_id).filter(
+                EmployeeModel.employee_id.in_([e["employee_id"] for _, e in parsed])
+            )}
+            existing_organizations = {r for (r,) in db.session.query(OrganizationModel.organization_id).filter(
+                OrganizationModel.organization_id.in_({e["organization_id"] for _, e in parsed})
+            )}
+
+        valid = []
+        for row_number, employee in parsed:
+            if employee["employee_id"] in existing_employees:
+                errors.append({"row": row_number, "employee_id": employee["employee_id"], "message": "The employee already exists"})
+            elif employee["organization_id"] not in existing_organizations:
+                errors.append({"row": row_number, "employee_id": employee["employee_id"], "message": f"Organization with id {employee['organization_id']} does not exist"})
+            else:
+                valid.append(employee)
+        errors.sort(key=lambda e: e["row"])
+        yield {"type": "progress", "stage": "validated", "processed": total, "total": total}
+
+        try:
+            for i in range(0, len(valid), CHUNK_SIZE):
+                db.session.execute(insert(EmployeeModel), valid[i:i + CHUNK_SIZE])
+                yield {"type": "progress", "stage": "inserted", "processed": min(i + CHUNK_SIZE, len(valid)), "total": len(valid)}
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Database error while importing employees: {str(e)}")
+            raise e
+
+        if valid:
+            OrganizationService.invalidate_cache()
+        yield {"type": "result", "total": total, "inserted": len(valid), "errors": errors}
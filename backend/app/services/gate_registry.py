@@ -0,0 +1,70 @@
+import threading
+import time
+from flask import Flask, current_app
+from app.models.gate_model import GateModel
+
+
+# Gate 表只有幾筆又幾乎不會變，整張載進記憶體，查 Access_Log / Attendance_Record 就不用再 JOIN Gate
+# 過了 ttl 會重新載入；遇到不認識的 gate_id 也會馬上重載一次（最多每 miss_reload_seconds 一次）
+class GateRegistry:
+    def __init__(self, ttl_seconds=300, miss_reload_seconds=5):
+        self.ttl_seconds = ttl_seconds
+        self.miss_reload_seconds = miss_reload_seconds
+        self._lock = threading.Lock()
+        self._gates = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        gates = {
+            gate.gate_id: {
+                "gate_name": gate.gate_name,
+                "direction": gate.direction,
+                "gate_type": gate.gate_type
+            }
+            for gate in GateModel.query.all()
+        }
+        with self._lock:
+            self._gates = gates
+            self._loaded_at = time.monotonic()
+        return gates
+
+    def _current(self):
+        with self._lock:
+            gates, loaded_at = self._gates, self._loaded_at
+        if gates is None or time.monotonic() - loaded_at > self.ttl_seconds:
+            gates = self._load()
+        return gates
+
+    def get(self, gate_id):
+        gates = self._current()
+        gate = gates.get(gate_id)
+        if gate is None and gate_id is not None:
+            with self._lock:
+                can_reload = time.monotonic() - self._loaded_at > self.miss_reload_seconds
+            if can_reload:
+                gate = self._load().get(gate_id)
+        return gate
+
+    def gate_name(self, gate_id):
+        gate = self.get(gate_id)
+        return gate["gate_name"] if gate else None
+
+    def direction(self, gate_id):
+        gate = self.get(gate_id)
+        return gate["direction"] if gate else None
+
+    def all(self):
+        return dict(self._current())
+
+    def invalidate(self):
+        with self._lock:
+            self._gates = None
+
+
+def init_gate_registry(app: Flask):
+    app.extensions["gate_registry"] = GateRegistry(ttl_seconds=app.config["GATE_REGISTRY_TTL_SECONDS"])
+    return app.extensions["gate_registry"]
+
+
+def get_gate_registry():
+    return current_app.extensions["gate_registry"]
@@ -1,6 +1,14 @@
 from app.models.organization_model import OrganizationModel
+from app.models.organization_closure_model import OrganizationClosureModel, build_closure_rows, organization_closure_is_fresh
 from app.models.employee_model import EmployeeModel
 from app.models import db
+from app.services.cache_service import get_cache
+from app.services.role_service import RoleService
+from app.services.work_schedule_service import WorkScheduleService
+from sqlalchemy import func, select
+from flask import g
+
+ORGANIZATION_TREE_CACHE_KEY = "organization_tree"
 
 class OrganizationService:
     @staticmethod  #不用建立class實體也可以直接呼叫函式
@@ -67,6 +75,7 @@ class OrganizationService:
     
     @staticmethod
     def get_organization_tree():
+
         # 1. 抓出所有組織
         orgs = OrganizationModel.query.all()
 
@@ -81,6 +90,7 @@ class OrganizationService:
                 "manager_first_name": "",
                 "manager_last_name": "",
                 "employee_count": "0",  #新增的，預設員工數量為0
+                "subtree_employee_count": "0",  # 含所有下層部門的員工數
                 "children": []
             }
 
@@ -96,11 +106,29 @@ class OrganizationService:
                 org_data["manager_first_name"] = manager.first_name
                 org_data["manager_last_name"] = manager.last_name
 
-        #新增的4.5. 計算每個組織的員工數量
-        for org in org_dict.values():
-            #查詢該組織的員工數量
-            employees = EmployeeModel.query.filter_by(organization_id=org["organization_id"]).all()
-            org["employee_count"] = str(len(employees))
+        #新增的4.5. 計算每個組織的員工數量（一次 GROUP BY，不用把員工整筆撈回來）
+        counts = db.session.query(EmployeeModel.organization_id, func.count(EmployeeModel.employee_id))\
+            .group_by(EmployeeModel.organization_id).all()
+        for organization_id, count in counts:
+            if organization_id in org_dict:
+                org_dict[organization_id]["employee_count"] = str(count)
+
+        # 整個子樹的員工數：closure table 跟員工 JOIN 一次 GROUP BY 祖先
+        # closure 過期的話用記憶體算的 closure 把上面各組織的員工數往祖先加
+        closure_rows = OrganizationService.stale_closure_rows()
+        if closure_rows is not None:
+            own_counts = dict(counts)
+            subtree_totals = {}
+            for row in closure_rows:
+                subtree_totals[row["ancestor_id"]] = subtree_totals.get(row["ancestor_id"], 0) + own_counts.get(row["descendant_id"], 0)
+            subtree_counts = [(organization_id, count) for organization_id, count in subtree_totals.items() if count]
+        else:
+            subtree_counts = db.session.query(OrganizationClosureModel.ancestor_id, func.count(EmployeeModel.employee_id))\
+                .join(EmployeeModel, EmployeeModel.organization_id == OrganizationClosureModel.descendant_id)\
+                .group_by(OrganizationClosureModel.ancestor_id).all()
+        for organization_id, count in subtree_counts:
+            if organization_id in org_dict:
+                org_dict[organization_id]["subtree_employee_count"] = str(count)
 
         # 5. 把所有組織串成樹狀結構
         root_orgs = []
@@ -115,6 +143,108 @@ class OrganizationService:
 
         # 6. 回傳 JSON 格式
         return {"organizations": root_orgs}, 200
+
+    @staticmethod
+    def stale_closure_rows():
+        # closure 只有經過 ORM 的寫入才會維護，組織是 seed SQL / 手動 INSERT 進來的就會過期
+        # 讀的路徑不重建也不 commit（多個 instance 同時重建會互相打架），過期就回傳從 Organization 現算的 closure rows
+        # 回傳 None 代表 closure table 可以用；重建交給 init-db / rebuild-org-closure / ORM 寫入
+        # 檢查結果跟組織樹共用版本號快取 TTL 秒，不用每個 request 都跑一次 COUNT
+        if "organization_closure_rows" in g:
+            return g.organization_closure_rows
+        fresh, _ = get_cache().get_or_build(
+            "organization_closure_fresh",
+            lambda: organization_closure_is_fresh(db.session.connection()),
+            version_key=ORGANIZATION_TREE_CACHE_KEY
+        )
+        rows = None
+        if not fresh:
+            print("⚠️ Organization_Closure 跟 Organization 對不上，先用記憶體算的 closure，請跑 flask rebuild-org-closure")
+            parents = dict(db.session.execute(
+                select(OrganizationModel.organization_id, OrganizationModel.parent_department_id)
+            ).all())
+            rows = build_closure_rows(parents)
+        g.organization_closure_rows = rows
+        return rows
+
+    @staticmethod
+    def get_subtree(organization_id):
+        # 從 closure table 一次撈出自己 + 所有下層部門，回傳 [{organization_id, organization_name, parent_department_id, depth}]
+        # 自己是 depth 0，依 depth 排序（上層在前）；組織不存在回傳 []
+        closure_rows = OrganizationService.stale_closure_rows()
+        if closure_rows is not None:
+            depths = {r["descendant_id"]: r["depth"] for r in closure_rows if r["ancestor_id"] == organization_id}
+            orgs = OrganizationModel.query.filter(OrganizationModel.organization_id.in_(depths)).all() if depths else []
+            subtree = [{
+                "organization_id": org.organization_id,
+                "organization_name": org.organization_name,
+                "parent_department_id": org.parent_department_id,
+                "depth": depths[org.organization_id]
+            } for org in orgs]
+            return sorted(subtree, key=lambda o: (o["depth"], o["organization_id"]))
+
+        rows = db.session.execute(
+            select(
+                OrganizationModel.organization_id,
+                OrganizationModel.organization_name,
+                OrganizationModel.parent_department_id,
+                OrganizationClosureModel.depth
+            )
+            .join(OrganizationModel, OrganizationModel.organization_id == OrganizationClosureModel.descendant_id)
+            .where(OrganizationClosureModel.ancestor_id == organization_id)
+            .order_by(OrganizationClosureModel.depth, OrganizationModel.organization_id)
+        ).all()
+        return [row._asdict() for row in rows]
+
+    @staticmethod
+    def is_in_subtree(ancestor_id, organization_id):
+        # organization_id 是不是 ancestor_id 自己或它底下的部門（closure table 主鍵查詢）
+        closure_rows = OrganizationService.stale_closure_rows()
+        if closure_rows is not None:
+            return any(r["ancestor_id"] == ancestor_id and r["descendant_id"] == organization_id for r in closure_rows)
+        return db.session.get(OrganizationClosureModel, (ancestor_id, organization_id)) is not None
+
+    @staticmethod
+    def get_depth(organization_id):
+        # root 是 0；組織不存在回傳 None
+        closure_rows = OrganizationService.stale_closure_rows()
+        if closure_rows is not None:
+            return max((r["depth"] for r in closure_rows if r["descendant_id"] == organization_id), default=None)
+        return db.session.query(func.max(OrganizationClosureModel.depth))\
+            .filter(OrganizationClosureModel.descendant_id == organization_id).scalar()
+
+    @staticmethod
+    def get_cached_organization_tree():
+        # 回傳 (tree, etag)，組織或員工有異動時會 invalidate_cache
+        return get_cache().get_or_build(
+            ORGANIZATION_TREE_CACHE_KEY,
+            lambda: OrganizationService.get_organization_tree()[0]
+        )
+
+    @staticmethod
+    def get_cached_organization_list():
+        return get_cache().get_or_build(
+            "organization_list",
+            lambda: OrganizationService.get_organization_list()[0],
+            version_key=ORGANIZATION_TREE_CACHE_KEY
+        )
+
+    @staticmethod
+    def get_cached_organization(organization_id):
+        # 回傳 ((body, status), etag)；只快取 200，亂打的組織 id（404）不會一直佔著快取
+        return get_cache().get_or_build(
+            f"organization:{organization_id}",
+            lambda: OrganizationService.get_organization_by_id(organization_id),
+            version_key=ORGANIZATION_TREE_CACHE_KEY,
+            cacheable=lambda result: result[1] == 200
+        )
+
+    @staticmethod
+    def invalidate_cache():
+        # 組織清單、單一組織、組織樹都跟著這個版本號
+        get_cache().bump(ORGANIZATION_TREE_CACHE_KEY)
+        RoleService.invalidate_cache()  # manager 可能被清掉了
+        WorkScheduleService.invalidate_cache()  # 換了上層部門，沿用的班表也會跟著變
     
     @staticmethod
     def delete_organization(organization_id):
@@ -123,8 +253,11 @@ class OrganizationService:
         if not org:
             return {"error": "Organization not found."}, 404
 
-        # 2. 檢查是否為 leaf 組織
-        has_children = OrganizationModel.query.filter_by(parent_department_id=organization_id).first()
+        # 2. 檢查是否為 leaf 組織（直接看 parent_department_id，不靠可能過期的 closure table）
+        has_children = OrganizationModel.query.filter(
+            OrganizationModel.parent_department_id == organization_id,
+            OrganizationModel.organization_id != organization_id
+        ).first()
         if has_children:
             return {"error": "Cannot delete non-leaf organization node."}, 400
 
@@ -143,5 +276,6 @@ class OrganizationService:
         # 6. 刪除組織
         db.session.delete(org)
         db.session.commit()
+        OrganizationService.invalidate_cache()
 
         return {"message": "Organization and related employees deleted successfully."}, 200
\ No newline at end of file
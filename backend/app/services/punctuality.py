@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+
+# 回傳 (是否遲到, 遲到分鐘, 是否早退, 早退分鐘)
+# schedule 是 (上班時間, 下班時間)，從 report_date 那天算；下班比上班早就是夜班，下班算在隔天
+# 08:30:20 打卡算遲到但是 0 分鐘，跟原本的判斷一樣
+def evaluate_punctuality(report_date, check_in_time, check_out_time, schedule):
+    work_start, work_end = schedule
+    is_late, late_minutes = False, 0
+    is_early, early_minutes = False, 0
+
+    if check_in_time:
+        start_dt = datetime.combine(report_date, work_start)
+        if check_in_time > start_dt:
+            is_late = True
+            late_minutes = int((check_in_time - start_dt).total_seconds() / 60)
+
+    if check_out_time:
+        end_day = report_date + timedelta(days=1) if work_end <= work_start else report_date
+        end_dt = datetime.combine(end_day, work_end)
+        if check_out_time < end_dt:
+            is_early = True
+            early_minutes = int((end_dt - check_out_time).total_seconds() / 60)
+
+    return is_late, late_minutes, is_early, early_minutes
+
+
+# 存在 Attendance_Record 的那四個欄位；舊資料（欄位是 NULL）才拿班表現算
+# get_schedules 是 WorkScheduleService.get_lookup，用到才呼叫，新資料不會多查 DB
+def record_punctuality(record, get_schedules, organization_id):
+    if record.is_late is not None:
+        return record.is_late, record.late_minutes, record.is_early_leave, record.early_leave_minutes
+    return get_schedules().evaluate(record.employee_id, organization_id, record.report_date, record.check_in_time, record.check_out_time)
+
@@ -0,0 +1,48 @@
+from flask_jwt_extended import get_jwt_identity
+from app.models.organization_model import OrganizationModel
+from app.services.cache_service import get_cache
+
+ORGANIZATION_MANAGERS_CACHE_KEY = "organization_managers"
+
+
+class RoleService:
+    @staticmethod
+    def get_manager_map():
+        # {"by_organization": {org_id: manager_id}, "by_manager": {manager_id: [org_id, ...]}}
+        # 放在 versioned cache 裡，組織有異動時跟組織樹一起 invalidate，查權限不用打 DB
+        value, _ = get_cache().get_or_build(ORGANIZATION_MANAGERS_CACHE_KEY, RoleService._build_manager_map)
+        return value
+
+    @staticmethod
+    def _build_manager_map():
+        by_organization, by_manager = {}, {}
+        rows = OrganizationModel.query.with_entities(OrganizationModel.organization_id, OrganizationModel.manager_id).all()
+        for organization_id, manager_id in rows:
+            by_organization[organization_id] = manager_id
+            if manager_id:
+                by_manager.setdefault(manager_id, []).append(organization_id)
+        return {"by_organization": by_organization, "by_manager": by_manager}
+
+    @staticmethod
+    def is_manager(employee_id):
+        return employee_id in RoleService.get_manager_map()["by_manager"]
+
+    @staticmethod
+    def managed_organizations(employee_id):
+        return RoleService.get_manager_map()["by_manager"].get(employee_id, [])
+
+    @staticmethod
+    def manager_of(organization_id):
+        return RoleService.get_manager_map()["by_organization"].get(organization_id)
+
+    @staticmethod
+    def current_identity():
+        # JWT 裡的 is_manager 是登入當下算的，這邊換成現在的 manager map，換主管不用重新登入
+        # is_admin 還是看 token（Employee 表改 is_admin 一樣要重新登入）
+        claims = dict(get_jwt_identity())
+        claims["is_manager"] = RoleService.is_manager(claims["employee_id"])
+        return claims
+
+    @staticmethod
+    def invalidate_cache():
+        get_cache().bump(ORGANIZATION_MANAGERS_CACHE_KEY)
@@ -0,0 +1,133 @@
+from datetime import datetime, time, timedelta
+
+
+# 把一個人依時間排好的逼卡配成 (in, out) 區間，再依班別歸到「哪一天的班」
+# 夜班 22:00 進、隔天 06:00 出會算在 22:00 那天，不會被切成兩天各半筆
+class ShiftRules:
+    def __init__(self, windows, early_minutes=120, max_shift_hours=16):
+        # windows: [(上班時間, 下班時間), ...]，下班比上班早就是跨午夜的班
+        self.windows = windows
+        self.early = timedelta(minutes=early_minutes)
+        self.max_shift = timedelta(hours=max_shift_hours)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            parse_shift_windows(config["ATTENDANCE_SHIFT_WINDOWS"]),
+            config["ATTENDANCE_CHECKIN_EARLY_MINUTES"],
+            config["ATTENDANCE_MAX_SHIFT_HOURS"]
+        )
+
+    def _shift_spans(self, moment):
+        # 可能包含 moment 的每一個班：(班的日期, 上班時間, 下班時間)，前一天開始的夜班也算
+        for start, end in self.windows:
+            for day in (moment.date(), moment.date() - timedelta(days=1)):
+                shift_start = datetime.combine(day, start)
+                shift_end = datetime.combine(day + timedelta(days=1) if end <= start else day, end)
+                yield day, shift_start, shift_end
+
+    def work_date_for_in(self, check_in_time):
+        # 上班前 early_minutes 到下班之間進門，就算那個班；都不符合就算當天
+        for day, shift_start, shift_end in self._shift_spans(check_in_time):
+            if shift_start - self.early <= check_in_time < shift_end:
+                return day
+        return check_in_time.date()
+
+    def work_date_for_out(self, check_out_time):
+        # 只有 out 沒有 in（忘了逼卡進門）：落在哪個班的上下班之間就算那個班
+        for day, shift_start, shift_end in self._shift_spans(check_out_time):
+            if shift_start < check_out_time <= shift_end + self.early:
+                return day
+        return check_out_time.date()
+
+    def window_for(self, report_date, check_in_time, check_out_time):
+        # report_date 那天的哪一個班（上班時間, 下班時間）配到這筆出勤，判斷方式跟 work_date_for_in / out 一樣
+        # 沒有設 Work_Schedule 的人拿這個班算遲到早退，夜班才不會被拿白天的上下班時間比；都不符合回傳 None
+        for start, end in self.windows:
+            shift_start = datetime.combine(report_date, start)
+            shift_end = datetime.combine(report_date + timedelta(days=1) if end <= start else report_date, end)
+            if check_in_time:
+                if shift_start - self.early <= check_in_time < shift_end:
+                    return start, end
+            elif check_out_time and shift_start < check_out_time <= shift_end + self.early:
+                return start, end
+        return None
+
+    def pair(self, swipes):
+        # swipes: 同一個人的 [(access_time, direction, gate_id), ...]，時間由早到晚，只掃一次
+        # 回傳 [(in_swipe, out_swipe), ...]，配不到的那邊是 None
+        # 連續兩個 in（例如中午出去沒逼卡）留第一個；連續兩個 out 就把上一段延長到後面那個 out
+        intervals = []
+        open_in = None
+        for swipe in swipes:
+            access_time, direction, _ = swipe
+            if direction == 'in':
+                if open_in is not None and access_time - open_in[0] <= self.max_shift:
+                    continue
+                if open_in is not None:
+                    intervals.append((open_in, None))
+                open_in = swipe
+            elif open_in is not None and access_time - open_in[0] <= self.max_shift:
+                intervals.append((open_in, swipe))
+                open_in = None
+            elif open_in is None and intervals and intervals[-1][0] is not None and intervals[-1][1] is not None \
+                    and access_time - intervals[-1][0][0] <= self.max_shift:
+                intervals[-1] = (intervals[-1][0], swipe)
+            else:
+                if open_in is not None:
+                    intervals.append((open_in, None))
+                    open_in = None
+                intervals.append((None, swipe))
+        if open_in is not None:
+            intervals.append((open_in, None))
+        return intervals
+
+    def daily_attendance(self, swipes):
+        # 回傳 {report_date: {check_in_time, check_in_gate, check_out_time, check_out_gate, total_stay_hours, is_incomplete}}
+        # 一天有好幾段（中午出去再回來）就是 第一個 in / 最後一個 out，停留時數是每一段加起來（只算配成對的）
+        # 配不到的 in / out（還沒下班、忘了逼卡、超過 max_shift）各自算在自己那天，那天標 is_incomplete
+        # 超過 max_shift 的 out 如果歸到的那天已經有配不到的 in，改算在 out 自己的日期，不要跟那個 in 湊成一筆看起來完整的出勤
+        # （一人一天只有一筆，同一個日曆天裡超過 max_shift 的話還是只能放同一筆，但一樣標 is_incomplete、不算時數）
+        days = {}
+        orphan_in_days = set()
+
+        def day_for(report_date):
+            return days.setdefault(report_date, {
+                "check_in_time": None, "check_in_gate": None,
+                "check_out_time": None, "check_out_gate": None,
+                "stay_seconds": None, "is_incomplete": False
+            })
+
+        for check_in, check_out in self.pair(swipes):
+            if check_in:
+                report_date = self.work_date_for_in(check_in[0])
+            else:
+                report_date = self.work_date_for_out(check_out[0])
+                if report_date in orphan_in_days:
+                    report_date = check_out[0].date()
+            day = day_for(report_date)
+            if check_in and (day["check_in_time"] is None or check_in[0] < day["check_in_time"]):
+                day["check_in_time"], day["check_in_gate"] = check_in[0], check_in[2]
+            if check_out and (day["check_out_time"] is None or check_out[0] > day["check_out_time"]):
+                day["check_out_time"], day["check_out_gate"] = check_out[0], check_out[2]
+            if check_in and check_out:
+                day["stay_seconds"] = (day["stay_seconds"] or 0) + (check_out[0] - check_in[0]).total_seconds()
+            else:
+                day["is_incomplete"] = True
+                if check_in:
+                    orphan_in_days.add(report_date)
+
+        for day in days.values():
+            stay_seconds = day.pop("stay_seconds")
+            day["total_stay_hours"] = round(stay_seconds / 3600, 2) if stay_seconds is not None else None
+        return days
+
+
+def parse_shift_windows(spec):
+    # "08:30-17:30,22:00-06:00" -> [(time(8, 30), time(17, 30)), (time(22, 0), time(6, 0))]
+    windows = []
+    for part in spec.split(","):
+        start, end = part.strip().split("-")
+        windows.append((time.fromisoformat(start), time.fromisoformat(end)))
+    return windows
+
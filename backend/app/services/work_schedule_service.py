@@ -0,0 +1,141 @@
+from datetime import datetime, time
+from flask import current_app, g
+from app.models import db
+from app.models.bulk import bulk_upsert
+from app.models.employee_model import EmployeeModel
+from app.models.organization_model import OrganizationModel
+from app.models.organization_closure_model import build_closure_rows
+from app.models.work_schedule_model import WorkScheduleModel
+from app.services.cache_service import get_cache
+from app.services.punctuality import evaluate_punctuality
+from app.services.shift_pairing import ShiftRules
+
+WORK_SCHEDULES_CACHE_KEY = "work_schedules"
+SCOPES = ("organization", "employee")
+
+
+# 班表編譯好的查表：個人 > 自己的組織 > 最近的上層組織 > 配對時配到的班（ATTENDANCE_SHIFT_WINDOWS）> 預設
+# 組織的繼承在建表的時候就攤平，查的時候只是兩次 dict lookup
+class ScheduleLookup:
+    def __init__(self, default, by_employee, by_organization, shift_rules=None):
+        self.default = default
+        self.by_employee = by_employee
+        self.by_organization = by_organization
+        self.shift_rules = shift_rules
+
+    def schedule_for(self, employee_id, organization_id):
+        # 有設 Work_Schedule 才有，沒設回傳 None
+        return self.by_employee.get(employee_id) or self.by_organization.get(organization_id)
+
+    def evaluate(self, employee_id, organization_id, report_date, check_in_time, check_out_time):
+        schedule = self.schedule_for(employee_id, organization_id)
+        if schedule is None and self.shift_rules:
+            # 沒設班表：用配對時配到的那個班，22:00 的夜班 21:50 進門不會被當成 08:30 的班遲到 800 分鐘
+            schedule = self.shift_rules.window_for(report_date, check_in_time, check_out_time)
+        return evaluate_punctuality(report_date, check_in_time, check_out_time, schedule or self.default)
+
+
+class WorkScheduleService:
+    @staticmethod
+    def get_lookup():
+        # 一個 request（或一次 CLI 執行）只拿一次，中途有人改班表也不會一半新一半舊
+        if "work_schedule_lookup" not in g:
+            compiled, _ = get_cache().get_or_build(WORK_SCHEDULES_CACHE_KEY, WorkScheduleService._compile)
+            g.work_schedule_lookup = ScheduleLookup(**compiled, shift_rules=ShiftRules.from_config(current_app.config))
+        return g.work_schedule_lookup
+
+    @staticmethod
+    def _compile():
+        config = current_app.config
+        default = (time.fromisoformat(config["ATTENDANCE_DEFAULT_WORK_START"]), time.fromisoformat(config["ATTENDANCE_DEFAULT_WORK_END"]))
+
+        by_employee, own = {}, {}
+        for schedule in WorkScheduleModel.query.all():
+            target = by_employee if schedule.scope == "employee" else own
+            target[schedule.scope_id] = (schedule.work_start, schedule.work_end)
+
+        # 每個有設班表的組織，把它底下所有部門都填上；同一個部門被好幾層設到就取最近的那層
+        # 階層直接從 parent_department_id 算（跟 closure table 同一個 build_closure_rows），不怕 closure 過期
+        by_organization, nearest = {}, {}
+        if own:
+            parents = dict(db.session.query(OrganizationModel.organization_id, OrganizationModel.parent_department_id).all())
+            for row in build_closure_rows(parents):
+                ancestor_id, descendant_id, depth = row["ancestor_id"], row["descendant_id"], row["depth"]
+                if ancestor_id in own and (descendant_id not in nearest or depth < nearest[descendant_id]):
+                    nearest[descendant_id] = depth
+                    by_organization[descendant_id] = own[ancestor_id]
+            for organization_id, schedule in own.items():
+                by_organization.setdefault(organization_id, schedule)  # 設了班表但 Organization 還沒有這個部門
+
+        return {"default": default, "by_employee": by_employee, "by_organization": by_organization}
+
+    @staticmethod
+    def invalidate_cache():
+        get_cache().bump(WORK_SCHEDULES_CACHE_KEY)
+        g.pop("work_schedule_lookup", None)
+
+    @staticmethod
+    def list_schedules():
+        schedules = WorkScheduleModel.query.order_by(WorkScheduleModel.scope, WorkScheduleModel.scope_id).all()
+        return [WorkScheduleService._to_dict(s) for s in schedules], 200
+
+    @staticmethod
+    def set_schedule(scope, scope_id, data, updated_by):
+        # 只影響之後更新的出勤；已經存起來的日子要用 flask backfill-attendance 重算
+        if scope not in SCOPES:
+            return {"error": "scope must be organization or employee."}, 400
+        try:
+            work_start = time.fromisoformat(data.get("work_start") or "")
+            work_end = time.fromisoformat(data.get("work_end") or "")
+        except ValueError:
+            return {"error": "work_start and work_end must be HH:MM."}, 400
+        if work_start == work_end:
+            return {"error": "work_start and work_end must be different."}, 400
+
+        model = OrganizationModel if scope == "organization" else EmployeeModel
+        if db.session.get(model, scope_id) is None:
+            return {"error": f"{scope.capitalize()} not found."}, 404
+
+        try:
+            bulk_upsert(WorkScheduleModel, [{
+                "scope": scope,
+                "scope_id": scope_id,
+                "work_start": work_start,
+                "work_end": work_end,
+                "updated_at": datetime.now(),
+                "updated_by": updated_by
+            }], ["scope", "scope_id"])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Database error while setting work schedule {scope}/{scope_id}: {str(e)}")
+            return {"error": "Failed to set work schedule.", "details": str(e)}, 500
+
+        WorkScheduleService.invalidate_cache()
+        return {
+            "scope": scope,
+            "scope_id": scope_id,
+            "work_start": work_start.strftime("%H:%M"),
+            "work_end": work_end.strftime("%H:%M")
+        }, 200
+
+    @staticmethod
+    def delete_schedule(scope, scope_id):
+        schedule = WorkScheduleModel.query.filter_by(scope=scope, scope_id=scope_id).first()
+        if not schedule:
+            return {"error": "Work schedule not found."}, 404
+        db.session.delete(schedule)
+        db.session.commit()
+        WorkScheduleService.invalidate_cache()
+        return {"message": "Work schedule deleted."}, 200
+
+    @staticmethod
+    def _to_dict(schedule):
+        return {
+            "scope": schedule.scope,
+            "scope_id": schedule.scope_id,
+            "work_start": schedule.work_start.strftime("%H:%M"),
+            "work_end": schedule.work_end.strftime("%H:%M"),
+            "updated_at": schedule.updated_at.isoformat(),
+            "updated_by": schedule.updated_by
+        }
@@ -0,0 +1,112 @@
+# 比較 AccessLogService.get_employee_logs_by_employeeid_and_date 改寫前後的查詢時間
+#   before: func.date(access_time) == day，沒有 index
+#   after : access_time 落在 [day, day+1)，有 (employee_id, access_time) index
+#
+# 用法（在 backend/ 底下）：
+#   python -m benchmarks.bench_accesslog_lookup --employees 1000 --days 365
+# 跑在 TestingConfig 的 sqlite 記憶體資料庫上
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from app import create_app
+from app.models import db
+from app.models.accesslog_model import AccessLogModel
+from app.models.gate_model import GateModel
+from app.services.accesslog_service import AccessLogService
+
+LOOKUP_INDEX = next(idx for idx in AccessLogModel.__table__.indexes if idx.name == 'ix_access_log_employee_time')
+
+
+def seed(num_employees, num_days, start_day):
+    db.session.add_all([
+        GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+        GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+    ])
+    db.session.commit()
+
+    # 一天一天塞，每天每人一進一出，時間打散讓 log_id 跟員工交錯（比較像真的資料）
+    total = 0
+    for d in range(num_days):
+        day = start_day + timedelta(days=d)
+        rows = []
+        for i in range(num_employees):
+            employee_id = f"EMP{i:05d}"
+            rows.append({"employee_id": employee_id, "access_time": day + timedelta(hours=8, minutes=random.randint(0, 60)), "gate_id": 1})
+            rows.append({"employee_id": employee_id, "access_time": day + timedelta(hours=17, minutes=random.randint(0, 120)), "gate_id": 2})
+        random.shuffle(rows)
+        db.session.execute(insert(AccessLogModel), rows)
+        total += len(rows)
+    db.session.commit()
+    return total
+
+
+def old_lookup(employee_id, day):
+    return db.session.query(
+        AccessLogModel.log_id,
+        AccessLogModel.access_time,
+        GateModel.gate_name,
+        GateModel.direction,
+        GateModel.gate_type
+    ).join(GateModel, AccessLogModel.gate_id == GateModel.gate_id
+    ).filter(
+        AccessLogModel.employee_id == employee_id,
+        func.date(AccessLogModel.access_time) == day.date()
+    ).all()
+
+
+def new_lookup(employee_id, day):
+    logs, status = AccessLogService.get_employee_logs_by_employeeid_and_date(employee_id, day.strftime("%Y-%m-%d"))
+    assert status == 200
+    return logs
+
+
+def run(label, lookup, samples):
+    started = time.perf_counter()
+    rows = 0
+    for employee_id, day in samples:
+        rows += len(lookup(employee_id, day))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {len(samples)} lookups  total {elapsed * 1000:9.1f} ms  avg {elapsed / len(samples) * 1000:7.3f} ms  ({rows} rows)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+
+    random.seed(42)
+    start_day = datetime(2024, 1, 1)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        LOOKUP_INDEX.drop(db.engine)
+
+        started = time.perf_counter()
+        total = seed(args.employees, args.days, start_day)
+        print(f"seeded {total} access logs ({args.employees} employees x {args.days} days) in {time.perf_counter() - started:.1f}s")
+
+        samples = [
+            (f"EMP{random.randrange(args.employees):05d}", start_day + timedelta(days=random.randrange(args.days)))
+            for _ in range(args.lookups)
+        ]
+
+        before = run("before: DATE() filter, no index", old_lookup, samples)
+
+        LOOKUP_INDEX.create(db.engine)
+        run("DATE() filter, with index", old_lookup, samples)
+        after = run("after: range filter, with index", new_lookup, samples)
+
+        print(f"speedup: {before / after:.1f}x")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
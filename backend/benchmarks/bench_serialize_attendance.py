@@ -0,0 +1,134 @@
+# 比較出勤紀錄序列化改寫前後的時間（預設 10 萬筆）
+#   before: ORM 物件 + 每個欄位 strftime + Flask-RESTful 預設的 json.dumps
+#   after : Row tuple + app.serializers（位置拆 Row、直接拼 HH:MM、gate name 整批查）+ orjson（沒裝就是標準 json）
+# --db 會另外量從 sqlite 記憶體資料庫撈出來的時間（ORM 物件 vs 只拿欄位的 Row）
+#
+# 用法（在 backend/ 底下）：
+#   python -m benchmarks.bench_serialize_attendance --rows 100000
+#   python -m benchmarks.bench_serialize_attendance --rows 100000 --db
+import argparse
+import json
+import time
+from collections import namedtuple
+from datetime import date, datetime, time as clock, timedelta
+from decimal import Decimal
+from sqlalchemy import insert
+from app import create_app
+from app.models import db
+from app.models.attendance_model import AttendanceRecordModel
+from app.models.gate_model import GateModel
+from app.serializers import ATTENDANCE_ROW_COLUMNS, attendance_records, dumps, orjson
+from app.services.gate_registry import get_gate_registry
+from app.services.punctuality import evaluate_punctuality
+from app.services.work_schedule_service import WorkScheduleService
+
+DEFAULT_SCHEDULE = (clock(8, 30), clock(17, 30))
+
+
+def make_rows(count):
+    rows = []
+    start = date(2025, 1, 1)
+    for i in range(count):
+        day = start + timedelta(days=i % 28)
+        check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=8, minutes=i % 50)
+        check_out = check_in + timedelta(hours=9, minutes=i % 40)
+        is_late, late_minutes, is_early, early_minutes = evaluate_punctuality(day, check_in, check_out, DEFAULT_SCHEDULE)
+        rows.append({
+            "record_id": i + 1,
+            "employee_id": f"EMP{str(i // 28).zfill(5)}",
+            "report_date": day,
+            "check_in_time": check_in,
+            "check_out_time": check_out,
+            "check_in_gate": 1,
+            "check_out_gate": 2,
+            "total_stay_hours": Decimal(str(round((check_out - check_in).total_seconds() / 3600, 2))),
+            "is_late": is_late,
+            "late_minutes": late_minutes,
+            "is_early_leave": is_early,
+            "early_leave_minutes": early_minutes,
+            "is_incomplete": False,
+            "updated_by": "system"
+        })
+    return rows
+
+
+# 改寫前 _employee_attendance_list 裡的那段
+def serialize_before(records, gates):
+    out = []
+    for record in records:
+        is_late, late_minutes, is_early, early_minutes = evaluate_punctuality(
+            record.report_date, record.check_in_time, record.check_out_time, DEFAULT_SCHEDULE
+        )
+        out.append({
+            "record_id": record.record_id,
+            "report_date": record.report_date.strftime("%Y-%m-%d"),
+            "check_in_time": record.check_in_time.strftime("%H:%M") if record.check_in_time else None,
+            "check_out_time": record.check_out_time.strftime("%H:%M") if record.check_out_time else None,
+            "check_in_gate": gates.gate_name(record.check_in_gate),
+            "check_out_gate": gates.gate_name(record.check_out_gate),
+            "total_stay_hours": float(record.total_stay_hours or 0),
+            "late_arrival_status": "Late" if is_late else "On time",
+            "late_arrival_minutes": late_minutes,
+            "early_departure_status": "Early" if is_early else "On time",
+            "early_departure_minutes": early_minutes,
+            "is_incomplete": bool(record.is_incomplete)  # 後來加的欄位，兩邊輸出才比得起來
+        })
+    return json.dumps(out) + "\n"
+
+
+def serialize_after(records, gates):
+    return dumps(attendance_records(records, gates, WorkScheduleService.get_lookup, "ORG"))
+
+
+def timed(label, fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<44} {best * 1000:9.1f} ms")
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--db", action="store_true", help="另外量從 sqlite 撈出來的時間")
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        db.session.commit()
+        gates = get_gate_registry()
+        gates.all()
+
+        data = make_rows(args.rows)
+        print(f"{args.rows} 筆出勤，JSON encoder：{'orjson ' + orjson.__version__ if orjson else '標準 json'}")
+
+        if args.db:
+            db.session.execute(insert(AttendanceRecordModel), data)
+            db.session.commit()
+            orm_records, _ = timed("load: ORM objects", lambda: AttendanceRecordModel.query.all(), repeat=1)
+            db.session.expunge_all()
+            row_records, _ = timed("load: Row tuples (ATTENDANCE_ROW_COLUMNS)", lambda: db.session.query(*ATTENDANCE_ROW_COLUMNS).all(), repeat=1)
+        else:
+            # 沒有 --db 的時候用 namedtuple 模擬 Row（一樣是 attribute access）
+            orm_records = [AttendanceRecordModel(**row) for row in data]
+            Row = namedtuple("Row", [c.key for c in ATTENDANCE_ROW_COLUMNS])
+            row_records = [Row(*(row[c.key] for c in ATTENDANCE_ROW_COLUMNS)) for row in data]
+
+        before, before_s = timed("before: ORM + strftime + json.dumps", lambda: serialize_before(orm_records, gates))
+        after, after_s = timed("after : Row + serializers + dumps", lambda: serialize_after(row_records, gates))
+
+        assert json.loads(before) == json.loads(after), "兩邊輸出不一樣"
+        print(f"快了 {before_s / after_s:.1f} 倍，輸出 {len(after.encode('utf-8')) / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# 量 create_app("production") 的啟動時間
+#   before: 舊的 init_db，每次開機都在 app context 裡 db.create_all()
+#   after : 現在的 init_db，只讀一筆 Schema_Version
+#
+# 用法（在 backend/ 底下）：
+#   python -m benchmarks.bench_startup --runs 20
+#   python -m benchmarks.bench_startup --database-url "mysql+pymysql://root:pw@127.0.0.1/in_out_bench"
+# 沒給 --database-url 就用暫存的 sqlite 檔案代替 Cloud SQL
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from app import create_app
+from app.create_db import migrate_db
+from app.models import db
+from config import ProductionConfig
+
+
+def old_startup():
+    ProductionConfig.SCHEMA_CHECK_ON_STARTUP = False
+    app = create_app("production")
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def new_startup():
+    ProductionConfig.SCHEMA_CHECK_ON_STARTUP = True
+    return create_app("production")
+
+
+def measure(label, startup, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        app = startup()
+        timings.append(time.perf_counter() - started)
+        with app.app_context():
+            db.engine.dispose()
+    print(f"{label:<40} median {statistics.median(timings) * 1000:8.2f} ms  max {max(timings) * 1000:8.2f} ms")
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    ProductionConfig.SQLALCHEMY_DATABASE_URI = args.database_url or f"sqlite:///{os.path.join(tmp_dir.name, 'bench.db')}"
+
+    # 先把 schema 建好（模擬已經上線的資料庫）
+    ProductionConfig.SCHEMA_CHECK_ON_STARTUP = False
+    app = create_app("production")
+    with app.app_context():
+        migrate_db()
+        db.engine.dispose()
+
+    before = measure("before: create_all on every boot", old_startup, args.runs)
+    after = measure("after: schema version check", new_startup, args.runs)
+    print(f"saved {(before - after) * 1000:.2f} ms per cold start")
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
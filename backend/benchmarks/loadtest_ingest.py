@@ -0,0 +1,284 @@
+# 逼卡 ingestion 壓測：用 app/generate_accesslog.py 的進出流量模型（08:25 左右的尖峰、遲到、加班、請假）產生一天的逼卡，
+# 把時間壓縮之後用 N 個 sender 同時送，量每筆 ingest 的延遲（p50/p95/p99）和每秒寫入幾筆
+#   --target push : 打 POST /api/v1/pubsub/access-logs（沒給 --url 就在本機用 Flask test client + 暫存 sqlite 檔案）
+#   --target pull : 丟進行程內的假 broker，由 AccessLogPullWorker 拉下來寫，延遲算 publish 到 ack
+# --speedup 600 表示模擬的 1 分鐘只花 0.1 秒送完；給多個（600,1200,2400）會一段一段加壓，看哪一段開始塞車
+#
+# 用法（在 backend/ 底下）：
+#   python -m benchmarks.loadtest_ingest --employees 2000 --window 07:45-09:15 --speedup 300,600,1200 --senders 32
+#   python -m benchmarks.loadtest_ingest --target pull --employees 5000 --speedup 1200
+#   python -m benchmarks.loadtest_ingest --url https://<service>/api/v1/pubsub/access-logs --senders 64
+#   python -m benchmarks.loadtest_ingest --database-url "mysql+pymysql://root:pw@127.0.0.1/in_out_bench"
+# 打真的服務時，Employee / Gate 要先有 EMP00001... 和 1~7 號 gate（FK）
+import argparse
+import base64
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import insert
+from app import create_app
+from app.create_db import migrate_db
+from app.generate_accesslog import GATE_IN_IDS, GATE_OUT_IDS, generate_day_records
+from app.models import db
+from app.models.employee_model import EmployeeModel
+from app.models.gate_model import GateModel
+from app.pubsub_subscriber import AccessLogPullWorker
+from app.services.accesslog_buffer import get_accesslog_buffer
+from config import ProductionConfig
+
+PUSH_PATH = "/api/v1/pubsub/access-logs"
+
+
+def build_schedule(day, num_employees, window):
+    employee_ids = [f"EMP{str(i).zfill(5)}" for i in range(1, num_employees + 1)]
+    records, info = generate_day_records(day, employee_ids)
+
+    start, end = (datetime.combine(day, datetime.strptime(t, "%H:%M").time()) for t in window.split("-"))
+    records = [r for r in records if start <= datetime.fromisoformat(r["access_time"]) < end]
+    records.sort(key=lambda r: r["access_time"])
+    print(f"📅 {day}：{info['present']} 人到班，{window} 之間 {len(records)} 筆逼卡")
+    return records
+
+
+# 模擬時間換成實際要送出的秒數（相對於開始時間）
+def to_offsets(records, speedup):
+    first = datetime.fromisoformat(records[0]["access_time"])
+    return [(datetime.fromisoformat(r["access_time"]) - first).total_seconds() / speedup for r in records]
+
+
+def seed(app, num_employees):
+    with app.app_context():
+        migrate_db()
+        if GateModel.query.count() == 0:
+            db.session.add_all(
+                [GateModel(gate_id=g, gate_name=f"IN-{g}", direction="in", gate_type="entry") for g in GATE_IN_IDS]
+                + [GateModel(gate_id=g, gate_name=f"OUT-{g}", direction="out", gate_type="exit") for g in GATE_OUT_IDS]
+            )
+        existing = {e for (e,) in db.session.query(EmployeeModel.employee_id)}
+        now = datetime.now()
+        rows = [{
+            "employee_id": f"EMP{str(i).zfill(5)}",
+            "first_name": "Load",
+            "last_name": str(i),
+            "phone_number": "0900000000",
+            "email": f"load{i}@example.com",
+            "organization_id": "LOADTEST",
+            "job_title": "Staff",
+            "hire_date": now,
+            "hire_status": "Active",
+            "is_admin": False,
+            "updated_at": now,
+            "updated_by": "loadtest",
+            "hashed_password": "x"
+        } for i in range(1, num_employees + 1) if f"EMP{str(i).zfill(5)}" not in existing]
+        if rows:
+            db.session.execute(insert(EmployeeModel), rows)
+        db.session.commit()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+# N 個 sender 從同一個 queue 拿，時間還沒到就等，到了就送；send 回傳 HTTP status（pull 模式只是 publish）
+def run_senders(records, offsets, senders, make_send):
+    jobs = queue.Queue()
+    for i, (record, offset) in enumerate(zip(records, offsets)):
+        jobs.put((i, record, offset))
+
+    results = []  # (latency_s, status, lag_s)
+    results_lock = threading.Lock()
+    started = time.perf_counter() + 0.05
+
+    def sender():
+        send = make_send()
+        local = []
+        while True:
+            try:
+                i, record, offset = jobs.get_nowait()
+            except queue.Empty:
+                break
+            due = started + offset
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            t0 = time.perf_counter()
+            status = send(i, record)
+            local.append((time.perf_counter() - t0, status, t0 - due))
+        with results_lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=sender) for _ in range(senders)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, started
+
+
+def encode(record):
+    payload = {k: record[k] for k in ("employee_id", "access_time", "gate_id")}
+    return json.dumps(payload).encode("utf-8")
+
+
+def push_stage(app, url, records, offsets, senders, run_id):
+    def make_send():
+        if url:
+            import requests
+            session = requests.Session()
+
+            def send(i, record):
+                envelope = {"message": {"data": base64.b64encode(encode(record)).decode("utf-8"), "messageId": f"{run_id}-{i}"}}
+                try:
+                    return session.post(url, json=envelope, timeout=30).status_code
+                except Exception:
+                    return 599
+            return send
+
+        client = app.test_client()
+
+        def send(i, record):
+            envelope = {"message": {"data": base64.b64encode(encode(record)).decode("utf-8"), "messageId": f"{run_id}-{i}"}}
+            return client.post(PUSH_PATH, json=envelope).status_code
+        return send
+
+    results, started = run_senders(records, offsets, senders, make_send)
+    wall = time.perf_counter() - started
+    return [latency for latency, _, _ in results], [status for _, status, _ in results], [lag for _, _, lag in results], wall
+
+
+# 行程內的假 broker，介面跟 SubscriberClient 一樣，ack 的時候記下 publish → ack 的時間
+class FakeBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = deque()
+        self._published_at = {}
+        self.latencies = []
+        self.statuses = []
+
+    def publish(self, message_id, data):
+        with self._lock:
+            self._published_at[message_id] = time.perf_counter()
+            self._ready.append(SimpleNamespace(ack_id=message_id, message=SimpleNamespace(data=data, message_id=message_id)))
+
+    def pull(self, request, timeout=None):
+        with self._lock:
+            batch = [self._ready.popleft() for _ in range(min(request["max_messages"], len(self._ready)))]
+        return SimpleNamespace(received_messages=batch)
+
+    def acknowledge(self, request):
+        now = time.perf_counter()
+        with self._lock:
+            for ack_id in request["ack_ids"]:
+                self.latencies.append(now - self._published_at.pop(ack_id))
+                self.statuses.append(200)
+
+    def modify_ack_deadline(self, request):
+        now = time.perf_counter()
+        with self._lock:
+            for ack_id in request["ack_ids"]:
+                self.latencies.append(now - self._published_at.pop(ack_id))
+                self.statuses.append(500)
+
+    def outstanding(self):
+        with self._lock:
+            return len(self._published_at)
+
+
+def pull_stage(app, records, offsets, senders, run_id, max_messages):
+    broker = FakeBroker()
+    worker = AccessLogPullWorker(broker, "projects/loadtest/subscriptions/loadtest", max_messages=max_messages, idle_seconds=0.005)
+
+    def run_worker():
+        with app.app_context():
+            worker.run()
+
+    worker_thread = threading.Thread(target=run_worker)
+    worker_thread.start()
+
+    def make_send():
+        def send(i, record):
+            broker.publish(f"{run_id}-{i}", encode(record))
+            return 200
+        return send
+
+    results, started = run_senders(records, offsets, senders, make_send)
+    while broker.outstanding():
+        time.sleep(0.01)
+    wall = time.perf_counter() - started
+    worker.stop()
+    worker_thread.join()
+    print(f"pull worker：{worker.stats['batches']} 批，平均一批 {worker.stats['acked'] / max(worker.stats['batches'], 1):.1f} 筆")
+    return broker.latencies, broker.statuses, [lag for _, _, lag in results], wall
+
+
+def report(speedup, offsets, latencies, statuses, lags, wall):
+    latencies = sorted(latencies)
+    ok = sum(1 for s in statuses if s < 300)
+    offered_peak = max(Counter(int(o) for o in offsets).values())
+    print(
+        f"speedup x{speedup:<6} sent {len(statuses):6d}  ok {ok:6d}  err {len(statuses) - ok:5d}  "
+        f"peak offered {offered_peak:6d}/s  rows/s {ok / wall:8.1f}  "
+        f"p50 {percentile(latencies, 50) * 1000:8.2f} ms  p95 {percentile(latencies, 95) * 1000:8.2f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:8.2f} ms  sender lag p99 {percentile(sorted(lags), 99) * 1000:8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["push", "pull"], default="push")
+    parser.add_argument("--url", help="push 到真的服務（不給就用本機 Flask test client）")
+    parser.add_argument("--database-url")
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--day", default="2025-04-07")
+    parser.add_argument("--window", default="07:45-09:15", help="只送這段模擬時間的逼卡，預設是早上進門的尖峰")
+    parser.add_argument("--speedup", default="600", help="時間壓縮倍數，可以用逗號給多段逐段加壓")
+    parser.add_argument("--senders", type=int, default=16)
+    parser.add_argument("--batch-wait-ms", type=int, default=20)
+    parser.add_argument("--pull-max-messages", type=int, default=500)
+    args = parser.parse_args()
+    if args.target == "pull" and args.url:
+        parser.error("--target pull 只能在本機跑（假 broker），不能搭配 --url")
+
+    records = build_schedule(datetime.strptime(args.day, "%Y-%m-%d").date(), args.employees, args.window)
+    if not records:
+        return
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    app = None
+    if not args.url:
+        ProductionConfig.SQLALCHEMY_DATABASE_URI = args.database_url or f"sqlite:///{os.path.join(tmp_dir.name, 'loadtest.db')}"
+        ProductionConfig.SCHEMA_CHECK_ON_STARTUP = False
+        ProductionConfig.ACCESSLOG_BATCH_WAIT_MS = args.batch_wait_ms
+        app = create_app("production")
+        seed(app, args.employees)
+
+    run_id = uuid.uuid4().hex[:8]
+    for stage, speedup in enumerate(float(s) for s in args.speedup.split(",")):
+        offsets = to_offsets(records, speedup)
+        stage_id = f"{run_id}-{stage}"
+        if args.target == "pull":
+            latencies, statuses, lags, wall = pull_stage(app, records, offsets, args.senders, stage_id, args.pull_max_messages)
+        else:
+            latencies, statuses, lags, wall = push_stage(app, args.url, records, offsets, args.senders, stage_id)
+        report(speedup, offsets, latencies, statuses, lags, wall)
+
+    if app and args.target == "push":
+        with app.app_context():
+            stats = get_accesslog_buffer().stats()
+            print(f"buffer：平均一批 {stats['avg_batch_size']} 筆，最大 {stats['max_batch_size']} 筆，flush 平均 {stats['avg_flush_ms']} ms")
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import base64
+import json
+import threading
+import time
+from app.models import db
+from app.models.accesslog_model import AccessLogModel
+from app.services.accesslog_buffer import AccessLogBuffer
+from app.pubsub_subscriber import AccessLogPullWorker
+from types import SimpleNamespace
+
+
+def make_envelope(payload, message_id="1"):
+    data = base64.b64encode(json.dumps(payload).encode("utf-8")).decode("utf-8")
+    return {"message": {"data": data, "messageId": message_id}, "subscription": "test-sub"}
+
+
+# 測試 POST /api/v1/pubsub/access-logs 寫入成功
+def test_pubsub_push_creates_access_log(client):
+    res = client.post("/api/v1/pubsub/access-logs", json=make_envelope({
+        "employee_id": "E001",
+        "access_time": "2025-05-01T08:20:00",
+        "gate_id": 1
+    }))
+
+    assert res.status_code == 201
+
+    with client.application.app_context():
+        logs = AccessLogModel.query.filter_by(employee_id="E001").all()
+        assert len(logs) == 1
+        assert logs[0].gate_id == 1
+
+
+# 測試缺欄位會被擋下來
+def test_pubsub_push_missing_fields(client):
+    res = client.post("/api/v1/pubsub/access-logs", json=make_envelope({
+        "employee_id": "E001"
+    }))
+
+    assert res.status_code == 400
+    assert res.get_json()["error"] == "Missing fields in pubsub data"
+
+
+# 測試 Pub/Sub 重送同一則訊息只會寫一筆：先被 dedup cache 擋，cache 清掉了也會被 unique index 擋
+def test_pubsub_push_is_idempotent(client):
+    from app.services.dedup_cache import get_dedup_cache
+
+    envelope = make_envelope({"employee_id": "E001", "access_time": "2025-05-01T08:20:00", "gate_id": 1}, message_id="42")
+
+    assert client.post("/api/v1/pubsub/access-logs", json=envelope).status_code == 201
+    res = client.post("/api/v1/pubsub/access-logs", json=envelope)
+    assert res.status_code == 200
+    assert res.get_json()["message"] == "Duplicate access log ignored."
+
+    with client.application.app_context():
+        get_dedup_cache()._keys.clear()
+    assert client.post("/api/v1/pubsub/access-logs", json=envelope).status_code == 201
+
+    # 不同 messageId 的是另一筆
+    other = make_envelope({"employee_id": "E001", "access_time": "2025-05-01T08:20:00", "gate_id": 1}, message_id="43")
+    assert client.post("/api/v1/pubsub/access-logs", json=other).status_code == 201
+
+    with client.application.app_context():
+        logs = AccessLogModel.query.filter_by(employee_id="E001").all()
+        assert sorted(log.dedup_key for log in logs) == ["msg:42", "msg:43"]
+
+
+def _wait_pending(buffer, count):
+    deadline = time.monotonic() + 5
+    while buffer.stats()["pending"] < count:
+        assert time.monotonic() < deadline, "submit 沒有進到 buffer"
+        time.sleep(0.001)
+
+
+def _start(target, args_list):
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for t in threads:
+        t.start()
+    return threads
+
+
+# 測試只有自己一筆的時候馬上寫，不用等 max_wait（sync worker 一次只有一個 request）
+def test_accesslog_buffer_flushes_alone_without_waiting():
+    flushed = []
+
+    def fake_flush(rows):
+        flushed.append(list(rows))
+        return {"message": "ok"}, 201
+
+    buffer = AccessLogBuffer(max_batch_size=100, max_wait_ms=2000, flush_fn=fake_flush)
+    started = time.monotonic()
+    assert buffer.submit("E001", "2025-05-01T08:20:00", 1)[1] == 201
+    assert time.monotonic() - started < 1
+    assert [len(batch) for batch in flushed] == [1]
+
+
+# 測試 leader 在寫的時候進來的 submit 會被合併成下一次 flush
+def test_accesslog_buffer_groups_concurrent_submits():
+    flushed = []
+    release = threading.Event()
+
+    def fake_flush(rows):
+        flushed.append(list(rows))
+        if len(flushed) == 1:
+            release.wait(5)  # 第一批卡住，讓後面的人排進來
+        return {"message": "ok"}, 201
+
+    buffer = AccessLogBuffer(max_batch_size=4, max_wait_ms=2000, flush_fn=fake_flush)
+    results = []
+
+    def worker(i):
+        results.append(buffer.submit(f"E{i:03d}", "2025-05-01T08:20:00", 1))
+
+    threads = _start(worker, [(0,)])
+    while not flushed:
+        time.sleep(0.001)
+    threads += _start(worker, [(i,) for i in range(1, 5)])
+    _wait_pending(buffer, 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert [len(batch) for batch in flushed] == [1, 4]
+    assert len(results) == 5
+    assert all(status == 201 for _, status in results)
+
+    stats = buffer.stats()
+    assert stats["batches_flushed"] == 2
+    assert stats["max_batch_size"] == 4
+
+
+# 測試 leader 寫滿 max_leader_rounds 批就交棒，剩下的由還在等的人接手寫
+def test_accesslog_buffer_leader_hands_off_after_max_rounds():
+    flushed = []
+    release = threading.Event()
+
+    def fake_flush(rows):
+        flushed.append((threading.current_thread().name, len(rows)))
+        if len(flushed) == 1:
+            release.wait(5)
+        return {"message": "ok"}, 201
+
+    buffer = AccessLogBuffer(max_batch_size=1, max_wait_ms=0, max_leader_rounds=2, flush_fn=fake_flush)
+    results = []
+
+    def worker(i):
+        results.append(buffer.submit(f"E{i:03d}", "2025-05-01T08:20:00", 1))
+
+    leader = threading.Thread(target=worker, args=(0,), name="leader")
+    leader.start()
+    while not flushed:
+        time.sleep(0.001)
+    threads = [threading.Thread(target=worker, args=(i,), name=f"w{i}") for i in range(1, 5)]
+    for t in threads:
+        t.start()
+    _wait_pending(buffer, 4)
+    release.set()
+    for t in [leader] + threads:
+        t.join()
+
+    assert len(results) == 5 and all(status == 201 for _, status in results)
+    assert sum(1 for name, _ in flushed if name == "leader") == 2
+
+
+# 測試整批失敗時會退回逐筆寫入，只有壞掉的那筆回 error
+def test_accesslog_buffer_isolates_bad_rows():
+    release = threading.Event()
+    calls = []
+
+    def fake_flush(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            release.wait(5)
+        if any(row["gate_id"] == 999 for row in rows):
+            return {"error": "fk"}, 500
+        return {"message": "ok"}, 201
+
+    buffer = AccessLogBuffer(max_batch_size=2, max_wait_ms=2000, flush_fn=fake_flush)
+    results = {}
+
+    def worker(gate_id):
+        results[gate_id] = buffer.submit("E001", "2025-05-01T08:20:00", gate_id)
+
+    threads = _start(worker, [(2,)])
+    while not calls:
+        time.sleep(0.001)
+    threads += _start(worker, [(1,), (999,)])
+    _wait_pending(buffer, 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results[1][1] == 201
+    assert results[999][1] == 500
+    assert buffer.stats()["failed_batches"] == 1
+
+
+def test_export_access_logs_streams_ndjson_and_csv(client):
+    from datetime import datetime
+    from flask_jwt_extended import create_access_token
+    from app.models.employee_model import EmployeeModel
+    from app.models.gate_model import GateModel
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        for employee_id, org in [("E001", "ORGA"), ("E002", "ORGB")]:
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Emp",
+                last_name=employee_id,
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id=org,
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ))
+        db.session.add_all([
+            AccessLogModel(employee_id="E001", access_time=datetime(2025, 5, 1, 8, 20), gate_id=1),
+            AccessLogModel(employee_id="E001", access_time=datetime(2025, 5, 1, 17, 40), gate_id=2),
+            AccessLogModel(employee_id="E002", access_time=datetime(2025, 5, 2, 8, 25), gate_id=1),
+            AccessLogModel(employee_id="E002", access_time=datetime(2025, 6, 1, 8, 25), gate_id=1),
+        ])
+        db.session.commit()
+        token = create_access_token(identity={"employee_id": "ADMIN1", "is_admin": True, "is_manager": False})
+
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.get("/api/v1/access-logs/export?start=2025-05-01&end=2025-05-31", headers=headers)
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert [row["employee_id"] for row in rows] == ["E001", "E001", "E002"]
+    assert rows[0]["gate_name"] == "IN"
+
+    res = client.get("/api/v1/access-logs/export?start=2025-05-01&end=2025-05-31&format=csv&organization_id=ORGA&gate_id=2", headers=headers)
+    assert res.status_code == 200
+    lines = res.get_data(as_text=True).splitlines()
+    assert lines[0] == "log_id,employee_id,access_time,gate_id,gate_name,direction,gate_type"
+    assert lines[1:] == ["2,E001,2025-05-01T17:40:00,2,OUT,out,exit"]
+
+    res = client.get("/api/v1/access-logs/export?start=2025-05-31&end=2025-05-01", headers=headers)
+    assert res.status_code == 400
+
+    # gate_id 不是整數要回 400，不能當成沒篩選整個匯出
+    res = client.get("/api/v1/access-logs/export?start=2025-05-01&end=2025-05-31&gate_id=abc", headers=headers)
+    assert res.status_code == 400
+    assert res.get_json()["error"] == "gate_id must be an integer."
+
+
+# 假的 Pub/Sub broker：pull 回傳 queue 裡的訊息，ack/nack 記下來
+class FakeSubscriberClient:
+    def __init__(self, payloads):
+        self.messages = [
+            SimpleNamespace(ack_id=f"ack-{i}", message=SimpleNamespace(data=payload, message_id=str(i)))
+            for i, payload in enumerate(payloads)
+        ]
+        self.acked, self.nacked = [], []
+
+    def pull(self, request, timeout=None):
+        batch = self.messages[:request["max_messages"]]
+        del self.messages[:request["max_messages"]]
+        return SimpleNamespace(received_messages=batch)
+
+    def acknowledge(self, request):
+        self.acked.extend(request["ack_ids"])
+
+    def modify_ack_deadline(self, request):
+        self.nacked.extend(request["ack_ids"])
+
+
+# 測試 pull worker：一批寫入、commit 後才 ack，格式錯的 ack 掉，寫不進去的 nack
+def test_pull_worker_writes_batch_and_acks_after_commit(client):
+    payloads = [
+        json.dumps({"employee_id": "E001", "access_time": "2025-05-01T08:20:00", "gate_id": 1}).encode(),
+        json.dumps({"employee_id": "E002", "access_time": "2025-05-01T08:21:00", "gate_id": 1}).encode(),
+        json.dumps({"employee_id": "E003"}).encode(),
+        b"not json",
+    ]
+    broker = FakeSubscriberClient(payloads)
+
+    with client.application.app_context():
+        worker = AccessLogPullWorker(broker, "projects/p/subscriptions/s", max_messages=10)
+        assert worker.pull_once() == 4
+        assert worker.pull_once() == 0
+
+        assert AccessLogModel.query.count() == 2
+        assert sorted(broker.acked) == ["ack-0", "ack-1", "ack-2", "ack-3"]
+        assert broker.nacked == []
+        assert worker.stats["malformed"] == 2
+
+
+def test_pull_worker_nacks_rows_that_fail_to_write(client):
+    def fake_flush(rows):
+        if any(row["gate_id"] == 999 for row in rows):
+            return {"error": "fk"}, 500
+        return {"message": "ok"}, 201
+
+    broker = FakeSubscriberClient([
+        json.dumps({"employee_id": "E001", "access_time": "2025-05-01T08:20:00", "gate_id": 1}).encode(),
+        json.dumps({"employee_id": "E001", "access_time": "2025-05-01T08:20:00", "gate_id": 999}).encode(),
+    ])
+
+    with client.application.app_context():
+        worker = AccessLogPullWorker(broker, "projects/p/subscriptions/s", flush_fn=fake_flush)
+        worker.pull_once()
+
+    assert broker.acked == ["ack-0"]
+    assert broker.nacked == ["ack-1"]
+
+
+# 測試 pull worker 也會用 dedup cache 擋掉重送的訊息
+def test_pull_worker_skips_redelivered_messages(client):
+    from app.services.dedup_cache import RecentKeyCache
+
+    payload = json.dumps({"employee_id": "E001", "access_time": "2025-05-01T08:20:00", "gate_id": 1}).encode()
+    cache = RecentKeyCache(maxsize=10)
+
+    with client.application.app_context():
+        first = FakeSubscriberClient([payload])
+        AccessLogPullWorker(first, "projects/p/subscriptions/s", dedup_cache=cache).pull_once()
+
+        redelivered = FakeSubscriberClient([payload])
+        worker = AccessLogPullWorker(redelivered, "projects/p/subscriptions/s", dedup_cache=cache)
+        worker.pull_once()
+
+        assert redelivered.acked == ["ack-0"]
+        assert worker.stats["duplicates"] == 1
+        assert AccessLogModel.query.count() == 1
+
+
+# 測試沒設 PUBSUB_PROJECT_ID 的話 pull worker 直接不啟動，不會默默連去別的 GCP 專案
+def test_pull_worker_requires_project_id(monkeypatch):
+    import pytest
+    import config
+    from app import pubsub_subscriber
+
+    monkeypatch.setenv("APP_CONFIG", "testing")
+    monkeypatch.setattr(config.TestingConfig, "PUBSUB_PROJECT_ID", None)
+    with pytest.raises(RuntimeError, match="PUBSUB_PROJECT_ID"):
+        pubsub_subscriber.main()
+
+
+# 測試 backfill 產生器：同一天同 seed 結果一樣，每個到班的人剛好一進一出
+def test_backfill_day_arrays_are_deterministic():
+    from datetime import date
+    import numpy as np
+    from app.backfill_accesslog import gen_day_arrays
+    from app.generate_accesslog import GATE_IN_IDS
+
+    day = date(2025, 4, 7)
+    idx, times, gates = gen_day_arrays(day, 500, seed=1)
+    idx2, times2, gates2 = gen_day_arrays(day, 500, seed=1)
+
+    assert np.array_equal(idx, idx2) and np.array_equal(times, times2) and np.array_equal(gates, gates2)
+    half = len(idx) // 2
+    assert np.array_equal(idx[:half], idx[half:])
+    assert set(gates[:half].tolist()) <= set(GATE_IN_IDS)
+    assert (times[:half] < times[half:]).all()  # 進門一定比出門早
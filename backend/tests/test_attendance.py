@@ -6,6 +6,19 @@ from app.models.employee_model import EmployeeModel
 from app.models.gate_model import GateModel
 from app.models.accesslog_model import AccessLogModel
 from app.models.organization_model import OrganizationModel
+from app.services.gate_registry import GateRegistry, get_gate_registry
+from app.services.organization_service import OrganizationService
+from app.services.role_service import RoleService
+from app.services.work_schedule_service import WorkScheduleService
+
+# 重算一段期間要 admin
+def admin_headers(client):
+    from flask_jwt_extended import create_access_token
+
+    with client.application.app_context():
+        token = create_access_token(identity={"employee_id": "ADMIN1", "is_admin": True, "is_manager": False})
+    return {"Authorization": f"Bearer {token}"}
+
 
 def test_update_attendance_success(client):
     with client.application.app_context():
@@ -228,3 +241,766 @@ def test_get_attendance_by_organization_success(client):
     first_record = matched_emp["records"][0]
     assert isinstance(first_record["check_in_gate"], str)  # ✅ 加入 gate_name 檢查
     assert isinstance(first_record["check_out_gate"], str)
+
+
+# 測試出勤更新是增量的：第二次只處理新的逼卡，並跟前一次的結果合併
+def test_update_attendance_incremental(client):
+    from app.models.attendance_model import AttendanceRecordModel
+    from app.models.attendance_watermark_model import AttendanceWatermarkModel
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with client.application.app_context():
+        gate_in = GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry")
+        gate_out = GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        db.session.add_all([gate_in, gate_out])
+        db.session.add(AccessLogModel(employee_id="E001", access_time=today + timedelta(hours=8, minutes=10), gate_id=1))
+        db.session.commit()
+
+    # 第一次：只有 in，先存成未完成的紀錄
+    res = client.put("/api/v1/attendance/update")
+    assert res.status_code == 200
+
+    with client.application.app_context():
+        record = AttendanceRecordModel.query.filter_by(employee_id="E001").one()
+        assert record.check_in_time == today + timedelta(hours=8, minutes=10)
+        assert record.check_out_time is None
+
+        # 下班的 out 和一筆比較晚的 in 進來
+        db.session.add_all([
+            AccessLogModel(employee_id="E001", access_time=today + timedelta(hours=17, minutes=10), gate_id=2),
+            AccessLogModel(employee_id="E001", access_time=today + timedelta(hours=12, minutes=0), gate_id=1)
+        ])
+        db.session.commit()
+
+    # 第二次：只折進新的兩筆
+    res = client.put("/api/v1/attendance/update")
+    assert res.status_code == 200
+
+    with client.application.app_context():
+        records = AttendanceRecordModel.query.filter_by(employee_id="E001").all()
+        assert len(records) == 1
+        assert records[0].check_in_time == today + timedelta(hours=8, minutes=10)
+        assert records[0].check_out_time == today + timedelta(hours=17, minutes=10)
+        assert float(records[0].total_stay_hours) == 9.0
+
+        watermark = db.session.get(AttendanceWatermarkModel, today.date())
+        assert watermark.last_log_id == 3
+
+
+# 測試組織出勤查詢的 SQL 次數不會隨員工人數增加（避免 N+1 又回來）
+def test_get_attendance_by_organization_query_count_constant(client):
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+    from app.models.attendance_model import AttendanceRecordModel
+
+    def seed_employees(org_id, count):
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        for i in range(count):
+            employee_id = f"{org_id}-E{i:03d}"
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Emp",
+                last_name=str(i),
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id=org_id,
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ))
+            db.session.add(AttendanceRecordModel(
+                employee_id=employee_id,
+                report_date=today.date(),
+                check_in_time=today + timedelta(hours=8, minutes=40),
+                check_out_time=today + timedelta(hours=17, minutes=40),
+                check_in_gate=1,
+                check_out_gate=2,
+                total_stay_hours=9,
+                updated_by="system"
+            ))
+        db.session.commit()
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        seed_employees("SMALL", 2)
+        seed_employees("LARGE", 20)
+        token = create_access_token(identity={"employee_id": "ADMIN1", "is_admin": True, "is_manager": False})
+        engine = db.engine
+        # gate registry、manager map 第一次用會各載一次，先載好再算 query 數
+        get_gate_registry().all()
+        RoleService.get_manager_map()
+        WorkScheduleService.get_lookup()  # 直接塞的出勤紀錄沒有存遲到欄位，讀的時候會用到班表
+        OrganizationService.get_cached_organization_tree()  # 出勤的 ETag 有用到組織樹的版本
+
+    headers = {"Authorization": f"Bearer {token}"}
+    month = datetime.now().strftime("%Y-%m")
+
+    def count_queries(org_id):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            res = client.get(f"/api/v1/attendance/organizations/{org_id}?month={month}", headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+        assert res.status_code == 200
+        return len(statements), res.get_json()
+
+    small_count, small_data = count_queries("SMALL")
+    large_count, large_data = count_queries("LARGE")
+
+    assert len(small_data) == 2
+    assert len(large_data) == 20
+    assert all(len(emp["records"]) == 1 for emp in large_data)
+    assert large_count == small_count
+
+
+# 測試出勤更新會維護月彙總，彙總 API 直接讀彙總表
+def test_monthly_summary_maintained_by_update(client):
+    from flask_jwt_extended import create_access_token
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    month = today.strftime("%Y-%m")
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        for employee_id in ["E201", "E202"]:
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Emp",
+                last_name=employee_id,
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id="ORGS",
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ))
+        db.session.add_all([
+            # E201 遲到 15 分鐘、早退 30 分鐘
+            AccessLogModel(employee_id="E201", access_time=today + timedelta(hours=8, minutes=45), gate_id=1),
+            AccessLogModel(employee_id="E201", access_time=today + timedelta(hours=17), gate_id=2),
+            # E202 準時
+            AccessLogModel(employee_id="E202", access_time=today + timedelta(hours=8), gate_id=1),
+            AccessLogModel(employee_id="E202", access_time=today + timedelta(hours=18), gate_id=2),
+        ])
+        db.session.commit()
+        token = create_access_token(identity={"employee_id": "ADMIN1", "is_admin": True, "is_manager": False})
+
+    assert client.put("/api/v1/attendance/update").status_code == 200
+
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.get(f"/api/v1/attendance/summary/employees/E201?month={month}", headers=headers)
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data["days_present"] == 1
+    assert data["late_count"] == 1
+    assert data["late_minutes"] == 15
+    assert data["early_leave_count"] == 1
+    assert data["early_leave_minutes"] == 30
+    assert data["total_stay_hours"] == 8.25
+
+    res = client.get(f"/api/v1/attendance/summary/organizations/ORGS?month={month}", headers=headers)
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data["employee_count"] == 2
+    assert data["days_present"] == 2
+    assert data["late_count"] == 1
+    assert data["total_stay_hours"] == 18.25
+
+    res = client.get("/api/v1/attendance/summary/organizations/ORGS?month=2025-13", headers=headers)
+    assert res.status_code == 400
+
+
+# 測試 gate registry：載入一次就能查、遇到新的 gate_id 會重載、invalidate 之後重新載入
+def test_gate_registry_reloads_on_miss(client):
+    with client.application.app_context():
+        db.session.add(GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"))
+        db.session.commit()
+
+        registry = GateRegistry(ttl_seconds=300, miss_reload_seconds=0)
+        assert registry.gate_name(1) == "IN"
+        assert registry.direction(1) == "in"
+        assert registry.get(None) is None
+
+        db.session.add(GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit"))
+        db.session.commit()
+        assert registry.direction(2) == "out"
+
+        GateModel.query.filter_by(gate_id=1).update({"gate_name": "MAIN IN"})
+        db.session.commit()
+        assert registry.gate_name(1) == "IN"
+        registry.invalidate()
+        assert registry.gate_name(1) == "MAIN IN"
+
+
+# 測試 include_descendants：整棵子樹依部門分組回傳，SQL 次數不會隨部門數增加
+def test_get_attendance_by_organization_include_descendants(client):
+    import re
+    from flask_jwt_extended import create_access_token
+    from app.models.attendance_model import AttendanceRecordModel
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def add_department(org_id, parent_id, employee_count):
+        db.session.add(OrganizationModel(organization_id=org_id, organization_name=f"Dept {org_id}", parent_department_id=parent_id))
+        for i in range(employee_count):
+            employee_id = f"{org_id}-E{i}"
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Emp",
+                last_name=str(i),
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id=org_id,
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ))
+            db.session.add(AttendanceRecordModel(
+                employee_id=employee_id,
+                report_date=today.date(),
+                check_in_time=today + timedelta(hours=8, minutes=10),
+                check_out_time=today + timedelta(hours=17, minutes=40),
+                check_in_gate=1,
+                check_out_gate=2,
+                total_stay_hours=9.5,
+                updated_by="system"
+            ))
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        add_department("DIV", None, 1)
+        add_department("DEPA", "DIV", 2)
+        add_department("DEPB", "DIV", 1)
+        add_department("TEAMA1", "DEPA", 3)
+        add_department("OTHER", None, 2)
+        db.session.commit()
+        token = create_access_token(identity={"employee_id": "ADMIN1", "is_admin": True, "is_manager": False})
+        get_gate_registry().all()
+        RoleService.get_manager_map()
+        WorkScheduleService.get_lookup()  # 直接塞的出勤紀錄沒有存遲到欄位，讀的時候會用到班表
+        OrganizationService.get_cached_organization_tree()  # 出勤的 ETag 有用到組織樹的版本
+
+    headers = {"Authorization": f"Bearer {token}"}
+    month = datetime.now().strftime("%Y-%m")
+
+    def fetch(org_id):
+        res = client.get(f"/api/v1/attendance/organizations/{org_id}?month={month}&include_descendants=true", headers=headers)
+        queries = int(re.search(r'desc="(\d+) queries"', res.headers["Server-Timing"]).group(1))
+        return res, queries
+
+    res, division_queries = fetch("DIV")
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data["organization_id"] == "DIV"
+    assert [d["organization_id"] for d in data["departments"]] == ["DIV", "DEPA", "DEPB", "TEAMA1"]
+    assert [d["depth"] for d in data["departments"]] == [0, 1, 1, 2]
+    assert [len(d["employees"]) for d in data["departments"]] == [1, 2, 1, 3]
+    assert all(len(emp["records"]) == 1 for d in data["departments"] for emp in d["employees"])
+
+    # 葉節點只有自己，SQL 次數跟整個事業部一樣
+    res, leaf_queries = fetch("TEAMA1")
+    assert [d["organization_id"] for d in res.get_json()["departments"]] == ["TEAMA1"]
+    assert leaf_queries == division_queries
+
+    res, _ = fetch("NOPE")
+    assert res.status_code == 404
+
+    # 沒帶 include_descendants 還是原本的 list 格式
+    res = client.get(f"/api/v1/attendance/organizations/DIV?month={month}", headers=headers)
+    assert [emp["employee_id"] for emp in res.get_json()] == ["DIV-E0"]
+
+
+# 測試重算一段期間：跨月、分段掃、覆蓋舊的錯誤紀錄、補上 watermark 和月彙總
+def test_backfill_attendance_recomputes_date_range(client):
+    from app.models.attendance_model import AttendanceRecordModel
+    from app.models.attendance_watermark_model import AttendanceWatermarkModel
+    from app.models.attendance_summary_model import AttendanceMonthlySummaryModel
+
+    days = [datetime(2025, 1, 30), datetime(2025, 1, 31), datetime(2025, 2, 3)]
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        for employee_id in ["E301", "E302"]:
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Emp",
+                last_name=employee_id,
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id="ORGB",
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ))
+            for day in days:
+                db.session.add_all([
+                    AccessLogModel(employee_id=employee_id, access_time=day + timedelta(hours=8), gate_id=1),
+                    AccessLogModel(employee_id=employee_id, access_time=day + timedelta(hours=8, minutes=40), gate_id=1),
+                    AccessLogModel(employee_id=employee_id, access_time=day + timedelta(hours=17, minutes=30), gate_id=2),
+                ])
+        # 之前只跑到一半的紀錄（沒有 out），重算要蓋掉
+        db.session.add(AttendanceRecordModel(
+            employee_id="E301", report_date=days[0].date(), check_in_time=days[0] + timedelta(hours=8, minutes=40),
+            check_in_gate=1, updated_by="system"
+        ))
+        db.session.commit()
+
+    res = client.put("/api/v1/attendance/update?start=2025-01-30&end=2025-02-05", headers=admin_headers(client))
+    assert res.status_code == 200
+    data = res.get_json()
+    assert data["days"] == 7
+    assert data["logs"] == 18
+    assert data["total"] == 6
+    assert data["logs_per_second"] > 0
+
+    with client.application.app_context():
+        record = AttendanceRecordModel.query.filter_by(employee_id="E301", report_date=days[0].date()).one()
+        assert record.check_in_time == days[0] + timedelta(hours=8)
+        assert record.check_out_time == days[0] + timedelta(hours=17, minutes=30)
+        assert float(record.total_stay_hours) == 9.5
+        assert AttendanceRecordModel.query.count() == 6
+
+        assert db.session.get(AttendanceWatermarkModel, days[2].date()).last_log_id == 18
+        january = AttendanceMonthlySummaryModel.query.filter_by(employee_id="E302", month_start=datetime(2025, 1, 1).date()).one()
+        assert january.days_present == 2
+
+    # CLI 一樣的結果，跑第二次不會多出紀錄
+    runner = client.application.test_cli_runner()
+    result = runner.invoke(args=["backfill-attendance", "--start", "2025-01-30", "--end", "2025-02-05", "--partition-days", "2"])
+    assert result.exit_code == 0, result.output
+    with client.application.app_context():
+        assert AttendanceRecordModel.query.count() == 6
+
+    assert client.put("/api/v1/attendance/update?start=2025-02-05&end=2025-01-30", headers=admin_headers(client)).status_code == 400
+    assert client.put("/api/v1/attendance/update?start=2025-01-01&end=2025-12-31", headers=admin_headers(client)).status_code == 400
+
+
+# 測試重算一段期間要 admin JWT 或 scheduler token，沒帶的不能叫（每天的增量更新不受影響）
+def test_backfill_attendance_requires_admin_or_scheduler_token(client):
+    from flask_jwt_extended import create_access_token
+
+    url = "/api/v1/attendance/update?start=2025-01-01&end=2025-01-02"
+    assert client.put(url).status_code == 401
+
+    with client.application.app_context():
+        user_token = create_access_token(identity={"employee_id": "E001", "is_admin": False, "is_manager": True})
+    assert client.put(url, headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+
+    client.application.config["ATTENDANCE_SCHEDULER_TOKEN"] = "scheduler-secret"
+    assert client.put(url, headers={"X-Scheduler-Token": "wrong"}).status_code == 401
+    assert client.put(url, headers={"X-Scheduler-Token": "scheduler-secret"}).status_code == 200
+    assert client.put("/api/v1/attendance/update").status_code == 200
+
+
+# 測試配對：夜班跨午夜算在上班那天、中午出去再回來時數分段加總、重複逼卡、只有 out
+def test_shift_rules_pairs_across_midnight():
+    from datetime import date
+    from app.services.shift_pairing import ShiftRules, parse_shift_windows
+
+    rules = ShiftRules(parse_shift_windows("08:30-17:30,22:00-06:00"), early_minutes=120, max_shift_hours=16)
+    day = datetime(2025, 3, 3)
+    swipes = [
+        (day + timedelta(hours=8), "in", 1),
+        (day + timedelta(hours=12), "out", 2),
+        (day + timedelta(hours=13), "in", 1),
+        (day + timedelta(hours=13, minutes=1), "in", 1),         # 重複逼卡
+        (day + timedelta(hours=17, minutes=30), "out", 2),
+        (day + timedelta(hours=21, minutes=50), "in", 3),         # 夜班
+        (day + timedelta(days=1, hours=6, minutes=5), "out", 4),
+        (day + timedelta(days=2, hours=17), "out", 2),            # 忘了逼卡進門
+    ]
+
+    days = rules.daily_attendance(swipes)
+    assert sorted(days) == [date(2025, 3, 3), date(2025, 3, 5)]
+
+    # 3/3 的白天兩段 + 夜班一段都是 3/3 開始的班，所以合成一天
+    assert days[date(2025, 3, 3)]["check_in_time"] == day + timedelta(hours=8)
+    assert days[date(2025, 3, 3)]["check_out_time"] == day + timedelta(days=1, hours=6, minutes=5)
+    assert days[date(2025, 3, 3)]["check_out_gate"] == 4
+    assert days[date(2025, 3, 3)]["total_stay_hours"] == round(4 + 4.5 + (8 + 15 / 60), 2)
+
+    assert days[date(2025, 3, 3)]["is_incomplete"] is False
+
+    assert days[date(2025, 3, 5)]["check_in_time"] is None
+    assert days[date(2025, 3, 5)]["total_stay_hours"] is None
+    assert days[date(2025, 3, 5)]["is_incomplete"] is True
+
+    # 超過 max_shift 的 in / out 不配在一起
+    lonely = rules.pair([(day + timedelta(hours=8), "in", 1), (day + timedelta(days=1, hours=9), "out", 2)])
+    assert lonely == [((day + timedelta(hours=8), "in", 1), None), (None, (day + timedelta(days=1, hours=9), "out", 2))]
+
+
+# 測試 in / out 隔超過 max_shift：各自一筆、都標 is_incomplete，out 不會被併進 in 那天湊成一筆看起來完整的出勤
+def test_shift_rules_over_max_shift_emits_separate_incomplete_days():
+    from datetime import date
+    from app.services.shift_pairing import ShiftRules, parse_shift_windows
+
+    rules = ShiftRules(parse_shift_windows("08:30-17:30,22:00-06:00"), early_minutes=120, max_shift_hours=16)
+    day = datetime(2025, 3, 3)
+    # 17 小時後的 out 落在 3/3 夜班的範圍裡，原本會跟 08:00 的 in 併成 3/3 一筆
+    days = rules.daily_attendance([
+        (day + timedelta(hours=8), "in", 1),
+        (day + timedelta(days=1, hours=1), "out", 2),
+    ])
+
+    assert sorted(days) == [date(2025, 3, 3), date(2025, 3, 4)]
+    assert days[date(2025, 3, 3)]["check_in_time"] == day + timedelta(hours=8)
+    assert days[date(2025, 3, 3)]["check_out_time"] is None
+    assert days[date(2025, 3, 4)]["check_in_time"] is None
+    assert days[date(2025, 3, 4)]["check_out_time"] == day + timedelta(days=1, hours=1)
+    assert all(d["is_incomplete"] and d["total_stay_hours"] is None for d in days.values())
+
+    # 隔天正常的一段不受影響
+    days = rules.daily_attendance([
+        (day + timedelta(hours=8), "in", 1),
+        (day + timedelta(days=1, hours=1), "out", 2),
+        (day + timedelta(days=1, hours=8, minutes=20), "in", 1),
+        (day + timedelta(days=1, hours=17, minutes=30), "out", 2),
+    ])
+    assert days[date(2025, 3, 4)]["check_in_time"] == day + timedelta(days=1, hours=8, minutes=20)
+    assert days[date(2025, 3, 4)]["total_stay_hours"] == round(9 + 10 / 60, 2)
+    assert days[date(2025, 3, 4)]["is_incomplete"] is True  # 01:00 那個 out 還是配不到
+
+
+# 測試夜班在每日更新和重算都歸到上班那天，不會變成兩天各半筆
+def test_night_shift_attendance_is_one_record(client):
+    from app.models.attendance_model import AttendanceRecordModel
+
+    client.application.config["ATTENDANCE_SHIFT_WINDOWS"] = "08:30-17:30,22:00-06:00"
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit")
+        ])
+        db.session.add_all([
+            AccessLogModel(employee_id="N001", access_time=yesterday + timedelta(hours=22), gate_id=1),
+            AccessLogModel(employee_id="N001", access_time=today + timedelta(hours=6), gate_id=2),
+        ])
+        db.session.commit()
+
+    # 今天早上的 out 進來，要把昨天晚上的班補完整
+    assert client.put("/api/v1/attendance/update").status_code == 200
+    with client.application.app_context():
+        records = AttendanceRecordModel.query.filter_by(employee_id="N001").all()
+        assert [r.report_date for r in records] == [yesterday.date()]
+        assert records[0].check_out_time == today + timedelta(hours=6)
+        assert float(records[0].total_stay_hours) == 8.0
+
+    # 只重算今天：昨天的夜班不屬於今天，不會多出一筆
+    res = client.put(f"/api/v1/attendance/update?start={today.date()}&end={today.date()}", headers=admin_headers(client))
+    assert res.status_code == 200
+    assert res.get_json()["total"] == 0
+
+    res = client.put(f"/api/v1/attendance/update?start={yesterday.date()}&end={yesterday.date()}", headers=admin_headers(client))
+    assert res.get_json()["total"] == 1
+    with client.application.app_context():
+        assert AttendanceRecordModel.query.filter_by(employee_id="N001").count() == 1
+
+
+# 測試班表：組織設定會往下層部門沿用、個人設定優先，遲到早退在更新出勤時就算好存起來
+def test_work_schedule_rules_applied_at_write_time(client):
+    from flask_jwt_extended import create_access_token
+    from app.models.attendance_model import AttendanceRecordModel
+
+    day = datetime(2025, 5, 6)
+
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit"),
+            OrganizationModel(organization_id="FAB", organization_name="Fab"),
+            OrganizationModel(organization_id="FAB-A", organization_name="Fab A", parent_department_id="FAB"),
+        ])
+        for employee_id in ["W001", "W002", "W003"]:
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Emp",
+                last_name=employee_id,
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id="FAB-A" if employee_id != "W003" else "OTHER",
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ))
+            db.session.add_all([
+                AccessLogModel(employee_id=employee_id, access_time=day + timedelta(hours=9, minutes=10), gate_id=1),
+                AccessLogModel(employee_id=employee_id, access_time=day + timedelta(hours=18), gate_id=2),
+            ])
+        db.session.commit()
+        admin = create_access_token(identity={"employee_id": "ADMIN1", "is_admin": True, "is_manager": False})
+        staff = create_access_token(identity={"employee_id": "W001", "is_admin": False, "is_manager": False})
+
+    headers = {"Authorization": f"Bearer {admin}"}
+    # FAB 09:00-18:00（FAB-A 沿用），W002 個人 10:00-19:00，W003 沒設定用配到的白班 08:30-17:30
+    assert client.put("/api/v1/work-schedules/organization/FAB", json={"work_start": "09:00", "work_end": "18:00"}, headers=headers).status_code == 200
+    assert client.put("/api/v1/work-schedules/employee/W002", json={"work_start": "10:00", "work_end": "19:00"}, headers=headers).status_code == 200
+    assert client.put("/api/v1/work-schedules/employee/NOPE", json={"work_start": "10:00", "work_end": "19:00"}, headers=headers).status_code == 404
+    assert client.put("/api/v1/work-schedules/employee/W002", json={"work_start": "25:00", "work_end": "19:00"}, headers=headers).status_code == 400
+    assert client.put("/api/v1/work-schedules/organization/FAB", json={"work_start": "09:00", "work_end": "18:00"},
+                      headers={"Authorization": f"Bearer {staff}"}).status_code == 403
+    assert len(client.get("/api/v1/work-schedules", headers=headers).get_json()) == 2
+
+    assert client.put("/api/v1/attendance/update?start=2025-05-06&end=2025-05-06", headers=admin_headers(client)).status_code == 200
+
+    with client.application.app_context():
+        stored = {r.employee_id: r for r in AttendanceRecordModel.query.all()}
+        assert (stored["W001"].is_late, stored["W001"].late_minutes, stored["W001"].is_early_leave) == (True, 10, False)
+        assert (stored["W002"].is_late, stored["W002"].is_early_leave, stored["W002"].early_leave_minutes) == (False, True, 60)
+        assert (stored["W003"].late_minutes, stored["W003"].is_early_leave) == (40, False)
+
+    res = client.get("/api/v1/attendance/employees/W002?month=2025-05", headers=headers)
+    record = res.get_json()["records"][0]
+    assert record["late_arrival_status"] == "On time"
+    assert record["early_departure_minutes"] == 60
+
+    res = client.get("/api/v1/attendance/summary/employees/W001?month=2025-05", headers=headers)
+    assert res.get_json()["late_minutes"] == 10
+
+    # 刪掉個人班表之後重算，W002 回到 FAB 的 09:00-18:00
+    assert client.delete("/api/v1/work-schedules/employee/W002", headers=headers).status_code == 200
+    assert client.put("/api/v1/attendance/update?start=2025-05-06&end=2025-05-06", headers=admin_headers(client)).status_code == 200
+    with client.application.app_context():
+        record = AttendanceRecordModel.query.filter_by(employee_id="W002").one()
+        assert (record.late_minutes, record.is_early_leave) == (10, False)
+
+
+# 測試沒設班表的夜班：用配對時配到的 22:00-06:00 算，不會拿預設的 08:30 算成遲到 800 分鐘
+def test_night_shift_without_schedule_uses_matched_shift_window(client):
+    from datetime import date
+    from app.models.attendance_model import AttendanceRecordModel
+
+    client.application.config["ATTENDANCE_SHIFT_WINDOWS"] = "08:30-17:30,22:00-06:00"
+
+    day = datetime(2025, 5, 6)
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit"),
+            AccessLogModel(employee_id="NS01", access_time=day + timedelta(hours=21, minutes=50), gate_id=1),
+            AccessLogModel(employee_id="NS01", access_time=day + timedelta(days=1, hours=6, minutes=5), gate_id=2),
+            AccessLogModel(employee_id="NS02", access_time=day + timedelta(hours=22, minutes=15), gate_id=1),
+            AccessLogModel(employee_id="NS02", access_time=day + timedelta(days=1, hours=5, minutes=30), gate_id=2),
+        ])
+        db.session.commit()
+
+        lookup = WorkScheduleService.get_lookup()
+        assert lookup.evaluate("NS01", None, date(2025, 5, 6), day + timedelta(hours=21, minutes=50),
+                               day + timedelta(days=1, hours=6, minutes=5)) == (False, 0, False, 0)
+
+    assert client.put("/api/v1/attendance/update?start=2025-05-06&end=2025-05-07", headers=admin_headers(client)).status_code == 200
+
+    with client.application.app_context():
+        stored = {r.employee_id: r for r in AttendanceRecordModel.query.all()}
+        assert len(stored) == 2
+        assert stored["NS01"].report_date == date(2025, 5, 6)
+        assert (stored["NS01"].is_late, stored["NS01"].late_minutes, stored["NS01"].is_early_leave) == (False, 0, False)
+        assert (stored["NS02"].late_minutes, stored["NS02"].early_leave_minutes) == (15, 30)
+
+
+# 測試夜班的下班時間算在隔天
+def test_evaluate_punctuality_overnight_schedule():
+    from datetime import date, time
+    from app.services.punctuality import evaluate_punctuality
+
+    night = (time(22, 0), time(6, 0))
+    assert evaluate_punctuality(date(2025, 3, 3), datetime(2025, 3, 3, 22, 5), datetime(2025, 3, 4, 5, 30), night) == (True, 5, True, 30)
+    assert evaluate_punctuality(date(2025, 3, 3), datetime(2025, 3, 3, 21, 50), datetime(2025, 3, 4, 6, 10), night) == (False, 0, False, 0)
+
+
+# 測試出勤 GET 的 ETag：版本沒變回 304 而且不查出勤紀錄；重算過 ETag 會變；結算的月份可以讓瀏覽器存比較久
+def test_attendance_month_conditional_get(client):
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+
+    day = datetime(2025, 1, 10)
+    with client.application.app_context():
+        db.session.add_all([
+            GateModel(gate_id=1, gate_name="IN", direction="in", gate_type="entry"),
+            GateModel(gate_id=2, gate_name="OUT", direction="out", gate_type="exit"),
+            EmployeeModel(
+                employee_id="E401",
+                first_name="Emp",
+                last_name="Cache",
+                email="e401@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(),
+                hire_status="Active",
+                organization_id="ORGC",
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(),
+                updated_by="system"
+            ),
+            AccessLogModel(employee_id="E401", access_time=day + timedelta(hours=8), gate_id=1),
+            AccessLogModel(employee_id="E401", access_time=day + timedelta(hours=17, minutes=30), gate_id=2)
+        ])
+        db.session.commit()
+        token = create_access_token(identity={"employee_id": "E401", "is_admin": False, "is_manager": False})
+        engine = db.engine
+
+    assert client.put("/api/v1/attendance/update?start=2025-01-10&end=2025-01-10", headers=admin_headers(client)).status_code == 200
+
+    headers = {"Authorization": f"Bearer {token}"}
+    url = "/api/v1/attendance/employees/E401?month=2025-01"
+    res = client.get(url, headers=headers)
+    assert res.status_code == 200
+    assert len(res.get_json()["records"]) == 1
+    etag = res.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert res.headers["Cache-Control"] == "private, max-age=86400"
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        res = client.get(url, headers={**headers, "If-None-Match": etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert res.status_code == 304
+    assert res.data == b""
+    assert not any("FROM \"Attendance_Record\"" in statement for statement in statements)
+
+    # 月彙總也是同一個版本
+    res = client.get("/api/v1/attendance/summary/employees/E401?month=2025-01", headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 304
+
+    # 重算過：版本變了，回完整的 body
+    assert client.put("/api/v1/attendance/update?start=2025-01-10&end=2025-01-10", headers=admin_headers(client)).status_code == 200
+    res = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+    # 班表、組織階層變了 ETag 也要變（NULL 遲到欄位的舊紀錄、include_descendants 的回應都跟著變）
+    etag = res.headers["ETag"]
+    assert client.put("/api/v1/work-schedules/employee/E401", json={"work_start": "09:00", "work_end": "18:00"},
+                      headers=admin_headers(client)).status_code == 200
+    res = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    with client.application.app_context():
+        db.session.add(OrganizationModel(organization_id="ORGC", organization_name="Cache Dept"))
+        db.session.commit()
+        OrganizationService.invalidate_cache()
+    res = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+    # 這個月還沒結算：每次都要回來確認
+    res = client.get(f"/api/v1/attendance/employees/E401?month={datetime.now().strftime('%Y-%m')}", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["Cache-Control"] == "private, no-cache"
+
+    # 錯誤不帶 ETag
+    res = client.get("/api/v1/attendance/employees/E401?month=2025-13", headers=headers)
+    assert res.status_code == 400
+    assert "ETag" not in res.headers
+
+
+# 測試預設設定（沒有夜班）：凌晨進門算當天，不會被歸到前一天的夜班
+def test_default_shift_windows_keep_early_checkin_on_same_day(client):
+    from datetime import date
+    from app.services.shift_pairing import ShiftRules
+
+    rules = ShiftRules.from_config(client.application.config)
+    assert rules.work_date_for_in(datetime(2025, 3, 4, 5, 45)) == date(2025, 3, 4)
+    assert rules.work_date_for_in(datetime(2025, 3, 4, 0, 30)) == date(2025, 3, 4)
+    assert rules.work_date_for_out(datetime(2025, 3, 4, 5, 0)) == date(2025, 3, 4)
+
+
+def _summary_employee(employee_id, organization_id):
+    return EmployeeModel(
+        employee_id=employee_id,
+        first_name="Emp",
+        last_name=employee_id,
+        email=f"{employee_id}@example.com",
+        phone_number="0911000000",
+        job_title="Staff",
+        hire_date=datetime.now(),
+        hire_status="Active",
+        organization_id=organization_id,
+        is_admin=False,
+        hashed_password="pw",
+        updated_at=datetime.now(),
+        updated_by="system"
+    )
+
+
+# 測試員工換部門之後重算月彙總：舊組織那個月也跟著重算，不會一直算著已經調走的人
+def test_monthly_summary_moves_employee_between_organizations(client):
+    from datetime import date
+    from app.models.attendance_model import AttendanceRecordModel
+    from app.models.attendance_summary_model import OrganizationMonthlySummaryModel
+    from app.services.attendance_summary_service import AttendanceSummaryService
+
+    month = date(2025, 3, 1)
+    with client.application.app_context():
+        db.session.add(_summary_employee("MV01", "ORG_OLD"))
+        db.session.add(AttendanceRecordModel(
+            employee_id="MV01", report_date=date(2025, 3, 4),
+            check_in_time=datetime(2025, 3, 4, 8, 0), check_out_time=datetime(2025, 3, 4, 17, 30),
+            total_stay_hours=9.5, updated_by="MV01"
+        ))
+        db.session.commit()
+
+        AttendanceSummaryService.refresh_monthly_summaries({("MV01", month)})
+        db.session.commit()
+        assert db.session.get(OrganizationMonthlySummaryModel, ("ORG_OLD", month)).employee_count == 1
+
+        db.session.get(EmployeeModel, "MV01").organization_id = "ORG_NEW"
+        db.session.commit()
+        AttendanceSummaryService.refresh_monthly_summaries({("MV01", month)})
+        db.session.commit()
+
+        old = db.session.get(OrganizationMonthlySummaryModel, ("ORG_OLD", month))
+        assert (old.employee_count, old.days_present) == (0, 0)
+        new = db.session.get(OrganizationMonthlySummaryModel, ("ORG_NEW", month))
+        assert (new.employee_count, new.days_present) == (1, 1)
@@ -0,0 +1,173 @@
+import pytest
+from app.create_db import SCHEMA_VERSION, check_schema_version, get_schema_version
+from app.models import db
+
+
+# 測試 flask init-db 會建表並寫入 schema 版本，開機檢查就會通過
+def test_init_db_command_sets_schema_version(client):
+    runner = client.application.test_cli_runner()
+
+    with client.application.app_context():
+        db.drop_all()
+        assert get_schema_version() is None
+        assert check_schema_version() is False
+
+    result = runner.invoke(args=["init-db"])
+    assert result.exit_code == 0
+
+    with client.application.app_context():
+        assert get_schema_version() == SCHEMA_VERSION
+        assert check_schema_version() is True
+
+    # 重跑一次不會壞
+    result = runner.invoke(args=["init-db"])
+    assert result.exit_code == 0
+
+
+# 測試舊版（v3）資料庫跑 init-db 會補上 Access_Log.dedup_key 欄位和 unique index
+def test_init_db_migrates_access_log_dedup_key(client):
+    from datetime import datetime
+    from sqlalchemy import inspect, text
+    from app.models.schema_version_model import SchemaVersionModel
+
+    runner = client.application.test_cli_runner()
+
+    with client.application.app_context():
+        db.session.add(SchemaVersionModel(id=1, version=3, updated_at=datetime.now()))
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.execute(text("DROP INDEX uq_access_log_dedup_key"))
+            conn.execute(text("ALTER TABLE Access_Log DROP COLUMN dedup_key"))
+        assert "dedup_key" not in {c["name"] for c in inspect(db.engine).get_columns("Access_Log")}
+
+    result = runner.invoke(args=["init-db"])
+    assert result.exit_code == 0
+
+    with client.application.app_context():
+        inspector = inspect(db.engine)
+        assert "dedup_key" in {c["name"] for c in inspector.get_columns("Access_Log")}
+        assert "uq_access_log_dedup_key" in {i["name"] for i in inspector.get_indexes("Access_Log")}
+        assert get_schema_version() == SCHEMA_VERSION
+
+
+# 測試舊版（v4）資料庫跑 init-db 會把現有組織階層填進 Organization_Closure
+def test_init_db_backfills_organization_closure(client):
+    from datetime import datetime
+    from app.models.organization_model import OrganizationModel
+    from app.models.organization_closure_model import OrganizationClosureModel
+    from app.models.schema_version_model import SchemaVersionModel
+
+    runner = client.application.test_cli_runner()
+
+    with client.application.app_context():
+        db.session.add(SchemaVersionModel(id=1, version=4, updated_at=datetime.now()))
+        with db.engine.begin() as conn:
+            conn.execute(OrganizationModel.__table__.insert(), [
+                {"organization_id": "P", "organization_name": "Parent", "parent_department_id": None},
+                {"organization_id": "C", "organization_name": "Child", "parent_department_id": "P"},
+            ])
+        db.session.commit()
+        assert OrganizationClosureModel.query.count() == 0  # 直接寫 Core，不會觸發同步
+
+    result = runner.invoke(args=["init-db"])
+    assert result.exit_code == 0
+
+    with client.application.app_context():
+        assert db.session.get(OrganizationClosureModel, ("P", "C")).depth == 1
+        assert OrganizationClosureModel.query.count() == 3
+
+
+# 測試舊版（v5）資料庫跑 init-db 會幫 Attendance_Record 補上遲到/早退欄位和 is_incomplete（v7）
+def test_init_db_adds_attendance_punctuality_columns(client):
+    from datetime import datetime
+    from sqlalchemy import inspect, text
+    from app.models.schema_version_model import SchemaVersionModel
+
+    runner = client.application.test_cli_runner()
+
+    with client.application.app_context():
+        db.session.add(SchemaVersionModel(id=1, version=5, updated_at=datetime.now()))
+        db.session.commit()
+        with db.engine.begin() as conn:
+            for column in ["is_late", "late_minutes", "is_early_leave", "early_leave_minutes", "is_incomplete"]:
+                conn.execute(text(f"ALTER TABLE Attendance_Record DROP COLUMN {column}"))
+
+    result = runner.invoke(args=["init-db"])
+    assert result.exit_code == 0
+
+    with client.application.app_context():
+        columns = {c["name"] for c in inspect(db.engine).get_columns("Attendance_Record")}
+        assert {"is_late", "late_minutes", "is_early_leave", "early_leave_minutes", "is_incomplete"} <= columns
+        assert get_schema_version() == SCHEMA_VERSION
+
+
+# 測試開機檢查 schema 版本不對就直接失敗，不是只印警告
+def test_startup_fails_fast_on_old_schema(monkeypatch):
+    from app import create_app
+
+    monkeypatch.setattr("config.TestingConfig.SCHEMA_CHECK_ON_STARTUP", True)
+    with pytest.raises(RuntimeError, match="init-db"):
+        create_app(config_name="testing")
+
+
+# 測試不是 mysql / sqlite 的 dialect 走一筆一筆的 fallback，結果要跟批次版一樣
+def test_bulk_helpers_per_row_fallback(client):
+    from datetime import date, datetime
+    from app.models.attendance_watermark_model import AttendanceWatermarkModel
+    from app.models.bulk import _per_row_write
+
+    now = datetime(2025, 3, 4, 12, 0)
+    with client.application.app_context():
+        _per_row_write(AttendanceWatermarkModel, [
+            {"report_date": date(2025, 3, 3), "last_log_id": 5, "updated_at": now},
+            {"report_date": date(2025, 3, 4), "last_log_id": 7, "updated_at": now}
+        ], ["report_date"], ["last_log_id", "updated_at"])
+        # upsert：已經有的更新
+        _per_row_write(AttendanceWatermarkModel, [
+            {"report_date": date(2025, 3, 4), "last_log_id": 9, "updated_at": now}
+        ], ["report_date"], ["last_log_id", "updated_at"])
+        # insert ignore：已經有的跳過
+        _per_row_write(AttendanceWatermarkModel, [
+            {"report_date": date(2025, 3, 3), "last_log_id": 99, "updated_at": now}
+        ], ["report_date"], None)
+        db.session.commit()
+
+        got = {r.report_date: r.last_log_id for r in AttendanceWatermarkModel.query.all()}
+        assert got == {date(2025, 3, 3): 5, date(2025, 3, 4): 9}
+
+
+# 測試舊版（v7）資料庫跑 init-db 會從現有出勤紀錄補算歷史月彙總
+def test_init_db_backfills_monthly_summaries(client):
+    from datetime import date, datetime
+    from app.models.attendance_model import AttendanceRecordModel
+    from app.models.attendance_summary_model import AttendanceMonthlySummaryModel, OrganizationMonthlySummaryModel
+    from app.models.employee_model import EmployeeModel
+    from app.models.schema_version_model import SchemaVersionModel
+
+    with client.application.app_context():
+        db.session.add(SchemaVersionModel(id=1, version=7, updated_at=datetime.now()))
+        db.session.add(EmployeeModel(
+            employee_id="H001", first_name="Old", last_name="Data", email="h001@example.com",
+            phone_number="0911000000", job_title="Staff", hire_date=datetime.now(), hire_status="Active",
+            organization_id="ORGH", is_admin=False, hashed_password="pw",
+            updated_at=datetime.now(), updated_by="system"
+        ))
+        db.session.add_all([
+            AttendanceRecordModel(
+                employee_id="H001", report_date=day,
+                check_in_time=datetime.combine(day, datetime.min.time()).replace(hour=8),
+                check_out_time=datetime.combine(day, datetime.min.time()).replace(hour=17),
+                total_stay_hours=9, updated_by="H001"
+            )
+            for day in (date(2024, 11, 5), date(2025, 1, 6), date(2025, 1, 7))
+        ])
+        db.session.commit()
+        assert AttendanceMonthlySummaryModel.query.count() == 0
+
+    result = client.application.test_cli_runner().invoke(args=["init-db"])
+    assert result.exit_code == 0, result.output
+
+    with client.application.app_context():
+        days = {s.month_start: s.days_present for s in AttendanceMonthlySummaryModel.query.all()}
+        assert days == {date(2024, 11, 1): 1, date(2024, 12, 1): 0, date(2025, 1, 1): 2}
+        assert db.session.get(OrganizationMonthlySummaryModel, ("ORGH", date(2025, 1, 1))).days_present == 2
@@ -414,3 +414,158 @@ def test_get_employee_list_no_employees_found(client):
     assert response.json['message'] == 'No employees found'
 
     assert response.status_code == 404
+
+def test_get_employee_list_keyset_pagination_and_filters(client):
+    with client.application.app_context():
+        for i, (first_name, org, status) in enumerate([
+            ("Alice", "ORG001", "Active"),
+            ("Albert", "ORG002", "Active"),
+            ("Bob", "ORG001", "Inactive"),
+            ("Alan", "ORG001", "Active"),
+            ("Carol", "ORG001", "Active"),
+        ]):
+            db.session.add(EmployeeModel(
+                employee_id=f"E00{i + 1}",
+                first_name=first_name,
+                last_name="Test",
+                phone_number="0912345678",
+                email=f"e{i}@example.com",
+                organization_id=org,
+                job_title="Engineer",
+                hire_date=datetime.now(timezone.utc),
+                hire_status=status,
+                is_admin=False,
+                updated_at=datetime.now(timezone.utc),
+                updated_by="system",
+                hashed_password="fake_hashed_password"
+            ))
+        db.session.commit()
+
+        token = create_access_token(identity={
+            "employee_id": "E001",
+            "is_admin": True,
+            "is_manager": False,
+        })
+
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # 一頁兩筆，跟著 next_cursor 翻完
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/v1/employee-list?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data['employee_list']) <= 2
+        seen += [emp['employee_id'] for emp in data['employee_list']]
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert seen == ["E001", "E002", "E003", "E004", "E005"]
+
+    # 篩選：組織 + 在職狀態 + 名字開頭
+    response = client.get('/api/v1/employee-list?organization_id=ORG001&hire_status=Active&name_prefix=Al', headers=headers)
+    assert response.status_code == 200
+    assert [emp['employee_id'] for emp in response.get_json()['employee_list']] == ["E001", "E004"]
+
+    response = client.get('/api/v1/employee-list?limit=abc', headers=headers)
+    assert response.status_code == 400
+
+# ----------------------------------
+# /api/v1/employees/import - 批次匯入員工
+# ----------------------------------
+
+def test_import_employees_csv_reports_row_errors(client):
+    with client.application.app_context():
+        db.session.add(OrganizationModel(organization_id="ORG001", organization_name="Org 1"))
+        db.session.add(EmployeeModel(
+            employee_id="E001",
+            first_name="Old",
+            last_name="User",
+            phone_number="0912345678",
+            email="old@example.com",
+            organization_id="ORG001",
+            job_title="Engineer",
+            hire_date=datetime.now(timezone.utc),
+            hire_status="Active",
+            is_admin=False,
+            updated_at=datetime.now(timezone.utc),
+            updated_by="system",
+            hashed_password="fake_hashed_password"
+        ))
+        db.session.commit()
+
+        token = create_access_token(identity={
+            "employee_id": "ADMIN",
+            "is_admin": True,
+            "is_manager": False,
+        })
+
+    header = "employee_id,first_name,last_name,email,phone_number,job_title,organization_id,hire_date,is_admin\n"
+    lines = [f"N{i:03d},New,{i},n{i}@example.com,0900000000,Engineer,ORG001,2024-01-02,false" for i in range(1, 6)]
+    lines += [
+        "E001,Dup,DB,d@example.com,0900000000,Engineer,ORG001,2024-01-02,false",     # 已經在 DB
+        "N001,Dup,File,d@example.com,0900000000,Engineer,ORG001,2024-01-02,false",   # 檔案裡重複
+        "N100,Bad,Org,b@example.com,0900000000,Engineer,NOPE,2024-01-02,false",      # 組織不存在
+        "N101,Bad,Date,b@example.com,0900000000,Engineer,ORG001,not-a-date,false",
+        "N102,,Missing,b@example.com,0900000000,Engineer,ORG001,2024-01-02,true",
+    ]
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    response = client.post('/api/v1/employees/import', data=header + "\n".join(lines), headers=headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["total"] == 10
+    assert data["inserted"] == 5
+    assert [(e["row"], e["employee_id"]) for e in data["errors"]] == [
+        (6, "E001"), (7, "N001"), (8, "N100"), (9, "N101"), (10, "N102")
+    ]
+    assert data["errors"][0]["message"] == "The employee already exists"
+    assert data["errors"][2]["message"] == "Organization with id NOPE does not exist"
+
+    with client.application.app_context():
+        assert EmployeeModel.query.count() == 6
+        employee = db.session.get(EmployeeModel, "N003")
+        assert employee.updated_by == "ADMIN"
+        assert employee.is_admin is False
+        assert employee.hire_date == datetime(2024, 1, 2)
+
+
+def test_import_employees_json_stream_progress(client):
+    with client.application.app_context():
+        db.session.add(OrganizationModel(organization_id="ORG001", organization_name="Org 1"))
+        db.session.commit()
+
+        token = create_access_token(identity={
+            "employee_id": "ADMIN",
+            "is_admin": True,
+            "is_manager": False,
+        })
+
+    employees = [{
+        "employee_id": f"S{i:04d}",
+        "first_name": "Stream",
+        "last_name": str(i),
+        "email": f"s{i}@example.com",
+        "phone_number": "0900000000",
+        "job_title": "Engineer",
+        "organization_id": "ORG001",
+        "hire_date": "2024-01-02T00:00:00"
+    } for i in range(1200)]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post('/api/v1/employees/import?stream=1', json=employees, headers=headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [e["stage"] for e in events[:-1]] == ["validated", "inserted", "inserted", "inserted"]
+    assert events[-2]["processed"] == 1200
+    assert events[-1] == {"type": "result", "total": 1200, "inserted": 1200, "errors": []}
+
+    with client.application.app_context():
+        assert EmployeeModel.query.count() == 1200
+
+    # body 不是陣列回 400
+    response = client.post('/api/v1/employees/import', json={"employee_id": "X"}, headers=headers)
+    assert response.status_code == 400
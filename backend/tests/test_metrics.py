@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+from flask_jwt_extended import create_access_token
+from app.db_pool import InstrumentedQueuePool, get_pool_stats
+
+
+# 測試連線池的 checkout、overflow、timeout 統計
+def test_instrumented_pool_tracks_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1
+    )
+
+    first = engine.connect()
+    second = engine.connect()  # 用到 overflow
+    first.execute(text("SELECT 1"))
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    stats = get_pool_stats(engine)
+    assert stats["checkouts"] == 2
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+    assert stats["peak_overflow"] == 1
+    assert stats["timeouts"] == 1
+
+    first.close()
+    second.close()
+    assert get_pool_stats(engine)["checked_out"] == 0
+    engine.dispose()
+
+
+# 測試 GET /api/v1/metrics/db-pool 只有 admin 可以看
+def test_db_pool_metrics_admin_only(client):
+    with client.application.app_context():
+        admin_token = create_access_token(identity={"employee_id": "E001", "is_admin": True, "is_manager": False})
+        user_token = create_access_token(identity={"employee_id": "E002", "is_admin": False, "is_manager": False})
+
+    res = client.get("/api/v1/metrics/db-pool", headers={"Authorization": f"Bearer {user_token}"})
+    assert res.status_code == 403
+
+    res = client.get("/api/v1/metrics/db-pool", headers={"Authorization": f"Bearer {admin_token}"})
+    assert res.status_code == 200
+    assert "pool_class" in res.get_json()
+
+
+# 測試每個 request 都有 Server-Timing，/api/v1/metrics 依 Resource class 列出 latency 和 SQL 次數
+def test_request_metrics_by_resource(client):
+    with client.application.app_context():
+        admin_token = create_access_token(identity={"employee_id": "E001", "is_admin": True, "is_manager": False})
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    res = client.get("/api/v1/employee-list", headers=headers)  # 沒有員工會回 404，一樣要記
+    status = res.status_code
+    server_timing = res.headers["Server-Timing"]
+    assert server_timing.startswith("db;dur=")
+    assert "app;dur=" in server_timing
+
+    # 沒設 scrape token：沒帶 JWT 或不是 admin 都不給看
+    assert client.get("/api/v1/metrics").status_code == 401
+    with client.application.app_context():
+        user_token = create_access_token(identity={"employee_id": "E002", "is_admin": False, "is_manager": False})
+    assert client.get("/api/v1/metrics", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+
+    res = client.get("/api/v1/metrics", headers=headers)
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    body = res.get_data(as_text=True)
+    assert f'http_request_duration_seconds_count{{resource="EmployeeListResource",method="GET",status="{status}"}} 1' in body
+    assert f'http_request_sql_queries_sum{{resource="EmployeeListResource",method="GET",status="{status}"}} 1.000000' in body
+    assert "accesslog_buffer_batches_flushed 0" in body
+
+    # 有設 token 就要帶
+    client.application.config["METRICS_SCRAPE_TOKEN"] = "scrape-secret"
+    assert client.get("/api/v1/metrics").status_code == 401
+    assert client.get("/api/v1/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
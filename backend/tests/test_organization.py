@@ -435,3 +435,293 @@ def test_delete_non_leaf_organization_should_fail(client):
 
     assert res.status_code == 400
     assert res.get_json()["error"] == "Cannot delete non-leaf organization node."
+
+
+# 測試：組織樹有 ETag，沒變動時回 304，新增員工後重新計算
+def test_get_organization_tree_etag_and_invalidation(client):
+    from flask_jwt_extended import create_access_token
+
+    with client.application.app_context():
+        admin = EmployeeModel(
+            employee_id="ETREE",
+            first_name="Admin",
+            last_name="Tree",
+            email="tree@example.com",
+            phone_number="0977123456",
+            job_title="Admin",
+            hire_date=datetime.now(timezone.utc),
+            hire_status="Active",
+            organization_id="ORGROOT",
+            is_admin=True,
+            hashed_password="pw",
+            updated_at=datetime.now(timezone.utc),
+            updated_by="system"
+        )
+        parent_org = OrganizationModel(
+            organization_id="ORGROOT",
+            organization_name="Root Dept",
+            manager_id="ETREE",
+            parent_department_id=None
+        )
+        child_org = OrganizationModel(
+            organization_id="ORGCHILD",
+            organization_name="Child Dept",
+            manager_id="ETREE",
+            parent_department_id="ORGROOT"
+        )
+        db.session.add_all([admin, parent_org, child_org])
+        db.session.commit()
+
+        token = create_access_token(identity={"employee_id": "ETREE", "is_admin": True, "is_manager": True})
+
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.get("/api/v1/organizations", headers=headers)
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    root = res.get_json()["organizations"][0]
+    assert root["organization_id"] == "ORGROOT"
+    assert root["employee_count"] == "1"
+    assert root["children"][0]["employee_count"] == "0"
+
+    # 沒有異動：帶 If-None-Match 直接 304
+    res = client.get("/api/v1/organizations", headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.data == b""
+
+    # 新增員工到子部門後快取要失效
+    res = client.post("/api/v1/employees", headers=headers, json={
+        "employee_id": "ENEW",
+        "first_name": "New",
+        "last_name": "Hire",
+        "email": "new@example.com",
+        "phone_number": "0911000000",
+        "job_title": "Staff",
+        "organization_id": "ORGCHILD",
+        "hire_date": "2025-01-01"
+    })
+    assert res.status_code == 201
+
+    res = client.get("/api/v1/organizations", headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+    assert res.get_json()["organizations"][0]["children"][0]["employee_count"] == "1"
+
+
+
+# 測試：單一組織、組織清單也有 ETag，沒變動 304，員工異動後單一組織的 ETag 要換
+def test_get_organization_detail_and_list_etag(client):
+    from flask_jwt_extended import create_access_token
+
+    with client.application.app_context():
+        db.session.add_all([
+            EmployeeModel(
+                employee_id="EDET",
+                first_name="Admin",
+                last_name="Detail",
+                email="detail@example.com",
+                phone_number="0977123456",
+                job_title="Admin",
+                hire_date=datetime.now(timezone.utc),
+                hire_status="Active",
+                organization_id="ORGD",
+                is_admin=True,
+                hashed_password="pw",
+                updated_at=datetime.now(timezone.utc),
+                updated_by="system"
+            ),
+            OrganizationModel(organization_id="ORGD", organization_name="Detail Dept", manager_id="EDET", parent_department_id=None)
+        ])
+        db.session.commit()
+        token = create_access_token(identity={"employee_id": "EDET", "is_admin": True, "is_manager": True})
+
+    headers = {"Authorization": f"Bearer {token}"}
+    res = client.get("/api/v1/organizations/ORGD", headers=headers)
+    assert res.status_code == 200
+    assert res.headers["Cache-Control"] == "private, no-cache"
+    etag = res.headers["ETag"]
+
+    assert client.get("/api/v1/organizations/ORGD", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    res = client.get("/api/v1/organizations/list", headers=headers)
+    assert res.status_code == 200
+    list_etag = res.headers["ETag"]
+    assert client.get("/api/v1/organizations/list", headers={**headers, "If-None-Match": list_etag}).status_code == 304
+
+    # 不存在的組織不帶 ETag
+    res = client.get("/api/v1/organizations/NOPE", headers=headers)
+    assert res.status_code == 404
+    assert "ETag" not in res.headers
+    with client.application.app_context():
+        from app.services.cache_service import get_cache
+        assert "organization:NOPE" not in get_cache()._entries  # 404 不快取
+
+    res = client.post("/api/v1/employees", headers=headers, json={
+        "employee_id": "EDET2",
+        "first_name": "New",
+        "last_name": "Hire",
+        "email": "new2@example.com",
+        "phone_number": "0911000000",
+        "job_title": "Staff",
+        "organization_id": "ORGD",
+        "hire_date": "2025-01-01"
+    })
+    assert res.status_code == 201
+
+    res = client.get("/api/v1/organizations/ORGD", headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.get_json()["employee_count"] == 2
+    # 組織本身沒變，清單內容一樣，ETag 也一樣
+    assert client.get("/api/v1/organizations/list", headers={**headers, "If-None-Match": list_etag}).status_code == 304
+
+# 測試 manager 權限看現在的 Organization.manager_id，不是登入時 token 裡的 is_manager，組織異動後馬上生效
+def test_manager_role_resolved_from_current_organizations(client):
+    from flask_jwt_extended import create_access_token
+    from app.services.organization_service import OrganizationService
+    from app.services.role_service import RoleService
+
+    with client.application.app_context():
+        for employee_id, org_id in [("EMGR", "ORGR1"), ("ESTAFF", "ORGR2")]:
+            db.session.add(EmployeeModel(
+                employee_id=employee_id,
+                first_name="Role",
+                last_name=employee_id,
+                email=f"{employee_id}@example.com",
+                phone_number="0911000000",
+                job_title="Staff",
+                hire_date=datetime.now(timezone.utc),
+                hire_status="Active",
+                organization_id=org_id,
+                is_admin=False,
+                hashed_password="pw",
+                updated_at=datetime.now(timezone.utc),
+                updated_by="system"
+            ))
+        db.session.add(OrganizationModel(organization_id="ORGR1", organization_name="Role Org 1", manager_id="EMGR"))
+        db.session.add(OrganizationModel(organization_id="ORGR2", organization_name="Role Org 2", manager_id=None))
+        db.session.commit()
+
+        # token 裡的 is_manager 跟實際相反
+        mgr_token = create_access_token(identity={"employee_id": "EMGR", "is_admin": False, "is_manager": False})
+        staff_token = create_access_token(identity={"employee_id": "ESTAFF", "is_admin": False, "is_manager": True})
+
+        assert RoleService.managed_organizations("EMGR") == ["ORGR1"]
+        assert RoleService.manager_of("ORGR2") is None
+
+    assert client.get("/api/v1/organizations/ORGR1", headers={"Authorization": f"Bearer {mgr_token}"}).status_code == 200
+    assert client.get("/api/v1/organizations/ORGR1", headers={"Authorization": f"Bearer {staff_token}"}).status_code == 403
+
+    # 換主管，不用重新登入
+    with client.application.app_context():
+        OrganizationModel.query.filter_by(organization_id="ORGR2").update({"manager_id": "ESTAFF"})
+        db.session.commit()
+        OrganizationService.invalidate_cache()
+
+    assert client.get("/api/v1/organizations/ORGR1", headers={"Authorization": f"Bearer {staff_token}"}).status_code == 200
+
+
+# 測試 Organization_Closure 跟著組織新增、改 parent、刪除自動重建
+def test_organization_closure_follows_hierarchy_writes(client):
+    from app.models.organization_closure_model import OrganizationClosureModel
+    from app.services.organization_service import OrganizationService
+
+    def pairs():
+        return sorted(
+            (row.ancestor_id, row.descendant_id, row.depth)
+            for row in OrganizationClosureModel.query.filter(OrganizationClosureModel.depth > 0)
+        )
+
+    with client.application.app_context():
+        db.session.add_all([
+            OrganizationModel(organization_id="ROOT", organization_name="Root"),
+            OrganizationModel(organization_id="A", organization_name="A", parent_department_id="ROOT"),
+            OrganizationModel(organization_id="B", organization_name="B", parent_department_id="ROOT"),
+            OrganizationModel(organization_id="A1", organization_name="A1", parent_department_id="A"),
+        ])
+        db.session.commit()
+
+        assert pairs() == [("A", "A1", 1), ("ROOT", "A", 1), ("ROOT", "A1", 2), ("ROOT", "B", 1)]
+        assert OrganizationService.is_in_subtree("ROOT", "A1")
+        assert not OrganizationService.is_in_subtree("B", "A1")
+        assert OrganizationService.get_depth("A1") == 2
+        assert [o["organization_id"] for o in OrganizationService.get_subtree("ROOT")] == ["ROOT", "A", "B", "A1"]
+
+        # A1 搬到 B 底下
+        db.session.get(OrganizationModel, "A1").parent_department_id = "B"
+        db.session.commit()
+        assert OrganizationService.is_in_subtree("B", "A1")
+        assert not OrganizationService.is_in_subtree("A", "A1")
+
+        # 非 leaf 不能刪，leaf 刪掉之後 closure 也跟著清掉
+        assert OrganizationService.delete_organization("B")[1] == 400
+        assert OrganizationService.delete_organization("A1")[1] == 200
+        assert pairs() == [("ROOT", "A", 1), ("ROOT", "B", 1)]
+        assert OrganizationService.get_depth("A1") is None
+
+
+# 測試不經過 ORM 寫進來的組織（seed SQL、手動 INSERT）：leaf 檢查不靠 closure
+# closure 過期時讀的路徑用記憶體算的答案，不會重建也不會 commit；重建交給 flask rebuild-org-closure
+def test_organization_closure_stale_after_raw_sql_writes(client):
+    from sqlalchemy import insert, text
+    from app.models.organization_closure_model import OrganizationClosureModel, organization_closure_is_fresh
+    from app.services.organization_service import OrganizationService
+
+    with client.application.app_context():
+        db.session.execute(insert(OrganizationModel), [
+            {"organization_id": "SROOT", "organization_name": "Seed Root", "parent_department_id": None},
+            {"organization_id": "SCHILD", "organization_name": "Seed Child", "parent_department_id": "SROOT"},
+        ])
+        db.session.commit()
+        assert OrganizationClosureModel.query.count() == 0
+        assert not organization_closure_is_fresh(db.session.connection())
+
+        # closure 是空的也不能把有子部門的刪掉
+        assert OrganizationService.delete_organization("SROOT")[1] == 400
+
+    with client.application.app_context():
+        assert [o["organization_id"] for o in OrganizationService.get_subtree("SROOT")] == ["SROOT", "SCHILD"]
+        assert OrganizationService.is_in_subtree("SROOT", "SCHILD")
+        assert OrganizationService.get_depth("SCHILD") == 1
+        tree = OrganizationService.get_organization_tree()[0]["organizations"]
+        assert [o["organization_id"] for o in tree] == ["SROOT"]
+        assert OrganizationClosureModel.query.count() == 0  # 讀的路徑沒有重建
+        assert not organization_closure_is_fresh(db.session.connection())
+
+    runner = client.application.test_cli_runner()
+    result = runner.invoke(args=["rebuild-org-closure"])
+    assert result.exit_code == 0, result.output
+
+    with client.application.app_context():
+        assert organization_closure_is_fresh(db.session.connection())
+
+        # 手動改 parent 也看得出來
+        db.session.execute(text("UPDATE Organization SET parent_department_id = NULL WHERE organization_id = 'SCHILD'"))
+        db.session.commit()
+        assert not organization_closure_is_fresh(db.session.connection())
+
+    result = runner.invoke(args=["rebuild-org-closure"])
+    assert result.exit_code == 0, result.output
+    with client.application.app_context():
+        assert organization_closure_is_fresh(db.session.connection())
+        assert OrganizationService.get_depth("SCHILD") == 0
+
+
+# 測試行程內快取有上限：過期、舊版本的寫入時清掉，超過 max_entries 踢最久沒用的
+def test_versioned_cache_evicts_entries():
+    from app.services.cache_service import VersionedCache
+
+    cache = VersionedCache(ttl_seconds=60, max_entries=2)
+    cache.get_or_build("org:A", lambda: "A", version_key="tree")
+    cache.get_or_build("org:B", lambda: "B", version_key="tree")
+    cache.get_or_build("org:A", lambda: "rebuilt", version_key="tree")  # 用過一次，B 變成最久沒用的
+    cache.get_or_build("org:C", lambda: "C", version_key="tree")
+    assert list(cache._entries) == ["org:A", "org:C"]
+
+    cache.bump("tree")
+    cache.get_or_build("list", lambda: [])
+    assert list(cache._entries) == ["list"]  # 舊版本的寫入時一起清掉
+    assert cache.stats() == {"size": 1, "max_entries": 2}
+
+    value, _ = cache.get_or_build("missing", lambda: ({"error": "not found"}, 404), cacheable=lambda r: r[1] == 200)
+    assert value[1] == 404
+    assert "missing" not in cache._entries
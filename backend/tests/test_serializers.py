@@ -0,0 +1,52 @@
+from datetime import date, datetime
+from decimal import Decimal
+from app.models import db
+from app.models.gate_model import GateModel
+from app.serializers import attendance_records, output_json
+from app.services.gate_registry import get_gate_registry
+from app.services.work_schedule_service import WorkScheduleService
+
+
+# 測試出勤序列化：存好的遲到欄位直接用、舊資料（NULL）用班表補算、gate name 跟 HH:MM 格式不變
+def test_attendance_records_format(client):
+    with client.application.app_context():
+        db.session.add(GateModel(gate_id=1, gate_name="大門", direction="in", gate_type="entry"))
+        db.session.commit()
+
+        rows = [
+            (1, "E001", date(2025, 3, 3), datetime(2025, 3, 3, 8, 5, 59), None, 1, None, None, False, 0, None, None, None),
+            (2, "E001", date(2025, 3, 4), datetime(2025, 3, 4, 8, 45), datetime(2025, 3, 4, 17, 0), 1, 99, Decimal("8.25"), None, None, None, None, True),
+        ]
+        out = attendance_records(rows, get_gate_registry(), WorkScheduleService.get_lookup, "ORG001")
+
+    assert out[0] == {
+        "record_id": 1,
+        "report_date": "2025-03-03",
+        "check_in_time": "08:05",
+        "check_out_time": None,
+        "check_in_gate": "大門",
+        "check_out_gate": None,
+        "total_stay_hours": 0.0,
+        "late_arrival_status": "On time",
+        "late_arrival_minutes": 0,
+        "early_departure_status": "On time",
+        "early_departure_minutes": None,
+        "is_incomplete": False
+    }
+    # 預設 08:30-17:30 補算；不認識的 gate 是 None
+    assert out[1]["late_arrival_minutes"] == 15
+    assert out[1]["early_departure_minutes"] == 30
+    assert out[1]["check_out_gate"] is None
+    assert out[1]["total_stay_hours"] == 8.25
+    assert out[1]["is_incomplete"] is True
+
+
+# 測試 Flask-RESTful 的 JSON 輸出：中文不跳脫、Decimal / 日期也吐得出來
+def test_output_json_handles_decimal_and_unicode(client):
+    with client.application.test_request_context():
+        resp = output_json({"name": "大門", "hours": Decimal("1.50"), "day": date(2025, 1, 2)}, 200, {"X-Test": "1"})
+
+    assert resp.status_code == 200
+    assert resp.headers["X-Test"] == "1"
+    assert resp.get_json() == {"name": "大門", "hours": 1.5, "day": "2025-01-02"}
+    assert resp.get_data(as_text=True).endswith("\n")
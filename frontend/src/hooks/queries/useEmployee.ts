@@ -1,22 +1,23 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
-import { employeeApi, EmployeeCreateData, EmployeeUpdateData } from '@/services/api/employee';
+import { useQuery, useMutation, useQueryClient, keepPreviousData } from '@tanstack/react-query';
+import { employeeApi, EmployeeCreateData, EmployeeListParams, EmployeeUpdateData } from '@/services/api/employee';
 
 // Query Keys
 export const employeeKeys = {
   all: ['employee'] as const,
   lists: () => [...employeeKeys.all, 'list'] as const,
-  list: (filters: { search?: string; status?: string; organizationId?: string }) => 
-    [...employeeKeys.lists(), filters] as const,
+  list: (params: EmployeeListParams) =>
+    [...employeeKeys.lists(), params] as const,
   details: () => [...employeeKeys.all, 'detail'] as const,
   detail: (id: string) => [...employeeKeys.details(), id] as const,
 };
 
-// 獲取所有員工列表
-export const useEmployeeList = () => {
+// 獲取員工列表（一頁），cursor / 篩選條件不同就是不同的 query
+// 換頁時先留著上一頁的資料，不會閃一下 loading
+export const useEmployeeList = (params: EmployeeListParams = {}) => {
   return useQuery({
-    queryKey: employeeKeys.lists(),
-    queryFn: () => employeeApi.getEmployeeList(),
-    select: (data) => data.employee_list || [],
+    queryKey: employeeKeys.list(params),
+    queryFn: () => employeeApi.getEmployeeList(params),
+    placeholderData: keepPreviousData,
     staleTime: 5 * 60 * 1000, // 5 分鐘
   });
 };
@@ -12,16 +12,28 @@ import {
     Upload,
     Settings,
     AlertCircle,
-    RefreshCw
+    RefreshCw,
+    ChevronLeft,
+    ChevronRight
 } from "lucide-react";
 import { mockOrganizationsWithChildren } from "@/mocks/organizations";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Alert, AlertDescription, AlertTitle } from "@/components/ui/alert";
 
+const EMPLOYEE_PAGE_SIZE = 100;
+
 const OrganizationStructurePage = () => {
     // 使用 React Query hook 獲取組織結構
     const { data: initialData, isLoading, error, refetch } = useOrganizationTree();
-    const { data: employeeList, isLoading: isLoadingEmployees } = useEmployeeList();
+    // 員工清單一次只拿一頁（主管下拉選單用），cursors 記每一頁的起點，上一頁就 pop 回去
+    const [employeeCursors, setEmployeeCursors] = useState<(string | null)[]>([null]);
+    const employeeCursor = employeeCursors[employeeCursors.length - 1];
+    const { data: employeePage, isLoading: isLoadingEmployees, isFetching: isFetchingEmployees } = useEmployeeList({
+        limit: EMPLOYEE_PAGE_SIZE,
+        cursor: employeeCursor
+    });
+    const employeeList = employeePage?.employee_list;
+    const nextEmployeeCursor = employeePage?.next_cursor ?? null;
 
     // Debug logging
     console.log('Organization Tree Page Debug:', {
@@ -260,6 +272,31 @@ const OrganizationStructurePage = () => {
                                 }}
                                 onError={setEditorError}
                             />
+                            <div className="flex items-center justify-between mt-4 text-sm text-muted-foreground">
+                                <span>Employees page {employeeCursors.length}</span>
+                                <div className="flex items-center gap-2">
+                                    <Button
+                                        variant="outline"
+                                        size="sm"
+                                        className="flex items-center gap-1"
+                                        onClick={() => setEmployeeCursors(cursors => cursors.slice(0, -1))}
+                                        disabled={employeeCursors.length === 1 || isFetchingEmployees}
+                                    >
+                                        <ChevronLeft className="h-4 w-4" />
+                                        Previous
+                                    </Button>
+                                    <Button
+                                        variant="outline"
+                                        size="sm"
+                                        className="flex items-center gap-1"
+                                        onClick={() => setEmployeeCursors(cursors => [...cursors, nextEmployeeCursor])}
+                                        disabled={!nextEmployeeCursor || isFetchingEmployees}
+                                    >
+                                        Next page
+                                        <ChevronRight className="h-4 w-4" />
+                                    </Button>
+                                </div>
+                            </div>
                         </CardContent>
 
                     </Card>
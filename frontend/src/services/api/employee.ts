@@ -21,10 +21,34 @@ export interface EmployeeUpdateData extends Partial<EmployeeCreateData> {
   employee_id: string;
 }
 
+export interface EmployeeListParams {
+  limit?: number;
+  cursor?: string | null;
+  organization_id?: string;
+  hire_status?: string;
+  name_prefix?: string;
+}
+
+export interface EmployeeListPage {
+  employee_list: any[];
+  next_cursor: string | null;
+}
+
 export const employeeApi = {
-  // 獲取所有員工列表 - GET /api/v1/employee-list
-  getEmployeeList: async (): Promise<{ employee_list: any[] }> => {
-    return await fetchWithJwt<{ employee_list: any[] }>(`${BASE_API}/employee-list`, HttpMethod.GET);
+  // 獲取員工列表（一頁）- GET /api/v1/employee-list?limit=&cursor=&organization_id=&hire_status=&name_prefix=
+  // 後端是 cursor 分頁，下一頁把回傳的 next_cursor 帶回來；next_cursor 是 null 就是最後一頁
+  getEmployeeList: async (params: EmployeeListParams = {}): Promise<EmployeeListPage> => {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        query.set(key, String(value));
+      }
+    });
+    const queryString = query.toString();
+    return await fetchWithJwt<EmployeeListPage>(
+      `${BASE_API}/employee-list${queryString ? `?${queryString}` : ''}`,
+      HttpMethod.GET
+    );
   },
 
   // 獲取單一員工資訊 - GET /api/v1/employees/{employee_id}
@@ -10,6 +10,7 @@ export interface AttendanceRecord {
     late_arrival_minutes: number;
     early_departure_status: EarlyDepartureStatus;
     early_departure_minutes: number;
+    is_incomplete: boolean; // 有配不到的 in / out，時數只算配成對的
 }
 
 export interface EmployeeAttendance {